@@ -0,0 +1,121 @@
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from .models import CategoryGradeAggregate, Subject
+from .queries import grade_aggregates_for
+
+
+GRADE_QUANTUM = Decimal("0.01")
+
+
+def normalize_grade(grade):
+    if grade is None or grade == "":
+        return None
+    return Decimal(str(grade)).quantize(GRADE_QUANTUM)
+
+
+def apply_grade_delta(user_id, category, grade_delta, count_delta):
+    rows = CategoryGradeAggregate.objects.filter(user_id=user_id, category=category)
+    updated = rows.update(
+        grade_sum=F("grade_sum") + grade_delta,
+        grade_count=F("grade_count") + count_delta,
+    )
+    if updated:
+        return
+
+    try:
+        with transaction.atomic():
+            CategoryGradeAggregate.objects.create(
+                user_id=user_id,
+                category=category,
+                grade_sum=grade_delta,
+                grade_count=count_delta,
+            )
+    except IntegrityError:
+        rows.update(
+            grade_sum=F("grade_sum") + grade_delta,
+            grade_count=F("grade_count") + count_delta,
+        )
+
+
+def record_grade_change(old, new):
+    if old == new:
+        return
+    if old is not None and old[2] is not None:
+        apply_grade_delta(old[0], old[1], -old[2], -1)
+    if new is not None and new[2] is not None:
+        apply_grade_delta(new[0], new[1], new[2], 1)
+
+
+def record_created_subjects(subjects):
+    totals = {}
+    for subject in subjects:
+        grade = normalize_grade(subject.grade)
+        if grade is None:
+            continue
+        key = (subject.user_id, subject.category)
+        grade_sum, grade_count = totals.get(key, (Decimal("0"), 0))
+        totals[key] = (grade_sum + grade, grade_count + 1)
+    for (user_id, category), (grade_sum, grade_count) in totals.items():
+        apply_grade_delta(user_id, category, grade_sum, grade_count)
+
+
+def category_averages(user_id):
+    return {
+        category: float(grade_sum / grade_count)
+        for category, grade_sum, grade_count in grade_aggregates_for(user_id)
+    }
+
+
+async def acategory_averages(user_id):
+    return {
+        category: float(grade_sum / grade_count)
+        async for category, grade_sum, grade_count in grade_aggregates_for(user_id)
+    }
+
+
+def live_aggregates(user_ids=None):
+    subjects = Subject.objects.filter(grade__isnull=False)
+    if user_ids is not None:
+        subjects = subjects.filter(user_id__in=user_ids)
+    rows = (
+        subjects.values("user_id", "category")
+        .annotate(grade_sum=Sum("grade"), grade_count=Count("id"))
+        .order_by()
+    )
+    return {
+        (row["user_id"], row["category"]): (normalize_grade(row["grade_sum"]), row["grade_count"])
+        for row in rows
+    }
+
+
+def stored_aggregates(user_ids=None):
+    rows = CategoryGradeAggregate.objects.filter(grade_count__gt=0)
+    if user_ids is not None:
+        rows = rows.filter(user_id__in=user_ids)
+    return {
+        (user_id, category): (normalize_grade(grade_sum), grade_count)
+        for user_id, category, grade_sum, grade_count
+        in rows.values_list("user_id", "category", "grade_sum", "grade_count")
+    }
+
+
+def rebuild_aggregates(user_ids):
+    with transaction.atomic():
+        CategoryGradeAggregate.objects.filter(user_id__in=user_ids).delete()
+        CategoryGradeAggregate.objects.bulk_create([
+            CategoryGradeAggregate(user_id=user_id, category=category, grade_sum=grade_sum, grade_count=grade_count)
+            for (user_id, category), (grade_sum, grade_count) in live_aggregates(user_ids).items()
+        ])
+
+
+def find_inconsistencies(user_ids=None):
+    live = live_aggregates(user_ids)
+    stored = stored_aggregates(user_ids)
+    return [
+        (user_id, category, stored.get((user_id, category)), live.get((user_id, category)))
+        for user_id, category in sorted(live.keys() | stored.keys())
+        if live.get((user_id, category)) != stored.get((user_id, category))
+    ]
@@ -0,0 +1,342 @@
+import time
+
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+
+from .aggregates import acategory_averages
+from .auth import aget_session_user
+from .cache import cached_user_response
+from .dashboard import InvalidDashboard, abuild_dashboard, dashboard_params
+from .events import event_backend
+from .models import Subject, User
+from .pagination import DEFAULT_NOTES_PER_SUBJECT, InvalidCursor, page_params, page_size, paginate, split_page
+from .queries import (
+    subjects_for, notes_for_subjects, subjects_with_notes_for, projects_for, todo_lists_for, tasks_for_lists,
+    sort_subjects, subject_row_key, subject_cursor, note_subjects_for, latest_notes_for_subjects, subject_notes_for,
+)
+from .renderers import FastJsonResponse, dumps
+from .serializers import (
+    serialize_user, serialize_subjects, attach_subject_notes, serialize_subject_notes, serialize_project,
+    serialize_todo_lists, recommendation_payload, note_row_key, serialize_note_rows, serialize_subject_note_pages,
+)
+from .validation import InvalidPayload, clean_note_subject, clean_subject_filters, clean_subject_sort
+
+
+async def _rows(queryset):
+    return [row async for row in queryset]
+
+
+async def aget_user(request, user_id):
+    user = await User.objects.filter(id=user_id).afirst()
+    if user is None:
+        return JsonResponse({"error": "User not found"}, status=404)
+    return FastJsonResponse(serialize_user(user))
+
+
+@csrf_exempt
+@cached_user_response("subjects")
+async def aget_subjects(request):
+    if request.method != "GET":
+        return JsonResponse({"error": "Invalid method"}, status=400)
+
+    user_id = await request.session.aget("user_id")
+    if not user_id:
+        return JsonResponse({"error": "User not authenticated"}, status=401)
+
+    user = await aget_session_user(request)
+    if user is None:
+        return JsonResponse({"error": "User not found"}, status=404)
+
+    try:
+        filters = clean_subject_filters(request.GET)
+        sort, descending = clean_subject_sort(request.GET.get("sort"))
+        decode, encode = subject_cursor(sort)
+        page = page_params(request, decode)
+    except (InvalidPayload, InvalidCursor) as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    subjects, fields = sort_subjects(subjects_for(user.id, filters), sort, descending)
+    next_cursor = None
+    if page:
+        subjects, next_cursor = split_page(
+            await _rows(paginate(subjects, page, descending, fields)), page, subject_row_key(sort), encode
+        )
+    else:
+        subjects = await _rows(subjects)
+
+    data, notes_by_subject = serialize_subjects(subjects)
+    attach_subject_notes(notes_by_subject, await _rows(notes_for_subjects(notes_by_subject)))
+
+    if page:
+        return FastJsonResponse({"success": True, "subjects": data, "next_cursor": next_cursor})
+    return FastJsonResponse({"success": True, "subjects": data})
+
+
+@csrf_exempt
+async def acurrent_user(request):
+    user_id = await request.session.aget("user_id")
+    if not user_id:
+        return JsonResponse({"error": "Not logged in"}, status=401)
+
+    user = await aget_session_user(request)
+    if user is None:
+        return JsonResponse({"error": "User not found"}, status=404)
+
+    return FastJsonResponse(serialize_user(user))
+
+
+@csrf_exempt
+async def acareer_recommendation(request):
+    user_id = await request.session.aget("user_id")
+    if not user_id:
+        return JsonResponse({"error": "User not authenticated"}, status=401)
+
+    user = await aget_session_user(request)
+    if user is None:
+        return JsonResponse({"error": "User not found"}, status=404)
+
+    return FastJsonResponse(recommendation_payload(await acategory_averages(user.id)))
+
+
+@csrf_exempt
+@cached_user_response("dashboard")
+async def adashboard(request):
+    if request.method != "GET":
+        return JsonResponse({"success": False, "message": "Invalid request method"}, status=405)
+
+    user_id = await request.session.aget("user_id")
+    if not user_id:
+        return JsonResponse({"success": False, "message": "User not authenticated"}, status=401)
+
+    user = await aget_session_user(request)
+    if user is None:
+        return JsonResponse({"success": False, "message": "User not found"}, status=404)
+
+    try:
+        sections = dashboard_params(request.GET)
+    except InvalidDashboard as e:
+        return JsonResponse({"success": False, "message": str(e)}, status=400)
+
+    data = await abuild_dashboard(user.id, sections)
+    return FastJsonResponse({"success": True, "user": serialize_user(user), **data})
+
+
+@cached_user_response("notes")
+async def aget_notes(request):
+    user_id = await request.session.aget("user_id")
+    if not user_id:
+        return JsonResponse({"success": False, "message": "User not authenticated"}, status=401)
+
+    user = await aget_session_user(request)
+    if user is None:
+        return JsonResponse({"success": False, "message": "User not found"}, status=404)
+
+    try:
+        page = page_params(request)
+        subject_id = clean_note_subject(request.GET.get("subject"))
+        per_subject = page_size(request, "notes_page_size", DEFAULT_NOTES_PER_SUBJECT)
+    except (InvalidCursor, InvalidPayload) as e:
+        return JsonResponse({"success": False, "message": str(e)}, status=400)
+
+    if subject_id is not None:
+        page = page or (None, page_size(request))
+        notes, next_cursor = split_page(
+            await _rows(paginate(subject_notes_for(user.id, subject_id), page, descending=True)), page, note_row_key
+        )
+        if not notes and not await Subject.objects.filter(id=subject_id, user=user).aexists():
+            return JsonResponse({"success": False, "message": "Subject not found"}, status=404)
+        return FastJsonResponse({
+            "success": True, "subject_id": subject_id, "notes": serialize_note_rows(notes), "next_cursor": next_cursor,
+        })
+
+    if not page:
+        return FastJsonResponse(serialize_subject_notes(await _rows(subjects_with_notes_for(user.id))), safe=False)
+
+    subjects, next_cursor = split_page(
+        await _rows(paginate(note_subjects_for(user.id), page)), page, lambda row: (row[2], row[0])
+    )
+    notes = await _rows(latest_notes_for_subjects([subject_id for subject_id, _, _ in subjects], per_subject))
+    data = serialize_subject_note_pages(subjects, notes, per_subject)
+    return FastJsonResponse({"success": True, "subjects": data, "next_cursor": next_cursor})
+
+
+@csrf_exempt
+@cached_user_response("projects")
+async def aget_projects(request):
+    if request.method != "GET":
+        return JsonResponse({"success": False, "message": "Invalid request method"}, status=405)
+
+    user_id = await request.session.aget("user_id")
+    if not user_id:
+        return JsonResponse({"success": False, "message": "User not authenticated"}, status=401)
+
+    user = await aget_session_user(request)
+    if user is None:
+        return JsonResponse({"success": False, "message": "User not found"}, status=404)
+
+    try:
+        page = page_params(request)
+    except InvalidCursor as e:
+        return JsonResponse({"success": False, "message": str(e)}, status=400)
+
+    projects = projects_for(user.id)
+    next_cursor = None
+    if page:
+        projects, next_cursor = split_page(
+            await _rows(paginate(projects, page, descending=True)), page,
+            lambda project: (project.created_at, project.id)
+        )
+    else:
+        projects = await _rows(projects)
+
+    data = [serialize_project(project) for project in projects]
+
+    if page:
+        return FastJsonResponse({"success": True, "projects": data, "next_cursor": next_cursor})
+    return FastJsonResponse({"success": True, "projects": data})
+
+
+@csrf_exempt
+@cached_user_response("todo_lists")
+async def aget_todo_lists(request):
+    if request.method != "GET":
+        return JsonResponse({"success": False, "message": "Invalid request method"}, status=405)
+
+    user_id = await request.session.aget("user_id")
+    if not user_id:
+        return JsonResponse({"success": False, "message": "User not authenticated"}, status=401)
+
+    user = await aget_session_user(request)
+    if user is None:
+        return JsonResponse({"success": False, "message": "User not found"}, status=404)
+
+    try:
+        page = page_params(request)
+    except InvalidCursor as e:
+        return JsonResponse({"success": False, "message": str(e)}, status=400)
+
+    try:
+        todo_lists = todo_lists_for(user.id)
+        next_cursor = None
+        if page:
+            todo_lists, next_cursor = split_page(
+                await _rows(paginate(todo_lists, page, descending=True)), page,
+                lambda row: (row["created_at"], row["id"])
+            )
+        else:
+            todo_lists = await _rows(todo_lists)
+
+        tasks = await _rows(tasks_for_lists([todo_list["id"] for todo_list in todo_lists]))
+        lists_data = serialize_todo_lists(todo_lists, tasks)
+
+        if page:
+            return FastJsonResponse({
+                "success": True,
+                "statuses": lists_data,
+                "next_cursor": next_cursor
+            }, status=200)
+        return FastJsonResponse({
+            "success": True,
+            "statuses": lists_data
+        }, status=200)
+    except Exception as e:
+        return JsonResponse({"success": False, "message": str(e)}, status=500)
+
+
+def _event_position(value):
+    if value in (None, ""):
+        return None
+    position = int(value)
+    if position < 0:
+        raise ValueError(value)
+    return position
+
+
+def _sse(event_type, event_id, data):
+    return f"id: {event_id}\nevent: {event_type}\ndata: {dumps(data).decode()}\n\n"
+
+
+async def _event_stream(backend, user_id, after):
+    # Connections are recycled after EVENTS_STREAM_SECONDS; the browser
+    # reconnects with Last-Event-ID and picks up where it left off
+    heartbeat = getattr(settings, "EVENTS_HEARTBEAT", 15)
+    deadline = time.monotonic() + getattr(settings, "EVENTS_STREAM_SECONDS", 300)
+    yield "retry: 3000\n\n"
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        events, last_id, lost = await backend.wait(user_id, after, min(heartbeat, remaining))
+        if lost:
+            # Some events are gone; the client refetches (or syncs) from scratch
+            yield _sse("reset", last_id, {"last_id": last_id})
+            after = last_id
+        elif events:
+            for event_id, event in events:
+                yield _sse("change", event_id, event)
+            after = events[-1][0]
+        else:
+            yield ": keepalive\n\n"
+
+
+@csrf_exempt
+async def aevents(request):
+    if request.method != "GET":
+        return JsonResponse({"success": False, "message": "Invalid request method"}, status=405)
+
+    user_id = await request.session.aget("user_id")
+    if not user_id:
+        return JsonResponse({"success": False, "message": "User not authenticated"}, status=401)
+
+    user = await aget_session_user(request)
+    if user is None:
+        return JsonResponse({"success": False, "message": "User not found"}, status=404)
+
+    try:
+        after = _event_position(request.headers.get("Last-Event-ID") or request.GET.get("after"))
+    except ValueError:
+        return JsonResponse({"success": False, "message": "Invalid Last-Event-ID"}, status=400)
+
+    backend = event_backend()
+    if after is None:
+        after = await backend.alatest(user.id)
+    response = StreamingHttpResponse(_event_stream(backend, user.id, after), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@csrf_exempt
+async def apoll_events(request):
+    if request.method != "GET":
+        return JsonResponse({"success": False, "message": "Invalid request method"}, status=405)
+
+    user_id = await request.session.aget("user_id")
+    if not user_id:
+        return JsonResponse({"success": False, "message": "User not authenticated"}, status=401)
+
+    user = await aget_session_user(request)
+    if user is None:
+        return JsonResponse({"success": False, "message": "User not found"}, status=404)
+
+    try:
+        after = _event_position(request.GET.get("after"))
+        timeout = float(request.GET.get("timeout") or 25)
+    except ValueError:
+        return JsonResponse({"success": False, "message": "Invalid after or timeout"}, status=400)
+
+    backend = event_backend()
+    if after is None:
+        # First call: nothing to wait for yet, just where to start from
+        last_id = await backend.alatest(user.id)
+        return FastJsonResponse({"success": True, "events": [], "last_id": last_id, "reset": False})
+
+    timeout = max(0, min(timeout, getattr(settings, "EVENTS_LONG_POLL_SECONDS", 25)))
+    events, last_id, lost = await backend.wait(user.id, after, timeout)
+    return FastJsonResponse({
+        "success": True,
+        "events": [{"event_id": event_id, **event} for event_id, event in events],
+        "last_id": last_id,
+        "reset": bool(lost),
+    })
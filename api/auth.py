@@ -0,0 +1,68 @@
+import copy
+import threading
+import time
+
+from django.conf import settings
+
+from .models import User
+
+
+_user_cache = {}
+_user_cache_lock = threading.Lock()
+
+
+def _cache_ttl():
+    return getattr(settings, "SESSION_USER_CACHE_TTL", 0)
+
+
+def _cached_user(user_id):
+    if _cache_ttl() <= 0:
+        return None
+    with _user_cache_lock:
+        entry = _user_cache.get(user_id)
+    if entry is not None and entry[0] > time.monotonic():
+        return copy.copy(entry[1])
+    return None
+
+
+def _remember_user(user_id, user):
+    ttl = _cache_ttl()
+    if ttl > 0 and user is not None:
+        with _user_cache_lock:
+            _user_cache[user_id] = (time.monotonic() + ttl, copy.copy(user))
+
+
+def _load_user(user_id):
+    user = _cached_user(user_id)
+    if user is None:
+        user = User.objects.filter(id=user_id).first()
+        _remember_user(user_id, user)
+    return user
+
+
+async def _aload_user(user_id):
+    user = _cached_user(user_id)
+    if user is None:
+        user = await User.objects.filter(id=user_id).afirst()
+        _remember_user(user_id, user)
+    return user
+
+
+def get_session_user(request):
+    if not hasattr(request, "_session_user"):
+        user_id = request.session.get("user_id")
+        request._session_user = _load_user(user_id) if user_id else None
+    return request._session_user
+
+
+async def aget_session_user(request):
+    if not hasattr(request, "_session_user"):
+        user_id = await request.session.aget("user_id")
+        request._session_user = await _aload_user(user_id) if user_id else None
+    return request._session_user
+
+
+def invalidate_session_user(user_id):
+    with _user_cache_lock:
+        _user_cache.pop(user_id, None)
+
@@ -0,0 +1,9 @@
+from .base import (
+    BENCH_PASSWORD, BenchmarkError, bench_databases, create_bench_user, delete_bench_users, login_client,
+    on_bench_database,
+)
+from .data import DEFAULT_DATASET, generate_dataset
+from .endpoints import ENDPOINTS, BenchContext, run_endpoint
+from .report import compare_reports, environment, load_report, summarize, write_report
+from .scenarios import SCENARIOS
+from .transports import TRANSPORTS, transport_for
@@ -0,0 +1,114 @@
+import json
+import statistics
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings, setup_databases, teardown_databases
+
+from ..models import User
+from ..signals import suspend_grade_aggregates
+
+
+BENCH_PASSWORD = "bench-password"
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+def on_test_database():
+    # Set up by the test runner, or by bench_databases()
+    return connection.settings_dict["NAME"] == connection.creation._get_test_db_name()
+
+
+def on_bench_database():
+    name = getattr(settings, "BENCH_DATABASE", None)
+    return bool(name) and connection.settings_dict["NAME"] == name
+
+
+@contextmanager
+def bench_databases(keepdb=False):
+    # Benchmarks create and delete users, so they only run against a
+    # database set aside for them; otherwise against fresh test databases
+    if on_test_database() or on_bench_database():
+        yield
+        return
+    old_config = setup_databases(verbosity=0, interactive=False, keepdb=keepdb, serialized_aliases=set())
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=0, keepdb=keepdb)
+
+
+def create_bench_user():
+    username = f"bench_{uuid.uuid4().hex[:12]}"
+    return User.objects.create(
+        username=username,
+        email=f"{username}@bench.local",
+        password_hash=make_password(BENCH_PASSWORD),
+    )
+
+
+def login_client(user):
+    client = Client(HTTP_HOST="localhost")
+    response = client.post(
+        "/api/login/",
+        json.dumps({"username": user.username, "password": BENCH_PASSWORD}),
+        content_type="application/json",
+    )
+    if response.status_code != 200:
+        raise BenchmarkError(f"Login failed for {user.username}: {response.status_code}")
+    return client
+
+
+def _timed_gets(client, path, repeat):
+    timings = []
+    queries = None
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = client.get(path)
+            timings.append((time.perf_counter() - start) * 1000)
+        if response.status_code != 200:
+            raise BenchmarkError(f"GET {path} returned {response.status_code}")
+        if queries is None:
+            queries = len(captured)
+    return {
+        "queries": queries,
+        "mean_ms": round(statistics.mean(timings), 3),
+        "min_ms": round(min(timings), 3),
+        "bytes": len(response.content),
+    }
+
+
+def measure(client, path, repeat):
+    # The response cache would answer every repeat after the first, so time
+    # the view with it off, then the cache hits on their own
+    with override_settings(RESPONSE_CACHE_TIMEOUT=0):
+        result = _timed_gets(client, path, repeat)
+    client.get(path)
+    cached = _timed_gets(client, path, repeat)
+    del cached["bytes"]
+    return {"path": path, **result, "cached": cached}
+
+
+def timed_calls(client, calls):
+    with CaptureQueriesContext(connection) as captured:
+        start = time.perf_counter()
+        for path, payload in calls:
+            response = client.post(path, json.dumps(payload), content_type="application/json")
+            if response.status_code not in (200, 201):
+                raise BenchmarkError(f"POST {path} returned {response.status_code}")
+        elapsed = (time.perf_counter() - start) * 1000
+    return {"requests": len(calls), "queries": len(captured), "total_ms": round(elapsed, 3)}
+
+
+def delete_bench_users(users):
+    # The aggregates go with the users, so skip the per-subject signal updates
+    with suspend_grade_aggregates():
+        User.objects.filter(id__in=[user.id for user in users]).delete()
@@ -0,0 +1,203 @@
+import csv
+import random
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+
+from ..aggregates import rebuild_aggregates
+from ..models import User, Subject, Note, Project, TodoList, Task
+from ..search import rebuild_search_index
+from .base import BENCH_PASSWORD
+
+
+def seed_todo_lists(user, lists, tasks_per_list):
+    TodoList.objects.bulk_create(
+        [TodoList(user=user, title=f"List {i}") for i in range(lists)],
+        batch_size=500,
+    )
+    list_ids = TodoList.objects.filter(user=user).values_list("id", flat=True)
+    Task.objects.bulk_create(
+        [
+            Task(todo_list_id=list_id, label=f"Task {i}", completed=i % 3 == 0)
+            for list_id in list_ids
+            for i in range(tasks_per_list)
+        ],
+        batch_size=1000,
+    )
+    TodoList.recount_tasks(TodoList.objects.filter(user=user))
+
+
+def seed_subjects(user, subjects, notes_per_subject):
+    categories = [choice for choice, _ in Subject.CATEGORY_CHOICES]
+    Subject.objects.bulk_create(
+        [
+            Subject(
+                user=user,
+                category=categories[i % len(categories)],
+                subject_name=f"Subject {i}",
+                grade=Decimal(60 + i % 40),
+            )
+            for i in range(subjects)
+        ],
+        batch_size=500,
+    )
+    subject_ids = Subject.objects.filter(user=user).values_list("id", flat=True)
+    Note.objects.bulk_create(
+        [
+            Note(subject_id=subject_id, user=user, title=f"Note {i}", content="Lorem ipsum dolor sit amet")
+            for subject_id in subject_ids
+            for i in range(notes_per_subject)
+        ],
+        batch_size=1000,
+    )
+
+
+def seed_notes(user, count, batch_size=5000):
+    subject = Subject.objects.create(user=user, subject_name="Export")
+    for start in range(0, count, batch_size):
+        Note.objects.bulk_create(
+            [
+                Note(subject=subject, user=user, title=f"Note {i}", content="Lorem ipsum dolor sit amet")
+                for i in range(start, min(start + batch_size, count))
+            ],
+            batch_size=batch_size,
+        )
+
+
+def write_subject_csv(path, rows, invalid_every=50):
+    categories = [choice for choice, _ in Subject.CATEGORY_CHOICES]
+    with open(path, "w", newline="") as output:
+        writer = csv.writer(output)
+        writer.writerow(["subject_name", "category", "grade", "semester", "school_year", "status", "priority"])
+        for i in range(rows):
+            category = "Unknown" if invalid_every and i % invalid_every == 0 else categories[i % len(categories)]
+            writer.writerow([f"Subject {i}", category, 60 + i % 40, "1st", "2025-2026", "Ongoing", "HIGH"])
+
+
+def vocabulary(size):
+    syllables = ["al", "go", "ri", "thm", "da", "ta", "ba", "se", "net", "wor", "sec", "ur", "lo", "gic", "pro", "gram"]
+    words = []
+    for i in range(size):
+        word, n = "", i
+        for _ in range(3):
+            word += syllables[n % len(syllables)]
+            n //= len(syllables)
+        words.append(f"{word}{i}")
+    return words
+
+
+def seed_search_notes(user, count, words_per_note=12, vocabulary_size=5000, batch_size=5000):
+    words = vocabulary(vocabulary_size)
+    subject = Subject.objects.create(user=user, subject_name="Search")
+    for start in range(0, count, batch_size):
+        Note.objects.bulk_create(
+            [
+                Note(
+                    subject=subject, user=user, title=f"{words[i % vocabulary_size]} notes",
+                    content=" ".join(words[(i * 7 + j * 13) % vocabulary_size] for j in range(words_per_note)),
+                )
+                for i in range(start, min(start + batch_size, count))
+            ],
+            batch_size=batch_size,
+        )
+    rebuild_search_index(user.id)
+    return words
+
+
+DEFAULT_DATASET = {
+    "users": 3,
+    "subjects": 40,
+    "notes_per_subject": 5,
+    "projects": 20,
+    "todo_lists": 20,
+    "tasks_per_list": 10,
+}
+
+SEMESTERS = ["1st", "2nd", "Summer"]
+SCHOOL_YEARS = ["2023-2024", "2024-2025", "2025-2026"]
+
+
+def _sentence(rng, words, length):
+    return " ".join(rng.choice(words) for _ in range(length))
+
+
+def generate_dataset(seed=0, prefix="bench", **sizes):
+    # The same seed and sizes always produce the same rows, so runs against
+    # a fresh database are comparable with a stored baseline
+    sizes = {**DEFAULT_DATASET, **sizes}
+    rng = random.Random(seed)
+    words = vocabulary(2000)
+    password_hash = make_password(BENCH_PASSWORD)
+    categories = [choice for choice, _ in Subject.CATEGORY_CHOICES]
+    statuses = [choice for choice, _ in Subject.STATUS_CHOICES]
+    priorities = [choice for choice, _ in Subject.PRIORITY_LEVELS]
+    project_statuses = [choice for choice, _ in Project.STATUS_CHOICES]
+
+    users = User.objects.bulk_create([
+        User(
+            username=f"{prefix}_{seed}_{i}", email=f"{prefix}_{seed}_{i}@bench.local",
+            password_hash=password_hash, full_name=f"Bench User {i}",
+        )
+        for i in range(sizes["users"])
+    ])
+    users = list(User.objects.filter(username__in=[user.username for user in users]).order_by("id"))
+
+    for user in users:
+        Subject.objects.bulk_create(
+            [
+                Subject(
+                    user=user,
+                    category=rng.choice(categories),
+                    subject_name=f"{rng.choice(words).title()} {i}",
+                    description=_sentence(rng, words, 8),
+                    grade=None if rng.random() < 0.2 else Decimal(rng.randint(6000, 10000)) / 100,
+                    semester=rng.choice(SEMESTERS),
+                    school_year=rng.choice(SCHOOL_YEARS),
+                    status=rng.choice(statuses),
+                    priority=rng.choice(priorities),
+                )
+                for i in range(sizes["subjects"])
+            ],
+            batch_size=500,
+        )
+        subject_ids = list(Subject.objects.filter(user=user).order_by("id").values_list("id", flat=True))
+        Note.objects.bulk_create(
+            [
+                Note(
+                    subject_id=subject_id, user=user, title=_sentence(rng, words, 3),
+                    content=_sentence(rng, words, rng.randint(10, 60)),
+                )
+                for subject_id in subject_ids
+                for _ in range(sizes["notes_per_subject"])
+            ],
+            batch_size=1000,
+        )
+        Project.objects.bulk_create(
+            [
+                Project(
+                    user=user, title=f"Project {i}", description=_sentence(rng, words, 12),
+                    status=rng.choice(project_statuses),
+                )
+                for i in range(sizes["projects"])
+            ],
+            batch_size=500,
+        )
+        TodoList.objects.bulk_create(
+            [TodoList(user=user, title=f"List {i}") for i in range(sizes["todo_lists"])],
+            batch_size=500,
+        )
+        lists = TodoList.objects.filter(user=user)
+        Task.objects.bulk_create(
+            [
+                Task(todo_list_id=list_id, label=_sentence(rng, words, 4), completed=rng.random() < 0.4)
+                for list_id in lists.order_by("id").values_list("id", flat=True)
+                for _ in range(sizes["tasks_per_list"])
+            ],
+            batch_size=1000,
+        )
+        TodoList.recount_tasks(lists)
+        rebuild_search_index(user.id)
+
+    # bulk_create skips the signals that keep these in step
+    rebuild_aggregates([user.id for user in users])
+    return users
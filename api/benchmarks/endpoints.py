@@ -0,0 +1,251 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+from django.urls import resolve
+from django.utils import timezone
+
+from ..blobs import delete_orphan, store_chunks
+from ..models import Subject, Note, Project, TodoList, Task
+from .base import BENCH_PASSWORD, BenchmarkError
+from .data import vocabulary
+from .report import summarize
+from .transports import Call
+
+
+class BenchContext:
+    def __init__(self, transport, users, rng):
+        self.transport = transport
+        self.user = users[0]
+        self.others = users[1:] or users
+        self.rng = rng
+        self.words = vocabulary(2000)
+        self.registered = []
+        self.session = self.login()
+        self._ids = {}
+        self._blob = None
+
+    def login(self, user=None):
+        session = self.transport.new_session()
+        payload = {"username": (user or self.user).username, "password": BENCH_PASSWORD}
+        status, _ = self.transport.send(session, post("/api/login/", payload))
+        if status != 200:
+            raise BenchmarkError(f"Login as {payload['username']} returned {status}")
+        return session
+
+    def pick(self, kind):
+        if kind not in self._ids:
+            querysets = {
+                "subjects": Subject.objects.filter(user=self.user),
+                "notes": Note.objects.filter(user=self.user),
+                "projects": Project.objects.filter(user=self.user),
+                "todo_lists": TodoList.objects.filter(user=self.user),
+                "tasks": Task.objects.filter(todo_list__user=self.user),
+            }
+            self._ids[kind] = list(querysets[kind].order_by("id").values_list("id", flat=True))
+        if not self._ids[kind]:
+            raise BenchmarkError(f"The bench user has no {kind}")
+        return self.rng.choice(self._ids[kind])
+
+    def word(self):
+        return self.rng.choice(self.words)
+
+    def blob_name(self):
+        if self._blob is None:
+            self._blob = store_chunks([b"GIF89a" + bytes(range(256)) * 16], ".gif")
+        return self._blob.name
+
+    def close(self):
+        if self._blob is not None:
+            delete_orphan(self._blob, timezone.now())
+
+    # Rows created outside the timed request for the delete endpoints to remove
+    def new_subject(self):
+        return Subject.objects.create(user=self.user, subject_name=f"Victim {self.word()}", grade=75).id
+
+    def new_note(self):
+        return Note.objects.create(
+            user=self.user, subject_id=self.pick("subjects"), title=self.word(), content=self.word()
+        ).id
+
+    def new_project(self):
+        return Project.objects.create(user=self.user, title=self.word()).id
+
+    def new_todo_list(self):
+        return TodoList.objects.create(user=self.user, title=self.word()).id
+
+    def new_task(self):
+        list_id = self.pick("todo_lists")
+        task = Task.objects.create(todo_list_id=list_id, label=self.word())
+        TodoList.adjust_task_counters(list_id, total=1)
+        return task.id
+
+
+def get(path):
+    return Call("GET", path)
+
+
+def post(path, data, method="POST"):
+    return Call(method, path, json.dumps(data).encode())
+
+
+def subject_payload(ctx):
+    return {
+        "subject_name": f"{ctx.word().title()} {ctx.rng.randint(1, 999)}",
+        "category": ctx.rng.choice([choice for choice, _ in Subject.CATEGORY_CHOICES]),
+        "grade": ctx.rng.randint(60, 100),
+        "semester": "1st",
+        "school_year": "2025-2026",
+        "status": "Ongoing",
+    }
+
+
+def _import_csv(ctx, rows=20):
+    lines = ["subject_name,category,grade,semester,school_year,status,priority"]
+    lines += [
+        f"{ctx.word()} {i},Programming,{ctx.rng.randint(60, 100)},1st,2025-2026,Ongoing,HIGH" for i in range(rows)
+    ]
+    return Call("POST", "/api/subjects/import/", "\n".join(lines).encode(), content_type="text/csv")
+
+
+def _register(ctx):
+    username = f"{ctx.user.username}_reg{len(ctx.registered)}"
+    ctx.registered.append(username)
+    return post("/api/register/", {
+        "username": username, "email": f"{username}@bench.local", "password": BENCH_PASSWORD, "full_name": "Bench",
+    })
+
+
+def _logout(ctx):
+    # Logged in as the other users so a server outside this process, which
+    # still throttles logins, is not pushed over its per-username limit
+    call = post("/api/logout/", {})
+    call.session = ctx.login(ctx.rng.choice(ctx.others))
+    return call
+
+
+def _profile_update(ctx):
+    body = urlencode({"bio": " ".join(ctx.word() for _ in range(8))}).encode()
+    return Call("POST", f"/profile/{ctx.user.id}/", body, content_type="application/x-www-form-urlencoded")
+
+
+# name -> (builds the next request, most requests worth timing or None).
+# Logins and registrations are capped: each one is a deliberately slow
+# password hash.
+ENDPOINTS = {
+    "register_user": (_register, 5),
+    "login": (lambda ctx: post("/api/login/", {"username": ctx.user.username, "password": BENCH_PASSWORD}), 5),
+    "logout": (_logout, 5),
+    "get_user": (lambda ctx: get(f"/api/user/{ctx.user.id}/"), None),
+    "current_user": (lambda ctx: get("/api/current_user/"), None),
+    "profile": (lambda ctx: get(f"/profile/{ctx.user.id}/"), None),
+    "profile_update": (_profile_update, None),
+    "add_subject": (lambda ctx: post("/api/subjects/add/", subject_payload(ctx)), None),
+    "get_subjects": (lambda ctx: get("/api/subjects/"), None),
+    "get_subjects_filtered": (lambda ctx: get("/api/subjects/?status=Ongoing&sort=-grade"), None),
+    "edit_subject": (
+        lambda ctx: post(f"/api/subjects/edit/{ctx.pick('subjects')}/", {"grade": ctx.rng.randint(60, 100)}, "PATCH"),
+        None,
+    ),
+    "delete_subject": (lambda ctx: post(f"/delete-subject/{ctx.new_subject()}/", {}), None),
+    "bulk_subjects": (
+        lambda ctx: post("/api/subjects/bulk/", {"subjects": [subject_payload(ctx) for _ in range(20)]}), None,
+    ),
+    "bulk_subjects_delete": (
+        lambda ctx: post("/api/subjects/bulk/", {"ids": [ctx.new_subject() for _ in range(10)]}, "DELETE"), None,
+    ),
+    "import_subjects": (_import_csv, None),
+    "career_recommendation": (lambda ctx: get("/api/career_recommendation/"), None),
+    "dashboard": (lambda ctx: get("/api/dashboard/?subjects_page_size=20&projects_page_size=20"), None),
+    "create_note": (
+        lambda ctx: post("/api/notes/", {"title": ctx.word(), "content": ctx.word(), "subject": ctx.pick("subjects")}),
+        None,
+    ),
+    "get_notes": (lambda ctx: get("/api/notes/fetch/"), None),
+    "edit_note": (lambda ctx: post(f"/api/notes/edit/{ctx.pick('notes')}/", {"content": ctx.word()}, "PATCH"), None),
+    "delete_note": (lambda ctx: post(f"/api/notes/delete/{ctx.new_note()}/", {}, "DELETE"), None),
+    "bulk_notes": (
+        lambda ctx: post("/api/notes/bulk/", {
+            "notes": [{"title": ctx.word(), "content": ctx.word(), "subject": ctx.pick("subjects")} for _ in range(20)],
+        }),
+        None,
+    ),
+    "add_project": (lambda ctx: post("/api/add_project/", {"title": ctx.word(), "description": ctx.word()}), None),
+    "get_projects": (lambda ctx: get("/api/projects/"), None),
+    "edit_project": (
+        lambda ctx: post(f"/api/projects/edit/{ctx.pick('projects')}/", {"description": ctx.word()}), None,
+    ),
+    "delete_project": (lambda ctx: post(f"/api/projects/delete/{ctx.new_project()}/", {}), None),
+    "add_todo_list": (lambda ctx: post("/api/statuses/add/", {"title": ctx.word()}), None),
+    "get_todo_lists": (lambda ctx: get("/api/statuses/"), None),
+    "edit_todo_list": (
+        lambda ctx: post(f"/api/statuses/edit/{ctx.pick('todo_lists')}/", {"title": ctx.word()}, "PUT"), None,
+    ),
+    "delete_todo_list": (lambda ctx: post(f"/api/statuses/delete/{ctx.new_todo_list()}/", {}, "DELETE"), None),
+    "add_task": (lambda ctx: post(f"/api/tasks/add/{ctx.pick('todo_lists')}/", {"label": ctx.word()}), None),
+    "toggle_task": (lambda ctx: post(f"/api/tasks/toggle/{ctx.pick('tasks')}/", {}, "PUT"), None),
+    "delete_task": (lambda ctx: post(f"/api/tasks/delete/{ctx.new_task()}/", {}, "DELETE"), None),
+    "bulk_tasks": (
+        lambda ctx: post(
+            f"/api/tasks/bulk/{ctx.pick('todo_lists')}/", {"tasks": [{"label": ctx.word()} for _ in range(20)]}
+        ),
+        None,
+    ),
+    "search": (lambda ctx: get(f"/api/search/?q={ctx.word()}"), None),
+    "search_prefix": (lambda ctx: get(f"/api/search/?q={ctx.word()[:3]}*"), None),
+    "export": (lambda ctx: get("/api/export/?format=ndjson&sections=subjects,notes"), None),
+    "sync": (lambda ctx: get("/api/sync/?page_size=200"), None),
+    "media_blob": (lambda ctx: get(f"/media/blobs/{ctx.blob_name()}"), None),
+    "metrics": (
+        lambda ctx: Call("GET", "/api/metrics/", headers={"Authorization": f"Bearer {ctx.transport.metrics_token}"}),
+        None,
+    ),
+    "async_get_user": (lambda ctx: get(f"/api/async/user/{ctx.user.id}/"), None),
+    "async_current_user": (lambda ctx: get("/api/async/current_user/"), None),
+    "async_get_subjects": (lambda ctx: get("/api/async/subjects/"), None),
+    "async_get_notes": (lambda ctx: get("/api/async/notes/fetch/"), None),
+    "async_get_projects": (lambda ctx: get("/api/async/projects/"), None),
+    "async_get_todo_lists": (lambda ctx: get("/api/async/statuses/"), None),
+    "async_career_recommendation": (lambda ctx: get("/api/async/career_recommendation/"), None),
+    "async_dashboard": (lambda ctx: get("/api/async/dashboard/?subjects_page_size=20&projects_page_size=20"), None),
+}
+
+
+def _queries_per_request(before, after, view):
+    queries = after.get(view, (0, 0))[0] - before.get(view, (0, 0))[0]
+    count = after.get(view, (0, 0))[1] - before.get(view, (0, 0))[1]
+    return round(queries / count, 2) if count else None
+
+
+def run_endpoint(ctx, name, requests, concurrency=1, warmup=3):
+    build, limit = ENDPOINTS[name]
+    if limit is not None:
+        requests, warmup = min(requests, limit), 0
+    transport = ctx.transport
+
+    def send(call):
+        start = time.perf_counter()
+        status, _ = transport.send(call.session or ctx.session, call)
+        return (time.perf_counter() - start) * 1000, status
+
+    for _ in range(warmup):
+        send(build(ctx))
+
+    # Requests are built up front so setup work for the delete endpoints stays out of the timings
+    calls = [build(ctx) for _ in range(requests)]
+    match = resolve(urlsplit(calls[0].path).path)
+    before = transport.query_totals()
+    start = time.perf_counter()
+    if transport.concurrent and concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(send, calls))
+    else:
+        results = [send(call) for call in calls]
+    elapsed = time.perf_counter() - start
+
+    result = summarize([latency for latency, _ in results], [status for _, status in results], elapsed)
+    result["view"] = match.url_name
+    result["queries_per_request"] = _queries_per_request(before, transport.query_totals(), match.url_name)
+    result["response_cache"] = hasattr(match.func, "response_cache")
+    return result
@@ -0,0 +1,90 @@
+import json
+import platform
+import statistics
+
+import django
+from django.db import connection
+from django.utils import timezone
+
+
+LATENCY_KEYS = ("p50_ms", "p95_ms", "p99_ms")
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(latencies_ms, statuses, elapsed_s):
+    latencies = sorted(latencies_ms)
+    return {
+        "requests": len(latencies),
+        "errors": sum(1 for status in statuses if status >= 400),
+        "throughput_rps": round(len(latencies) / elapsed_s, 1) if elapsed_s else None,
+        "mean_ms": round(statistics.mean(latencies), 3),
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+    }
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": connection.vendor,
+        "started_at": timezone.now().isoformat(),
+    }
+
+
+def load_report(path):
+    with open(path) as source:
+        return json.load(source)
+
+
+def write_report(report, path):
+    with open(path, "w") as output:
+        json.dump(report, output, indent=2, sort_keys=True)
+        output.write("\n")
+
+
+def _change(current, baseline):
+    if not baseline:
+        return None
+    return round((current - baseline) / baseline * 100, 1)
+
+
+def compare_reports(current, baseline, tolerance=0.2):
+    # Latency may drift by `tolerance` before it counts as a regression;
+    # query counts are deterministic, so any increase does
+    comparison = {"tolerance": tolerance}
+    regressions = []
+    for section in ("endpoints", "cached"):
+        comparison[section] = {}
+        for name, result in current.get(section, {}).items():
+            before = baseline.get(section, {}).get(name)
+            if before is None:
+                continue
+
+            metrics = {}
+            for key in LATENCY_KEYS + ("throughput_rps", "queries_per_request"):
+                if result.get(key) is None or before.get(key) is None:
+                    continue
+                metrics[key] = {
+                    "baseline": before[key], "current": result[key], "change_pct": _change(result[key], before[key]),
+                }
+
+                if key in LATENCY_KEYS:
+                    regressed = result[key] > before[key] * (1 + tolerance)
+                elif key == "throughput_rps":
+                    regressed = result[key] < before[key] * (1 - tolerance)
+                else:
+                    regressed = result[key] > before[key]
+                if regressed:
+                    label = name if section == "endpoints" else f"{name} (cached)"
+                    regressions.append(f"{label} {key}: {before[key]} -> {result[key]}")
+            comparison[section][name] = metrics
+
+    comparison["regressions"] = regressions
+    comparison["missing"] = sorted(set(baseline.get("endpoints", {})) - set(current["endpoints"]))
+    return comparison
@@ -0,0 +1,275 @@
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+from decimal import Decimal
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from ..imports import import_subjects, subject_reader
+from ..search import parse_query, search_page, search_results
+from ..renderers import FastJsonResponse, use_fast_encoder
+from ..serializers import attach_subject_notes, serialize_subjects
+from ..signals import suspend_grade_aggregates
+from .base import BenchmarkError, create_bench_user, login_client, measure, timed_calls
+from .data import seed_notes, seed_search_notes, seed_subjects, seed_todo_lists, write_subject_csv
+
+
+def compare_scales(name, path, seed, small, large, repeat):
+    results = []
+    users = []
+    try:
+        for size in (small, large):
+            user = create_bench_user()
+            users.append(user)
+            seed(user, size)
+            result = measure(login_client(user), path, repeat)
+            result["rows"] = size
+            results.append(result)
+    finally:
+        for user in users:
+            user.delete()
+
+    if results[0]["queries"] != results[-1]["queries"]:
+        raise BenchmarkError(
+            f"{name} query count grew with data: "
+            f"{results[0]['queries']} queries for {small} rows, "
+            f"{results[-1]['queries']} for {large}"
+        )
+    return results
+
+
+def bench_todo_lists(scale=1000, tasks_per_list=20, repeat=5):
+    return compare_scales(
+        "get_todo_lists", "/api/statuses/",
+        lambda user, size: seed_todo_lists(user, size, tasks_per_list),
+        10, scale, repeat,
+    )
+
+
+def bench_subjects(scale=300, notes_per_subject=30, repeat=5):
+    return compare_scales(
+        "get_subjects", "/api/subjects/",
+        lambda user, size: seed_subjects(user, size, notes_per_subject),
+        10, scale, repeat,
+    )
+
+
+def bench_bulk(scale=500, repeat=1):
+    subjects = [
+        {"subject_name": f"Subject {i}", "category": "Programming", "grade": 75, "status": "Ongoing"}
+        for i in range(scale)
+    ]
+    user = create_bench_user()
+    try:
+        client = login_client(user)
+        single = timed_calls(client, [("/api/subjects/add/", subject) for subject in subjects])
+        batch = timed_calls(client, [("/api/subjects/bulk/", {"subjects": subjects})])
+    finally:
+        user.delete()
+    return {
+        "subjects": scale,
+        "single": single,
+        "batch": batch,
+        "speedup": round(single["total_ms"] / batch["total_ms"], 1),
+    }
+
+
+def _synthetic_subject_rows(count, notes_per_subject):
+    now = timezone.now()
+    subject_rows = [
+        (i, 1, "Programming", f"Subject {i}", "Description", Decimal("88.50"), "1st", "2025-2026",
+         "Ongoing", "HIGH", now)
+        for i in range(count)
+    ]
+    note_rows = [
+        (i * notes_per_subject + j, i, f"Note {j}", "Lorem ipsum dolor sit amet", now)
+        for i in range(count)
+        for j in range(notes_per_subject)
+    ]
+    return subject_rows, note_rows
+
+
+def _legacy_render(subject_rows, note_rows):
+    data = []
+    notes_by_subject = {}
+    for row in subject_rows:
+        notes_by_subject[row[0]] = []
+        data.append({
+            "id": row[0], "user": row[1], "category": row[2], "subject_name": row[3], "description": row[4],
+            "grade": str(row[5]) if row[5] else None, "semester": row[6], "school_year": row[7],
+            "status": row[8], "priority": row[9], "notes": notes_by_subject[row[0]],
+        })
+    for note_id, subject_id, title, content, created_at in note_rows:
+        notes_by_subject[subject_id].append({
+            "id": note_id, "title": title, "content": content,
+            "created_at": created_at.strftime("%Y-%m-%d %H:%M:%S"),
+        })
+    return JsonResponse({"success": True, "subjects": data}).content
+
+
+def _fast_render(subject_rows, note_rows):
+    data, notes_by_subject = serialize_subjects(subject_rows)
+    attach_subject_notes(notes_by_subject, note_rows)
+    return FastJsonResponse({"success": True, "subjects": data}).content
+
+
+def bench_render(scale=10000, notes_per_subject=3, repeat=5):
+    subject_rows, note_rows = _synthetic_subject_rows(scale, notes_per_subject)
+    results = {"subjects": scale, "notes": len(note_rows), "fast_encoder": use_fast_encoder()}
+    for name, render in (("legacy", _legacy_render), ("renderer", _fast_render)):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            content = render(subject_rows, note_rows)
+            timings.append((time.perf_counter() - start) * 1000)
+        results[name] = {"mean_ms": round(statistics.mean(timings), 3), "bytes": len(content)}
+    results["speedup"] = round(results["legacy"]["mean_ms"] / results["renderer"]["mean_ms"], 1)
+    return results
+
+
+def stream_export(client, path):
+    response = client.get(path)
+    if response.status_code != 200:
+        raise BenchmarkError(f"GET {path} returned {response.status_code}")
+
+    size = 0
+    # The rows are only fetched while the stream is consumed. DEBUG would keep
+    # every one of those statements in memory and swamp the measurement.
+    with override_settings(DEBUG=False):
+        tracemalloc.start()
+        try:
+            start = time.perf_counter()
+            for chunk in response.streaming_content:
+                size += len(chunk)
+            elapsed = (time.perf_counter() - start) * 1000
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+            response.close()
+    return {"path": path, "bytes": size, "total_ms": round(elapsed, 3), "peak_kb": peak // 1024}
+
+
+def bench_export(scale=100000, repeat=1, ceiling_mb=32):
+    results = []
+    for size in (1000, scale):
+        user = create_bench_user()
+        try:
+            seed_notes(user, size)
+            client = login_client(user)
+            for export_format in ("ndjson", "csv"):
+                result = stream_export(client, f"/api/export/?format={export_format}&sections=notes")
+                result["rows"] = size
+                results.append(result)
+        finally:
+            with suspend_grade_aggregates():
+                user.delete()
+
+    for result in results:
+        if result["peak_kb"] > ceiling_mb * 1024:
+            raise BenchmarkError(
+                f"Exporting {result['rows']} notes peaked at {result['peak_kb']} KiB, over {ceiling_mb} MiB"
+            )
+    return results
+
+
+def bench_import(scale=100000, repeat=1, batch_size=None):
+    fd, path = tempfile.mkstemp(suffix=".csv")
+    os.close(fd)
+    user = create_bench_user()
+    try:
+        write_subject_csv(path, scale)
+        # DEBUG keeps every executed statement in memory, which would swamp the measurement
+        with open(path, encoding="utf-8-sig", newline="") as source, override_settings(DEBUG=False):
+            tracemalloc.start()
+            try:
+                start = time.perf_counter()
+                result = import_subjects(user.id, subject_reader(source), batch_size)
+                elapsed = time.perf_counter() - start
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+    finally:
+        # The aggregates go with the user, so skip the per-subject signal updates
+        with suspend_grade_aggregates():
+            user.delete()
+        os.remove(path)
+
+    return {
+        "rows": scale,
+        "created": result["created"],
+        "failed": result["failed"],
+        "total_ms": round(elapsed * 1000, 3),
+        "rows_per_s": round(scale / elapsed, 1),
+        "peak_kb": peak // 1024,
+    }
+
+
+def bench_search(scale=100000, repeat=20, page_size=20, target_ms=250):
+    user = create_bench_user()
+    try:
+        words = seed_search_notes(user, scale)
+        queries = {
+            "term": words[42],
+            "two_terms": f"{words[42]} {words[42 * 7 % len(words)]}",
+            "prefix": words[42][:4] + "*",
+        }
+        results = {"notes": scale}
+        for name, query in queries.items():
+            terms = parse_query(query)
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                rows, _ = search_page(user.id, terms, None, None, page_size)
+                search_results(rows)
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            results[name] = {
+                "query": query,
+                "hits": len(rows),
+                "p50_ms": round(timings[len(timings) // 2], 3),
+                "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+            }
+    finally:
+        user.delete()
+
+    slow = [name for name in queries if results[name]["p95_ms"] > target_ms]
+    if slow:
+        raise BenchmarkError(f"p95 over {target_ms} ms for {', '.join(slow)} queries on {scale} notes")
+    return results
+
+
+def bench_sessions(scale=None, repeat=20):
+    user = create_bench_user()
+    results = {}
+    try:
+        for backend, engine in settings.SESSION_ENGINES.items():
+            with override_settings(SESSION_ENGINE=engine):
+                client = login_client(user)
+                client.get("/api/current_user/")
+                result = measure(client, "/api/current_user/", repeat)
+                result.pop("bytes")
+                results[backend] = result
+    finally:
+        user.delete()
+
+    baseline = results["db"]["queries"]
+    for backend, result in results.items():
+        result["saved_queries"] = baseline - result["queries"]
+    return results
+
+
+SCENARIOS = {
+    "bulk": bench_bulk,
+    "export": bench_export,
+    "import": bench_import,
+    "render": bench_render,
+    "search": bench_search,
+    "sessions": bench_sessions,
+    "subjects": bench_subjects,
+    "todo_lists": bench_todo_lists,
+}
@@ -0,0 +1,238 @@
+import http.client
+import json
+import os
+import re
+import secrets
+import socket
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.cookies import SimpleCookie
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.servers.basehttp import ThreadedWSGIServer
+from django.db import connection, connections
+from django.test import Client
+from django.test.testcases import QuietWSGIRequestHandler
+
+from ..metrics import query_totals
+from .base import BenchmarkError
+
+try:
+    import uvicorn
+except ImportError:
+    uvicorn = None
+
+
+class Call:
+    def __init__(self, method, path, body=b"", content_type="application/json", session=None, headers=None):
+        self.method = method
+        self.path = path
+        self.body = body
+        self.content_type = content_type
+        self.session = session
+        self.headers = headers or {}
+
+
+class ClientTransport:
+    # Django's test client: no sockets or server threads, one request at a time
+    name = "client"
+    concurrent = False
+
+    def __init__(self):
+        self.metrics_token = getattr(settings, "METRICS_TOKEN", None) or ""
+
+    def new_session(self):
+        return Client(HTTP_HOST="localhost")
+
+    def send(self, session, call):
+        response = session.generic(
+            call.method, call.path, call.body, content_type=call.content_type, headers=call.headers
+        )
+        if response.streaming:
+            size = sum(len(chunk) for chunk in response.streaming_content)
+            response.close()
+        else:
+            size = len(response.content)
+        return response.status_code, size
+
+    def query_totals(self):
+        return query_totals()
+
+
+_METRIC_LINE = re.compile(r'^http_request_db_queries_(sum|count)\{view="((?:[^"\\]|\\.)*)"\} (\S+)$')
+
+
+class HttpTransport:
+    # Keeps one keep-alive connection per worker thread. With in_process the
+    # server shares this process's metrics registry; otherwise query counts
+    # are scraped from the server's /api/metrics/, which only add up when it
+    # runs a single worker process.
+    concurrent = True
+
+    def __init__(self, base_url, name="url", in_process=False, metrics_token=None):
+        self.url = urlsplit(base_url)
+        self.name = name
+        self.in_process = in_process
+        self.metrics_token = metrics_token or getattr(settings, "METRICS_TOKEN", None) or ""
+        self.local = threading.local()
+
+    def _connection(self, fresh=False):
+        conn = getattr(self.local, "conn", None)
+        if conn is None or fresh:
+            if conn is not None:
+                conn.close()
+            connection_class = http.client.HTTPSConnection if self.url.scheme == "https" else http.client.HTTPConnection
+            conn = self.local.conn = connection_class(self.url.netloc, timeout=60)
+            conn.connect()
+            # Without this small writes wait on delayed ACKs and every request picks up ~40ms
+            conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return conn
+
+    def new_session(self):
+        return SimpleCookie()
+
+    def _request(self, call, headers):
+        for attempt in range(2):
+            conn = self._connection(fresh=attempt > 0)
+            try:
+                conn.request(call.method, call.path, body=call.body or None, headers=headers)
+                response = conn.getresponse()
+                body = response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # The server closed an idle keep-alive connection; retry once on a new one
+                if attempt:
+                    raise
+                continue
+            if response.getheader("Connection", "").lower() == "close" or response.version == 10:
+                self._connection(fresh=True)
+            return response, body
+
+    def send(self, session, call):
+        headers = {"Content-Type": call.content_type, "Host": self.url.netloc, **call.headers}
+        if session:
+            headers["Cookie"] = "; ".join(f"{key}={morsel.value}" for key, morsel in session.items())
+        response, body = self._request(call, headers)
+        for header in response.headers.get_all("Set-Cookie") or []:
+            session.load(header)
+        return response.status, len(body)
+
+    def query_totals(self):
+        if self.in_process:
+            return query_totals()
+
+        status, text = self._scrape()
+        if status != 200:
+            return {}
+        totals = {}
+        for line in text.splitlines():
+            match = _METRIC_LINE.match(line)
+            if match:
+                kind, view, value = match.groups()
+                total, count = totals.get(view, (0, 0))
+                totals[view] = (float(value), count) if kind == "sum" else (total, int(value))
+        return totals
+
+    def _scrape(self):
+        headers = {"Host": self.url.netloc, "Authorization": f"Bearer {self.metrics_token}"}
+        response, body = self._request(Call("GET", "/api/metrics/"), headers)
+        return response.status, body.decode()
+
+
+class _NoDelayRequestHandler(QuietWSGIRequestHandler):
+    def setup(self):
+        super().setup()
+        # Like production servers: otherwise Nagle holds back each response
+        # on a keep-alive connection until the client's delayed ACK (~40ms)
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+def _free_socket():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("127.0.0.1", 0))
+    return sock
+
+
+@contextmanager
+def wsgi_server():
+    from django.core.wsgi import get_wsgi_application
+
+    httpd = ThreadedWSGIServer(("127.0.0.1", 0), _NoDelayRequestHandler, allow_reuse_address=False)
+    httpd.set_app(get_wsgi_application())
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+        thread.join()
+
+
+@contextmanager
+def asgi_server(application="backend.bench_asgi:application", overrides=None):
+    # A separate process: uvicorn on a thread of this one shares its GIL with
+    # the load generator and adds tens of milliseconds to every request
+    if uvicorn is None:
+        raise BenchmarkError("The asgi transport needs uvicorn installed")
+    if connection.vendor == "sqlite" and connection.is_in_memory_db():
+        raise BenchmarkError("The asgi transport cannot share an in-memory database; give the test database a NAME")
+
+    sock = _free_socket()
+    port = sock.getsockname()[1]
+    sock.close()
+    # The server only exposes /api/metrics/ with a token; hand it one
+    token = getattr(settings, "METRICS_TOKEN", None) or secrets.token_urlsafe()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", application, "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=settings.BASE_DIR,
+        env={
+            **os.environ,
+            "METRICS_TOKEN": token,
+            # Whichever databases this process benchmarks, test ones included
+            "BENCH_DATABASE_NAMES": json.dumps({conn.alias: conn.settings_dict["NAME"] for conn in connections.all()}),
+            "BENCH_SETTINGS": json.dumps(overrides or {}),
+        },
+    )
+    try:
+        deadline = time.monotonic() + 15
+        while True:
+            if process.poll() is not None or time.monotonic() > deadline:
+                raise BenchmarkError("The ASGI server did not start")
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+        yield f"http://127.0.0.1:{port}", token
+    finally:
+        process.terminate()
+        process.wait(10)
+
+
+@contextmanager
+def transport_for(name, base_url=None, overrides=None):
+    # overrides are settings for the server: applied in this process, and
+    # handed to the uvicorn child; a server at a URL keeps its own
+    if name == "client":
+        yield ClientTransport()
+    elif name == "wsgi":
+        with wsgi_server() as url:
+            yield HttpTransport(url, name, in_process=True)
+    elif name == "asgi":
+        with asgi_server(overrides=overrides) as (url, token):
+            yield HttpTransport(url, name, metrics_token=token)
+    elif name == "url":
+        if not base_url:
+            raise BenchmarkError("The url transport needs a base URL")
+        yield HttpTransport(base_url)
+    else:
+        raise BenchmarkError(f"Unknown transport: {name}")
+
+
+TRANSPORTS = ("client", "wsgi", "asgi", "url")
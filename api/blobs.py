@@ -0,0 +1,139 @@
+import hashlib
+import mimetypes
+import os
+import re
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import MediaBlob
+
+
+BLOB_DIR = "blobs"
+BLOB_NAME_RE = re.compile(r"^([0-9a-f]{64})(\.[a-z0-9]{1,8})$")
+BLOB_MAX_AGE = 365 * 24 * 60 * 60
+
+
+def _root():
+    return os.path.join(settings.MEDIA_ROOT, BLOB_DIR)
+
+
+def blob_path(name):
+    # Fan out over two directory levels so no directory grows past a few
+    # thousand entries
+    return os.path.join(_root(), name[:2], name[2:4], name)
+
+
+def blob_url(name):
+    return reverse("media-blob", args=[name])
+
+
+def parse_blob_name(name):
+    match = BLOB_NAME_RE.match(name or "")
+    if match is None:
+        return None
+    return match.group(1), match.group(2)
+
+
+def content_type(name):
+    return mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+
+def _partial_path():
+    os.makedirs(_root(), exist_ok=True)
+    return os.path.join(_root(), f"{uuid.uuid4().hex}.part")
+
+
+def store_chunks(chunks, extension):
+    # Hash while writing so the upload is read exactly once; identical
+    # content is kept on disk only once whatever it was uploaded as
+    partial = _partial_path()
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(partial, "wb") as f:
+            for chunk in chunks:
+                digest.update(chunk)
+                size += len(chunk)
+                f.write(chunk)
+        return _publish(partial, digest.hexdigest(), extension.lower(), size)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+
+
+def store_file(path, extension):
+    with open(path, "rb") as f:
+        return store_chunks(iter(lambda: f.read(64 * 1024), b""), extension)
+
+
+def _publish(partial, digest, extension, size):
+    blob, created = MediaBlob.objects.get_or_create(
+        digest=digest, defaults={"extension": extension, "size": size}
+    )
+    if not created:
+        # Pushes the orphan grace period forward for a blob about to be referenced again
+        MediaBlob.objects.filter(pk=blob.pk).update(updated_at=timezone.now())
+
+    path = blob_path(blob.name)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(partial, path)
+    return blob
+
+
+def acquire(digests):
+    if digests:
+        MediaBlob.objects.filter(digest__in=set(digests)).update(
+            refcount=F("refcount") + 1, updated_at=timezone.now()
+        )
+
+
+def release(digests):
+    if digests:
+        MediaBlob.objects.filter(digest__in=set(digests), refcount__gt=0).update(
+            refcount=F("refcount") - 1, updated_at=timezone.now()
+        )
+
+
+def orphan_cutoff(grace=None):
+    if grace is None:
+        grace = timedelta(seconds=getattr(settings, "BLOB_ORPHAN_GRACE", 24 * 60 * 60))
+    return timezone.now() - grace
+
+
+def delete_orphan(blob, cutoff):
+    # Re-checked in the DELETE so a blob referenced since it was listed survives
+    deleted, _ = MediaBlob.objects.filter(pk=blob.pk, refcount=0, updated_at__lt=cutoff).delete()
+    if deleted:
+        path = blob_path(blob.name)
+        if os.path.exists(path):
+            os.remove(path)
+    return bool(deleted)
+
+
+def stray_files(cutoff):
+    # Files under media/blobs with no MediaBlob row, e.g. left by a crash
+    # between writing the file and creating the row
+    root = _root()
+    if not os.path.isdir(root):
+        return
+    known = None
+    cutoff = cutoff.timestamp()
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            if os.path.getmtime(path) >= cutoff:
+                continue
+            parsed = parse_blob_name(filename)
+            if parsed is None:
+                yield path
+                continue
+            if known is None:
+                known = set(MediaBlob.objects.values_list("digest", flat=True))
+            if parsed[0] not in known:
+                yield path
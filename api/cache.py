@@ -0,0 +1,152 @@
+import hashlib
+import time
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import parse_etags
+
+from .routers import pin_user
+
+
+def _cache():
+    return caches[getattr(settings, "RESPONSE_CACHE_ALIAS", "default")]
+
+
+def _timeout():
+    # Read per request so tests and benchmarks can switch the cache off
+    return getattr(settings, "RESPONSE_CACHE_TIMEOUT", 300)
+
+
+def _version_key(user_id):
+    return f"user-version:{user_id}"
+
+
+def get_user_version(user_id):
+    cache = _cache()
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock so a version lost to eviction is never reused
+        version = time.time_ns()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+async def aget_user_version(user_id):
+    cache = _cache()
+    key = _version_key(user_id)
+    version = await cache.aget(key)
+    if version is None:
+        version = time.time_ns()
+        if not await cache.aadd(key, version, None):
+            version = await cache.aget(key, version)
+    return version
+
+
+def bump_user_version(user_id):
+    # Pin first: whoever reads the new version then reads from the primary
+    pin_user(user_id)
+    cache = _cache()
+    key = _version_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), None)
+
+
+def _response_key(request, user_id, endpoint, version):
+    query = hashlib.sha1(request.GET.urlencode().encode()).hexdigest()
+    key = f"response:{user_id}:{endpoint}:{version}:{query}"
+    etag = '"%s"' % hashlib.sha1(key.encode()).hexdigest()
+    return key, etag
+
+
+def etag_matches(request, etag):
+    # If-None-Match compares weakly (W/"x" matches "x") and * matches any
+    # current representation
+    etags = parse_etags(request.headers.get("If-None-Match", ""))
+    if etags == ["*"]:
+        return True
+    return etag.removeprefix("W/") in {tag.removeprefix("W/") for tag in etags}
+
+
+def _not_modified(request, etag):
+    if not etag_matches(request, etag):
+        return None
+    response = HttpResponseNotModified()
+    response["ETag"] = etag
+    return response
+
+
+def _from_cache(cached):
+    content_type, content = cached
+    return HttpResponse(content, content_type=content_type)
+
+
+def _to_cache(response):
+    return response["Content-Type"], response.content
+
+
+def _finalize(response, etag):
+    response["ETag"] = etag
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def cached_user_response(endpoint):
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                timeout = _timeout()
+                user_id = await request.session.aget("user_id")
+                if request.method != "GET" or not user_id or not timeout:
+                    return await view(request, *args, **kwargs)
+
+                key, etag = _response_key(request, user_id, endpoint, await aget_user_version(user_id))
+                not_modified = _not_modified(request, etag)
+                if not_modified is not None:
+                    return not_modified
+
+                cache = _cache()
+                cached = await cache.aget(key)
+                if cached is not None:
+                    return _finalize(_from_cache(cached), etag)
+
+                response = await view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                await cache.aset(key, _to_cache(response), timeout)
+                return _finalize(response, etag)
+            async_wrapper.response_cache = endpoint
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            timeout = _timeout()
+            user_id = request.session.get("user_id")
+            if request.method != "GET" or not user_id or not timeout:
+                return view(request, *args, **kwargs)
+
+            key, etag = _response_key(request, user_id, endpoint, get_user_version(user_id))
+            not_modified = _not_modified(request, etag)
+            if not_modified is not None:
+                return not_modified
+
+            cache = _cache()
+            cached = cache.get(key)
+            if cached is not None:
+                return _finalize(_from_cache(cached), etag)
+
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            cache.set(key, _to_cache(response), timeout)
+            return _finalize(response, etag)
+        wrapper.response_cache = endpoint
+        return wrapper
+    return decorator
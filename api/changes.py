@@ -0,0 +1,157 @@
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .export import EXPORT_SECTIONS
+from .models import DeletionLog, Note, Task
+from .pagination import InvalidCursor, decode_values, encode_values, paginate
+
+
+SYNC_PAGE_SIZE = 500
+MAX_SYNC_PAGE_SIZE = 2000
+
+# Changed rows of each section in turn, then the tombstones
+SYNC_STAGES = tuple(EXPORT_SECTIONS) + ("deleted",)
+
+# Deleting one of these cascades to the children without signals
+CASCADES = {
+    DeletionLog.Kind.SUBJECT: (DeletionLog.Kind.NOTE, Note, "subject_id"),
+    DeletionLog.Kind.TODO_LIST: (DeletionLog.Kind.TASK, Task, "todo_list_id"),
+}
+
+
+class InvalidSync(ValueError):
+    pass
+
+
+class SyncExpired(InvalidSync):
+    pass
+
+
+def record_deletions(user_id, kind, ids):
+    # Call inside the deleting transaction and before the delete, so the
+    # cascaded children can still be looked up
+    ids = list(ids)
+    if not ids:
+        return
+    now = timezone.now()
+    rows = [DeletionLog(user_id=user_id, kind=kind, object_id=pk, deleted_at=now) for pk in ids]
+    if kind in CASCADES:
+        child_kind, model, field = CASCADES[kind]
+        children = model.objects.filter(**{f"{field}__in": ids}).values_list("id", flat=True)
+        rows += [DeletionLog(user_id=user_id, kind=child_kind, object_id=pk, deleted_at=now) for pk in children]
+    DeletionLog.objects.bulk_create(rows, batch_size=500)
+
+
+def retention_cutoff(retention=None):
+    if retention is None:
+        retention = timedelta(seconds=getattr(settings, "DELETION_LOG_RETENTION", 30 * 24 * 60 * 60))
+    return timezone.now() - retention
+
+
+def encode_watermark(moment):
+    return encode_values(moment.isoformat())
+
+
+def _decode_moment(value):
+    moment = datetime.fromisoformat(value)
+    if timezone.is_naive(moment):
+        raise ValueError("naive datetime")
+    return moment
+
+
+def _watermark(value):
+    try:
+        (moment,) = decode_values(value)
+        return _decode_moment(moment)
+    except (InvalidCursor, ValueError, TypeError) as e:
+        raise InvalidSync("Invalid since") from e
+
+
+def _cursor(value):
+    try:
+        since, until, stage, updated_at, pk = decode_values(value)
+        after = (_decode_moment(updated_at), int(pk)) if updated_at is not None else None
+        if not 0 <= stage < len(SYNC_STAGES):
+            raise ValueError("stage out of range")
+        return (_decode_moment(since) if since else None), _decode_moment(until), (stage, after)
+    except (InvalidCursor, ValueError, TypeError) as e:
+        raise InvalidSync("Invalid cursor") from e
+
+
+def _encode_cursor(since, until, position):
+    stage, after = position
+    updated_at, pk = (after[0].isoformat(), after[1]) if after else (None, None)
+    return encode_values(since.isoformat() if since else None, until.isoformat(), stage, updated_at, pk)
+
+
+def sync_params(params):
+    # A sync covers the fixed window (since, until]; every page of it carries
+    # the window in its cursor so rows changed meanwhile wait for the next one
+    value = params.get("page_size")
+    try:
+        size = int(value) if value else SYNC_PAGE_SIZE
+    except ValueError as e:
+        raise InvalidSync("Invalid page_size") from e
+    size = max(1, min(size, MAX_SYNC_PAGE_SIZE))
+
+    if params.get("cursor"):
+        since, until, position = _cursor(params["cursor"])
+        return since, until, position, size
+
+    since = _watermark(params["since"]) if params.get("since") else None
+    if since is not None and since < retention_cutoff():
+        raise SyncExpired("since is older than the deletion log; sync again without it")
+    # Rows are stamped with the app server's clock before their transaction
+    # commits, so stop SYNC_CLOCK_SKEW short of now: anything still in flight
+    # (or stamped by a server running slightly behind) lands in the next window
+    until = timezone.now() - timedelta(seconds=getattr(settings, "SYNC_CLOCK_SKEW", 5))
+    if since is not None:
+        until = max(until, since)
+    return since, until, (0, None), size
+
+
+def _changed(user_id, stage, since, until):
+    if SYNC_STAGES[stage] == "deleted":
+        rows = DeletionLog.objects.filter(user_id=user_id, deleted_at__lte=until)
+        if since is not None:
+            rows = rows.filter(deleted_at__gt=since)
+        return rows.values_list("id", "kind", "object_id", "deleted_at"), ("deleted_at", "id")
+
+    model, owner, fields = EXPORT_SECTIONS[SYNC_STAGES[stage]]
+    rows = model.objects.filter(**{owner: user_id}, updated_at__lte=until)
+    if since is not None:
+        rows = rows.filter(updated_at__gt=since)
+    return rows.values_list(*fields), ("updated_at", "id")
+
+
+def sync_page(user_id, since, until, position, size):
+    stage, after = position
+    changes = {section: [] for section in EXPORT_SECTIONS}
+    deleted = []
+    # A first sync has nothing to delete on the client
+    last_stage = len(SYNC_STAGES) - (1 if since is None else 0)
+
+    while stage < last_stage and size > 0:
+        rows, order = _changed(user_id, stage, since, until)
+        rows = list(paginate(rows, (after, size), fields=order))
+        more = len(rows) > size
+        rows = rows[:size]
+        size -= len(rows)
+
+        if SYNC_STAGES[stage] == "deleted":
+            deleted += [{"kind": kind, "id": pk, "deleted_at": deleted_at} for _, kind, pk, deleted_at in rows]
+            ordered_by = 3
+        else:
+            fields = EXPORT_SECTIONS[SYNC_STAGES[stage]][2]
+            changes[SYNC_STAGES[stage]] += [dict(zip(fields, row)) for row in rows]
+            ordered_by = fields.index("updated_at")
+
+        if more:
+            return changes, deleted, _encode_cursor(since, until, (stage, (rows[-1][ordered_by], rows[-1][0])))
+        stage, after = stage + 1, None
+
+    if stage < last_stage:
+        return changes, deleted, _encode_cursor(since, until, (stage, None))
+    return changes, deleted, None
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core import checks
+from django.utils.module_loading import import_string
+
+from .events import CacheBackend
+
+
+@checks.register()
+def check_events_backend(app_configs, **kwargs):
+    # The backend is only built on the first event, so catch a broken setup at
+    # startup instead of in the first write after a deploy
+    path = getattr(settings, "EVENTS_BACKEND", "api.events.LocalBackend")
+    try:
+        backend = import_string(path)
+    except ImportError as e:
+        return [checks.Error(f"EVENTS_BACKEND cannot be imported: {e}", id="api.E001")]
+    if issubclass(backend, CacheBackend):
+        problem = backend.configuration_problem()
+        if problem:
+            return [checks.Error(
+                problem, hint="api.events.LocalBackend needs no cache but only works within one process", id="api.E002"
+            )]
+    return []
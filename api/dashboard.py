@@ -0,0 +1,100 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+from .aggregates import category_averages
+from .metrics import capture_queries
+from .pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate, split_page
+from .queries import (
+    subjects_for, notes_for_subjects, projects_for, todo_lists_for, tasks_for_lists, sort_subjects, subject_row_key,
+)
+from .serializers import (
+    serialize_subjects, attach_subject_notes, serialize_project, serialize_todo_lists, recommendation_payload,
+)
+
+
+class InvalidDashboard(ValueError):
+    pass
+
+
+def _page_size(params, section):
+    value = params.get(f"{section}_page_size")
+    try:
+        size = int(value) if value else DEFAULT_PAGE_SIZE
+    except ValueError as e:
+        raise InvalidDashboard(f"Invalid {section}_page_size") from e
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def subjects_section(user_id, size):
+    subjects, fields = sort_subjects(subjects_for(user_id), None)
+    page = (None, size)
+    subjects, next_cursor = split_page(paginate(subjects, page, fields=fields), page, subject_row_key(None))
+    data, notes_by_subject = serialize_subjects(subjects)
+    attach_subject_notes(notes_by_subject, notes_for_subjects(notes_by_subject))
+    return {"items": data, "next_cursor": next_cursor}
+
+
+def projects_section(user_id, size):
+    page = (None, size)
+    projects, next_cursor = split_page(
+        paginate(projects_for(user_id), page, descending=True), page, lambda project: (project.created_at, project.id)
+    )
+    return {"items": [serialize_project(project) for project in projects], "next_cursor": next_cursor}
+
+
+def todo_lists_section(user_id, size):
+    page = (None, size)
+    todo_lists, next_cursor = split_page(
+        paginate(todo_lists_for(user_id), page, descending=True), page, lambda row: (row["created_at"], row["id"])
+    )
+    tasks = tasks_for_lists([todo_list["id"] for todo_list in todo_lists])
+    return {"items": serialize_todo_lists(todo_lists, tasks), "next_cursor": next_cursor}
+
+
+def recommendation_section(user_id, size):
+    return recommendation_payload(category_averages(user_id))
+
+
+# name -> builds the section for (user_id, page size). Paged sections return
+# the same cursors as their own endpoints, so a client can keep scrolling there.
+DASHBOARD_SECTIONS = {
+    "subjects": subjects_section,
+    "projects": projects_section,
+    "todo_lists": todo_lists_section,
+    "recommendation": recommendation_section,
+}
+
+
+def dashboard_params(params):
+    sections = [section for section in params.get("sections", "").split(",") if section] or list(DASHBOARD_SECTIONS)
+    unknown = [section for section in sections if section not in DASHBOARD_SECTIONS]
+    if unknown:
+        raise InvalidDashboard(f"Unknown sections: {', '.join(unknown)}")
+    return {section: _page_size(params, section) for section in dict.fromkeys(sections)}
+
+
+def build_dashboard(user_id, sections):
+    return {section: DASHBOARD_SECTIONS[section](user_id, size) for section, size in sections.items()}
+
+
+def _in_worker(build, user_id, size):
+    # Each section runs on its own thread and database connection; clean up
+    # the way Django does around a request since no request signals fire here
+    close_old_connections()
+    try:
+        with capture_queries():
+            return build(user_id, size)
+    finally:
+        close_old_connections()
+
+
+async def abuild_dashboard(user_id, sections):
+    # The async ORM funnels every query through one shared thread, which
+    # would run the sections back to back, so give each a thread of its own
+    results = await asyncio.gather(*(
+        sync_to_async(_in_worker, thread_sensitive=False)(DASHBOARD_SECTIONS[section], user_id, size)
+        for section, size in sections.items()
+    ))
+    return dict(zip(sections, results))
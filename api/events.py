@@ -0,0 +1,232 @@
+import asyncio
+import threading
+import time
+from collections import deque
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+class EventBackend:
+    # Every user has their own sequence of events numbered from 1. read()
+    # returns (events after `after`, the last id, whether some were lost in
+    # between), lost meaning they aged out or the ids were reset.
+    def __init__(self):
+        self.backlog = getattr(settings, "EVENTS_BACKLOG", 100)
+
+    def publish(self, user_id, event):
+        raise NotImplementedError
+
+    def latest(self, user_id):
+        raise NotImplementedError
+
+    async def alatest(self, user_id):
+        return await sync_to_async(self.latest, thread_sensitive=False)(user_id)
+
+    def read(self, user_id, after):
+        raise NotImplementedError
+
+    async def wait(self, user_id, after, timeout):
+        raise NotImplementedError
+
+
+class _Stream:
+    def __init__(self, backlog):
+        self.events = deque(maxlen=backlog)
+        self.last_id = 0
+        self.waiters = set()
+        self.touched = time.monotonic()
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class LocalBackend(EventBackend):
+    # Only subscribers in the publishing process hear about an event. A
+    # user's stream is dropped after EVENTS_TTL seconds without a publish or
+    # a subscriber rather than kept for every user who ever wrote.
+    def __init__(self):
+        super().__init__()
+        self.lock = threading.Lock()
+        self.streams = {}
+        self.ttl = getattr(settings, "EVENTS_TTL", 300)
+        self.pruned_at = time.monotonic()
+
+    def _stream(self, user_id):
+        now = time.monotonic()
+        if now - self.pruned_at > self.ttl:
+            self.pruned_at = now
+            idle = [
+                uid for uid, stream in self.streams.items() if not stream.waiters and now - stream.touched > self.ttl
+            ]
+            for uid in idle:
+                del self.streams[uid]
+        stream = self.streams.get(user_id)
+        if stream is None:
+            stream = self.streams[user_id] = _Stream(self.backlog)
+        stream.touched = now
+        return stream
+
+    def publish(self, user_id, event):
+        with self.lock:
+            stream = self._stream(user_id)
+            stream.last_id += 1
+            stream.events.append((stream.last_id, event))
+            waiters, stream.waiters = stream.waiters, set()
+            event_id = stream.last_id
+        # Publishers are sync views on other threads; subscribers sit on an event loop
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, future)
+            except RuntimeError:
+                pass
+        return event_id
+
+    def latest(self, user_id):
+        with self.lock:
+            stream = self.streams.get(user_id)
+            return stream.last_id if stream else 0
+
+    async def alatest(self, user_id):
+        return self.latest(user_id)
+
+    def _read(self, user_id, after):
+        stream = self.streams.get(user_id)
+        if stream is None:
+            return [], 0, after > 0
+        oldest = stream.events[0][0] if stream.events else stream.last_id + 1
+        if after > stream.last_id or after < oldest - 1:
+            return [], stream.last_id, True
+        return [(event_id, event) for event_id, event in stream.events if event_id > after], stream.last_id, False
+
+    def read(self, user_id, after):
+        with self.lock:
+            return self._read(user_id, after)
+
+    async def wait(self, user_id, after, timeout):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self.lock:
+            result = self._read(user_id, after)
+            if result[0] or result[2]:
+                return result
+            waiter = (loop, future)
+            self._stream(user_id).waiters.add(waiter)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self.lock:
+                self.streams[user_id].waiters.discard(waiter)
+        return self.read(user_id, after)
+
+
+# Caches whose add() and incr() are atomic across processes. The others
+# (file, database, locmem) would hand two publishers the same event id.
+ATOMIC_CACHE_BACKENDS = (
+    "django.core.cache.backends.redis.RedisCache",
+    "django.core.cache.backends.memcached.PyMemcacheCache",
+    "django.core.cache.backends.memcached.PyLibMCCache",
+    "django_redis.cache.RedisCache",
+)
+
+
+class CacheBackend(EventBackend):
+    # Relays events through a cache every worker shares: a per-user counter
+    # plus one key per event that expires after EVENTS_TTL seconds.
+    # Subscribers poll the counter, which is a cache read rather than a query.
+    def __init__(self):
+        super().__init__()
+        problem = self.configuration_problem()
+        if problem:
+            raise ImproperlyConfigured(problem)
+        self.cache = caches[getattr(settings, "EVENTS_CACHE_ALIAS", "events")]
+        self.ttl = getattr(settings, "EVENTS_TTL", 300)
+        self.interval = getattr(settings, "EVENTS_POLL_INTERVAL", 0.5)
+
+    @staticmethod
+    def configuration_problem():
+        alias = getattr(settings, "EVENTS_CACHE_ALIAS", "events")
+        backend = settings.CACHES.get(alias, {}).get("BACKEND")
+        if backend not in ATOMIC_CACHE_BACKENDS:
+            return f"EVENTS_CACHE_ALIAS must name a Redis or Memcached cache, not {backend or alias!r}"
+        return None
+
+    def _last_key(self, user_id):
+        return f"events:{user_id}:last"
+
+    def _event_key(self, user_id, event_id):
+        return f"events:{user_id}:{event_id}"
+
+    def publish(self, user_id, event):
+        key = self._last_key(user_id)
+        try:
+            event_id = self.cache.incr(key)
+        except ValueError:
+            self.cache.add(key, 0, None)
+            event_id = self.cache.incr(key)
+        self.cache.set(self._event_key(user_id, event_id), event, self.ttl)
+        return event_id
+
+    def latest(self, user_id):
+        return self.cache.get(self._last_key(user_id), 0)
+
+    def read(self, user_id, after):
+        last_id = self.latest(user_id)
+        if after > last_id or last_id - after > self.backlog:
+            return [], last_id, True
+        ids = range(after + 1, last_id + 1)
+        found = self.cache.get_many([self._event_key(user_id, event_id) for event_id in ids])
+        events = []
+        for event_id in ids:
+            event = found.get(self._event_key(user_id, event_id))
+            if event is None:
+                # Expired, or published a moment ago and not written yet;
+                # wait() tells the two apart by reading again
+                return events, last_id, None
+            events.append((event_id, event))
+        return events, last_id, False
+
+    async def wait(self, user_id, after, timeout):
+        deadline = time.monotonic() + timeout
+        missing = False
+        while True:
+            events, last_id, lost = await sync_to_async(self.read, thread_sensitive=False)(user_id, after)
+            if lost is None:
+                if events:
+                    return events, last_id, False
+                if missing:
+                    return [], last_id, True
+                missing = True
+            elif events or lost:
+                return events, last_id, lost
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return [], last_id, False
+            await asyncio.sleep(min(self.interval, remaining))
+
+
+_lock = threading.Lock()
+_backend = None
+
+
+def event_backend():
+    global _backend
+    with _lock:
+        if _backend is None:
+            _backend = import_string(getattr(settings, "EVENTS_BACKEND", "api.events.LocalBackend"))()
+    return _backend
+
+
+def publish_event(user_id, kind, action, object_id, **data):
+    # Sent once the write commits, so a subscriber that refetches sees it.
+    # Best effort: a broker failure is logged rather than failing the write.
+    event = {"kind": kind, "action": action, "id": object_id, **data}
+    transaction.on_commit(lambda: event_backend().publish(user_id, event), robust=True)
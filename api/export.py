@@ -0,0 +1,90 @@
+import csv
+import io
+
+from django.conf import settings
+
+from .models import Subject, Note, Project, TodoList, Task
+from .renderers import dumps
+
+
+EXPORT_FORMATS = ("ndjson", "csv")
+
+EXPORT_SECTIONS = {
+    "subjects": (Subject, "user_id", (
+        "id", "category", "subject_name", "description", "grade", "semester", "school_year",
+        "status", "priority", "created_at", "updated_at",
+    )),
+    "notes": (Note, "user_id", ("id", "subject_id", "title", "content", "created_at", "updated_at")),
+    "projects": (Project, "user_id", ("id", "title", "description", "status", "created_at", "updated_at")),
+    "todo_lists": (TodoList, "user_id", (
+        "id", "title", "description", "status", "task_total", "task_completed", "created_at", "updated_at",
+    )),
+    "tasks": (Task, "todo_list__user_id", ("id", "todo_list_id", "label", "completed", "created_at", "updated_at")),
+}
+
+
+class InvalidExport(ValueError):
+    pass
+
+
+def export_params(export_format, sections):
+    export_format = export_format or "ndjson"
+    if export_format not in EXPORT_FORMATS:
+        raise InvalidExport(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+
+    sections = [section for section in (sections or "").split(",") if section] or list(EXPORT_SECTIONS)
+    unknown = [section for section in sections if section not in EXPORT_SECTIONS]
+    if unknown:
+        raise InvalidExport(f"Unknown sections: {', '.join(unknown)}")
+    if export_format == "csv" and len(sections) != 1:
+        raise InvalidExport("CSV exports take exactly one section")
+    return export_format, sections
+
+
+def iter_chunks(user_id, section, chunk_size=None):
+    # Walk the primary key in fixed-size slices instead of relying on
+    # server-side cursors, which MySQL drivers do not provide to iterator()
+    model, owner, fields = EXPORT_SECTIONS[section]
+    chunk_size = chunk_size or getattr(settings, "EXPORT_CHUNK_SIZE", 2000)
+    queryset = model.objects.filter(**{owner: user_id}).order_by("id").values_list(*fields)
+
+    last_id = 0
+    while True:
+        rows = list(queryset.filter(id__gt=last_id)[:chunk_size])
+        if rows:
+            yield rows
+        if len(rows) < chunk_size:
+            return
+        last_id = rows[-1][0]
+
+
+def ndjson_stream(user_id, sections, chunk_size=None):
+    for section in sections:
+        fields = EXPORT_SECTIONS[section][2]
+        for rows in iter_chunks(user_id, section, chunk_size):
+            yield b"".join(dumps({"section": section, **dict(zip(fields, row))}) + b"\n" for row in rows)
+
+
+def csv_stream(user_id, section, chunk_size=None):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_SECTIONS[section][2])
+    yield buffer.getvalue().encode()
+
+    for rows in iter_chunks(user_id, section, chunk_size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+
+
+def export_stream(user_id, export_format, sections, chunk_size=None):
+    if export_format == "csv":
+        return csv_stream(user_id, sections[0], chunk_size)
+    return ndjson_stream(user_id, sections, chunk_size)
+
+
+def export_filename(export_format, sections):
+    if export_format == "csv":
+        return f"{sections[0]}.csv"
+    return "export.ndjson"
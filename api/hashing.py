@@ -0,0 +1,60 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, check_password, make_password
+
+
+class HashingBusy(Exception):
+    pass
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    # Same algorithm name as Django's hasher, so existing hashes keep
+    # verifying; changing PASSWORD_HASH_ITERATIONS rehashes them on login
+    @property
+    def iterations(self):
+        return getattr(settings, "PASSWORD_HASH_ITERATIONS", None) or PBKDF2PasswordHasher.iterations
+
+
+_lock = threading.Lock()
+_executor = None
+_slots = None
+
+
+def _pool():
+    global _executor, _slots
+    with _lock:
+        if _executor is None:
+            workers = getattr(settings, "PASSWORD_HASH_WORKERS", 4)
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+            _slots = threading.BoundedSemaphore(workers + getattr(settings, "PASSWORD_HASH_QUEUE", 16))
+    return _executor, _slots
+
+
+def _run(func, *args):
+    executor, slots = _pool()
+    # Refuse instead of queueing without bound: a waiting request still
+    # holds a server thread that other endpoints need
+    if not slots.acquire(blocking=False):
+        raise HashingBusy("Too many password checks in progress")
+    try:
+        return executor.submit(func, *args).result()
+    finally:
+        slots.release()
+
+
+def hash_password(password):
+    return _run(make_password, password)
+
+
+def _check(password, encoded):
+    upgraded = []
+    valid = check_password(password, encoded, lambda raw_password: upgraded.append(make_password(raw_password)))
+    return valid, (upgraded[0] if upgraded else None)
+
+
+def verify_password(password, encoded):
+    # Returns (valid, new hash or None). Storing the new hash is left to the
+    # caller so it runs on the request's own connection and transaction.
+    return _run(_check, password, encoded)
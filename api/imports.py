@@ -0,0 +1,92 @@
+import csv
+
+from django.conf import settings
+from django.db import transaction
+
+from .aggregates import record_created_subjects
+from .models import SearchTerm, Subject
+from .search import index_created, latest_id
+from .validation import InvalidPayload, clean_subject
+
+
+IMPORT_MAX_ERRORS = 1000
+
+
+class InvalidImport(ValueError):
+    def __init__(self, message, line=None):
+        super().__init__(message)
+        self.line = line
+
+
+def decode_lines(lines):
+    # Lines arrive as bytes straight from the upload or request stream
+    for number, line in enumerate(lines, 1):
+        yield line.decode("utf-8-sig" if number == 1 else "utf-8")
+
+
+def subject_reader(lines):
+    reader = csv.DictReader(lines)
+    try:
+        fieldnames = reader.fieldnames
+    except (csv.Error, UnicodeDecodeError) as e:
+        raise InvalidImport(f"Unreadable CSV header: {e}") from e
+
+    if not fieldnames:
+        raise InvalidImport("CSV file is empty")
+    reader.fieldnames = [name.strip() for name in fieldnames]
+    if "subject_name" not in reader.fieldnames:
+        raise InvalidImport("CSV header must include subject_name")
+    return reader
+
+
+def _rows(reader):
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except UnicodeDecodeError as e:
+            raise InvalidImport("Line is not valid UTF-8", reader.line_num + 1) from e
+        except csv.Error as e:
+            raise InvalidImport(str(e), reader.line_num) from e
+        yield reader.line_num, {
+            key: value.strip() for key, value in row.items()
+            if key and isinstance(value, str) and value.strip()
+        }
+
+
+def _write_batch(user_id, subjects):
+    with transaction.atomic():
+        after_id = latest_id(Subject.objects.filter(user_id=user_id))
+        Subject.objects.bulk_create(subjects)
+        record_created_subjects(subjects)
+        index_created(SearchTerm.Kind.SUBJECT, Subject.objects.filter(user_id=user_id), after_id)
+    return len(subjects)
+
+
+def import_subjects(user_id, reader, batch_size=None, max_errors=IMPORT_MAX_ERRORS):
+    batch_size = batch_size or getattr(settings, "IMPORT_BATCH_SIZE", 1000)
+    result = {"created": 0, "failed": 0, "errors": []}
+
+    def fail(line, error):
+        result["failed"] += 1
+        if len(result["errors"]) < max_errors:
+            result["errors"].append({"line": line, "error": error})
+
+    batch = []
+    try:
+        for line, row in _rows(reader):
+            try:
+                batch.append(Subject(user_id=user_id, **clean_subject(row)))
+            except InvalidPayload as e:
+                fail(line, str(e))
+                continue
+            if len(batch) >= batch_size:
+                result["created"] += _write_batch(user_id, batch)
+                batch = []
+    except InvalidImport as e:
+        fail(e.line, f"{e}; import stopped")
+
+    if batch:
+        result["created"] += _write_batch(user_id, batch)
+    return result
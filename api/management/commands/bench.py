@@ -0,0 +1,155 @@
+import json
+import random
+import secrets
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from api.benchmarks import (
+    DEFAULT_DATASET, ENDPOINTS, SCENARIOS, TRANSPORTS, BenchContext, BenchmarkError, bench_databases, compare_reports,
+    delete_bench_users, environment, generate_dataset, load_report, on_bench_database, run_endpoint, transport_for,
+    write_report,
+)
+from api.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the API on throwaway test databases, or on the database BENCH_DATABASE names. "
+        "'scenarios' times the query-heavy paths at two data sizes; 'endpoints' seeds a reproducible dataset, "
+        "times every endpoint and reports throughput, p50/p95/p99 and queries per request as JSON, "
+        "optionally diffed against a stored baseline"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--keepdb", action="store_true", help="Keep the test databases between runs")
+        suites = parser.add_subparsers(dest="suite", required=True)
+
+        scenarios = suites.add_parser("scenarios", help="Time the query-heavy paths at two data sizes")
+        scenarios.add_argument(
+            "scenarios", nargs="*", help=f"Scenarios to run (default: all of {', '.join(sorted(SCENARIOS))})"
+        )
+        scenarios.add_argument("--scale", type=int, help="Override the scenario's default data size")
+        scenarios.add_argument("--repeat", type=int, default=5)
+
+        endpoints = suites.add_parser("endpoints", help="Time every endpoint, sync and async")
+        endpoints.add_argument("endpoints", nargs="*", help=f"Endpoints to run (default: all {len(ENDPOINTS)})")
+        endpoints.add_argument(
+            "--transport", choices=TRANSPORTS, default="client",
+            help="client: Django test client; wsgi: a threaded WSGI server in this process; "
+                 "asgi: uvicorn in a child process; url: an already running server on BENCH_DATABASE",
+        )
+        endpoints.add_argument("--base-url", help="Server for --transport url")
+        endpoints.add_argument("--requests", type=int, default=50, help="Timed requests per endpoint")
+        endpoints.add_argument("--warmup", type=int, default=3, help="Untimed requests per endpoint first")
+        endpoints.add_argument(
+            "--concurrency", type=int, default=8, help="Parallel requests for the server transports"
+        )
+        endpoints.add_argument("--seed", type=int, default=0, help="Seed for the dataset and the request mix")
+        for key, default in DEFAULT_DATASET.items():
+            endpoints.add_argument(f"--{key.replace('_', '-')}", type=int, default=default, dest=key)
+        endpoints.add_argument("--output", help="Write the JSON report here as well as to stdout")
+        endpoints.add_argument("--baseline", help="Earlier report to compare against")
+        endpoints.add_argument(
+            "--tolerance", type=float, default=0.2, help="Allowed latency/throughput drift, 0.2 = 20%%"
+        )
+        endpoints.add_argument("--fail-on-regression", action="store_true")
+        endpoints.add_argument("--keep-data", action="store_true", help="Leave the generated users in the database")
+
+    def handle(self, *args, **options):
+        if options["suite"] == "endpoints" and options["transport"] == "url" and not on_bench_database():
+            # The server writes to its own database, which only BENCH_DATABASE vouches for
+            raise CommandError("--transport url needs BENCH_DATABASE set to the database the server uses")
+        try:
+            with bench_databases(options["keepdb"]):
+                if options["suite"] == "scenarios":
+                    report = self.run_scenarios(options)
+                else:
+                    report = self.run_endpoints(options)
+        except BenchmarkError as e:
+            raise CommandError(str(e))
+        self.stdout.write(json.dumps(report, indent=2, sort_keys=options["suite"] == "endpoints"))
+
+        regressions = report.get("comparison", {}).get("regressions")
+        if regressions and options.get("fail_on_regression"):
+            raise CommandError(f"{len(regressions)} regressions against {options['baseline']}")
+
+    def run_scenarios(self, options):
+        report = {}
+        for name in options["scenarios"] or sorted(SCENARIOS):
+            if name not in SCENARIOS:
+                raise CommandError(f"Unknown scenario: {name}")
+            kwargs = {"repeat": options["repeat"]}
+            if options["scale"]:
+                kwargs["scale"] = options["scale"]
+            try:
+                report[name] = SCENARIOS[name](**kwargs)
+            except BenchmarkError as e:
+                raise BenchmarkError(f"{name}: {e}")
+        return report
+
+    def run_endpoints(self, options):
+        names = options["endpoints"] or list(ENDPOINTS)
+        unknown = [name for name in names if name not in ENDPOINTS]
+        if unknown:
+            raise CommandError(f"Unknown endpoints: {', '.join(unknown)}")
+        baseline = load_report(options["baseline"]) if options["baseline"] else None
+
+        sizes = {key: options[key] for key in DEFAULT_DATASET}
+        prefix = f"bench{random.SystemRandom().randrange(16 ** 6):06x}"
+        users = generate_dataset(seed=options["seed"], prefix=prefix, **sizes)
+        report = {
+            "meta": {
+                **environment(),
+                "transport": options["transport"],
+                "requests": options["requests"],
+                "concurrency": options["concurrency"],
+                "seed": options["seed"],
+                "dataset": sizes,
+            },
+        }
+        # The endpoints run with the response cache off, so repeated reads
+        # reach the view; the cached reads then run again with it on. A server
+        # at a URL keeps its own settings and is timed as configured.
+        passes = [("endpoints", 0), ("cached", getattr(settings, "RESPONSE_CACHE_TIMEOUT", 300) or 300)]
+        if options["transport"] == "url":
+            passes = [("endpoints", None)]
+        report["meta"]["response_cache"] = [section for section, _ in passes]
+        # The throttle would turn repeated logins from one address into 429s,
+        # and /api/metrics/ needs a token
+        metrics_token = getattr(settings, "METRICS_TOKEN", None) or secrets.token_urlsafe()
+        try:
+            for section, timeout in passes:
+                overrides = {"LOGIN_THROTTLE_RATES": {}}
+                if timeout is not None:
+                    overrides["RESPONSE_CACHE_TIMEOUT"] = timeout
+                if section == "endpoints":
+                    section_names = names
+                else:
+                    section_names = [name for name in names if report["endpoints"][name]["response_cache"]]
+                    if not section_names:
+                        continue
+                report[section] = {}
+                with override_settings(METRICS_TOKEN=metrics_token, **overrides), \
+                        transport_for(options["transport"], options["base_url"], overrides) as transport:
+                    ctx = BenchContext(transport, users, random.Random(options["seed"]))
+                    try:
+                        for name in section_names:
+                            self.stderr.write(f"{section} {name}...")
+                            # At least one untimed request fills the cache
+                            warmup = options["warmup"] if section == "endpoints" else max(options["warmup"], 1)
+                            report[section][name] = run_endpoint(
+                                ctx, name, options["requests"], options["concurrency"], warmup
+                            )
+                    finally:
+                        ctx.close()
+        finally:
+            if not options["keep_data"]:
+                delete_bench_users(users + list(User.objects.filter(username__startswith=f"{prefix}_")))
+
+        if baseline is not None:
+            report["comparison"] = compare_reports(report, baseline, options["tolerance"])
+        if options["output"]:
+            write_report(report, options["output"])
+        return report
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.aggregates import find_inconsistencies
+from api.models import User
+
+
+class Command(BaseCommand):
+    help = "Compare the stored grade aggregates against a live GROUP BY over subjects"
+
+    def add_arguments(self, parser):
+        parser.add_argument("usernames", nargs="*", help="Only check these users (default: everyone)")
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options["usernames"]:
+            user_ids = list(User.objects.filter(username__in=options["usernames"]).values_list("id", flat=True))
+
+        mismatches = find_inconsistencies(user_ids)
+        for user_id, category, stored, live in mismatches:
+            self.stdout.write(f"user {user_id} {category}: stored (sum, count)={stored} live={live}")
+
+        if mismatches:
+            raise CommandError(
+                f"{len(mismatches)} aggregates are out of date; run rebuild_grade_aggregates to repair them"
+            )
+        self.stdout.write(self.style.SUCCESS("Grade aggregates match the subjects table"))
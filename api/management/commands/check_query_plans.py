@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api.models import User
+from api.plans import explain, list_queries, plan_problems
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN the list endpoint queries and fail if any needs a full scan or a filesort"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Username whose data the plans are checked against (default: first user)")
+        parser.add_argument("--verbose-plans", action="store_true", help="Print every plan, not only failing ones")
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by("id")
+        if options["user"]:
+            users = users.filter(username=options["user"])
+        user = users.first()
+        if user is None:
+            raise CommandError("No user to check query plans against")
+
+        if connection.vendor not in ("mysql", "sqlite"):
+            self.stderr.write(f"Plan checks are not implemented for {connection.vendor}; plans are printed only")
+
+        failures = 0
+        for name, queryset in list_queries(user.id).items():
+            problems = plan_problems(queryset)
+            if problems:
+                failures += 1
+                self.stdout.write(self.style.ERROR(f"{name}: {', '.join(problems)}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"{name}: ok"))
+            if problems or options["verbose_plans"]:
+                self.stdout.write(explain(queryset))
+
+        if failures:
+            raise CommandError(f"{failures} list queries fall back to a full scan or filesort")
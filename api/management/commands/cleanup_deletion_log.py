@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from api.changes import retention_cutoff
+from api.models import DeletionLog
+
+
+class Command(BaseCommand):
+    help = "Delete sync tombstones older than the retention period; older watermarks then need a full sync"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=float, default=None,
+            help="Keep tombstones this many days (default: DELETION_LOG_RETENTION)",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Report what would be deleted without deleting it")
+
+    def handle(self, *args, **options):
+        days = options["days"]
+        expired = DeletionLog.objects.filter(
+            deleted_at__lt=retention_cutoff(timedelta(days=days) if days is not None else None)
+        )
+
+        if options["dry_run"]:
+            self.stdout.write(self.style.SUCCESS(f"Would delete {expired.count()} tombstones"))
+            return
+        deleted, _ = expired.delete()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} tombstones"))
@@ -0,0 +1,62 @@
+import os
+from collections import Counter
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from api.blobs import delete_orphan, orphan_cutoff, stray_files
+from api.models import MediaBlob, UserProfile
+
+
+class Command(BaseCommand):
+    help = "Delete media blobs nothing references any more, and files under media/blobs without a blob row"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace-hours", type=float, default=None,
+            help="Only delete blobs unreferenced for this long (default: BLOB_ORPHAN_GRACE)",
+        )
+        parser.add_argument("--recount", action="store_true", help="Recompute reference counts from profiles first")
+        parser.add_argument("--dry-run", action="store_true", help="Report what would be deleted without deleting it")
+
+    def recount(self):
+        counts = Counter()
+        for digests in UserProfile.objects.values_list("profile_pic_blobs", flat=True):
+            counts.update(set(digests or []))
+
+        fixed = 0
+        for blob_id, digest, refcount in MediaBlob.objects.values_list("id", "digest", "refcount").iterator():
+            if counts[digest] != refcount:
+                fixed += MediaBlob.objects.filter(pk=blob_id).update(refcount=counts[digest])
+        self.stdout.write(f"Corrected {fixed} reference counts")
+
+    def handle(self, *args, **options):
+        if options["recount"] and not options["dry_run"]:
+            self.recount()
+
+        grace = options["grace_hours"]
+        cutoff = orphan_cutoff(timedelta(hours=grace) if grace is not None else None)
+
+        # Originals of uploads still being rendered are not referenced yet
+        pending = {
+            name[:64] for name in UserProfile.objects.filter(profile_pic_pending__isnull=False)
+            .values_list("profile_pic_pending", flat=True)
+        }
+        orphans = MediaBlob.objects.filter(refcount=0, updated_at__lt=cutoff).exclude(digest__in=pending)
+
+        deleted = freed = 0
+        for blob in orphans.iterator():
+            if options["dry_run"] or delete_orphan(blob, cutoff):
+                deleted += 1
+                freed += blob.size
+
+        strays = 0
+        for path in stray_files(cutoff):
+            strays += 1
+            if not options["dry_run"]:
+                os.remove(path)
+
+        verb = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {deleted} orphaned blobs ({freed} bytes) and {strays} stray files"
+        ))
@@ -0,0 +1,32 @@
+import time
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = "Delete expired rows from django_session in small batches instead of one long DELETE"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Sessions deleted per statement")
+        parser.add_argument("--pause", type=float, default=0, help="Seconds to sleep between batches")
+
+    def handle(self, *args, **options):
+        if settings.SESSION_ENGINE.endswith("signed_cookies"):
+            self.stdout.write("Signed-cookie sessions keep no server-side state; nothing to clean up")
+            return
+
+        now = timezone.now()
+        expired = Session.objects.filter(expire_date__lt=now).order_by("expire_date")
+        deleted = 0
+        while True:
+            keys = list(expired.values_list("session_key", flat=True)[:options["batch_size"]])
+            if not keys:
+                break
+            deleted += Session.objects.filter(session_key__in=keys).delete()[0]
+            if options["pause"]:
+                time.sleep(options["pause"])
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired sessions"))
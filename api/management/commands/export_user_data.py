@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.export import EXPORT_FORMATS, EXPORT_SECTIONS, InvalidExport, export_params, export_stream
+from api.models import User
+
+
+class Command(BaseCommand):
+    help = "Stream a user's subjects, notes, projects and todo lists as NDJSON or CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument("username")
+        parser.add_argument("--format", default="ndjson", help=f"One of {', '.join(EXPORT_FORMATS)}")
+        parser.add_argument(
+            "--sections", help=f"Comma separated subset of {', '.join(EXPORT_SECTIONS)} (default: all)"
+        )
+        parser.add_argument("--output", help="Write to this file instead of stdout")
+        parser.add_argument("--chunk-size", type=int, help="Rows fetched per query")
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options["username"]).first()
+        if user is None:
+            raise CommandError(f"User not found: {options['username']}")
+
+        try:
+            export_format, sections = export_params(options["format"], options["sections"])
+        except InvalidExport as e:
+            raise CommandError(str(e))
+
+        chunks = export_stream(user.id, export_format, sections, options["chunk_size"])
+        if not options["output"]:
+            for chunk in chunks:
+                self.stdout.write(chunk.decode(), ending="")
+            return
+
+        with open(options["output"], "wb") as output:
+            for chunk in chunks:
+                output.write(chunk)
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported {', '.join(sections)} for {user.username} to {options['output']}"
+        ))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.cache import bump_user_version
+from api.imports import InvalidImport, import_subjects, subject_reader
+from api.models import User
+
+
+class Command(BaseCommand):
+    help = "Import subjects and grades for a user from a CSV file with a subject_name header column"
+
+    def add_arguments(self, parser):
+        parser.add_argument("username")
+        parser.add_argument("path", help="CSV file to import")
+        parser.add_argument("--batch-size", type=int, help="Subjects written per transaction")
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options["username"]).first()
+        if user is None:
+            raise CommandError(f"User not found: {options['username']}")
+
+        with open(options["path"], encoding="utf-8-sig", newline="") as source:
+            try:
+                reader = subject_reader(source)
+            except InvalidImport as e:
+                raise CommandError(str(e))
+            try:
+                result = import_subjects(user.id, reader, options["batch_size"])
+            finally:
+                bump_user_version(user.id)
+
+        for error in result["errors"]:
+            self.stderr.write(f"line {error['line']}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result['created']} subjects for {user.username}, {result['failed']} rows failed"
+        ))
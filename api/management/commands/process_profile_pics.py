@@ -0,0 +1,28 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from api.blobs import blob_path
+from api.models import UserProfile
+from api.profile_pics import process_upload
+
+
+class Command(BaseCommand):
+    help = "Render profile pictures still marked pending, e.g. uploads a restart dropped from the worker pool"
+
+    def handle(self, *args, **options):
+        pending = UserProfile.objects.filter(
+            profile_pic_status=UserProfile.PictureStatus.PENDING, profile_pic_pending__isnull=False
+        ).values_list("user_id", "profile_pic_pending")
+
+        processed = failed = 0
+        for user_id, blob_name in pending:
+            if os.path.exists(blob_path(blob_name)) and process_upload(user_id, blob_name):
+                processed += 1
+                continue
+            UserProfile.objects.filter(user_id=user_id, profile_pic_pending=blob_name).update(
+                profile_pic_status=UserProfile.PictureStatus.FAILED, profile_pic_pending=None
+            )
+            failed += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} pending profile pictures, {failed} failed"))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from api.aggregates import rebuild_aggregates
+from api.cache import bump_user_version
+from api.models import User
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-user, per-category grade aggregates from the subjects table"
+
+    def add_arguments(self, parser):
+        parser.add_argument("usernames", nargs="*", help="Only rebuild these users (default: everyone)")
+        parser.add_argument("--batch-size", type=int, default=500, help="Users rebuilt per transaction")
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by("id")
+        if options["usernames"]:
+            users = users.filter(username__in=options["usernames"])
+        user_ids = list(users.values_list("id", flat=True))
+
+        batch_size = options["batch_size"]
+        for start in range(0, len(user_ids), batch_size):
+            batch = user_ids[start:start + batch_size]
+            rebuild_aggregates(batch)
+            # Cached dashboards carry the recommendation built from these
+            for user_id in batch:
+                bump_user_version(user_id)
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt grade aggregates for {len(user_ids)} users"))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from api.cache import bump_user_version
+from api.models import User
+from api.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Re-tokenize subjects and notes into the search_terms index"
+
+    def add_arguments(self, parser):
+        parser.add_argument("usernames", nargs="*", help="Only rebuild these users (default: everyone)")
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by("id")
+        if options["usernames"]:
+            users = users.filter(username__in=options["usernames"])
+        user_ids = list(users.values_list("id", flat=True))
+
+        for user_id in user_ids:
+            rebuild_search_index(user_id)
+            bump_user_version(user_id)
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt the search index for {len(user_ids)} users"))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+
+from api.cache import bump_user_version
+from api.models import TodoList
+
+
+class Command(BaseCommand):
+    help = "Recompute task_total, task_completed and status for every todo list from its tasks"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000, help="Todo lists updated per statement")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        last_id = TodoList.objects.aggregate(last_id=Max("id"))["last_id"] or 0
+
+        repaired = 0
+        for start in range(0, last_id + 1, batch_size):
+            lists = TodoList.objects.filter(id__gte=start, id__lt=start + batch_size)
+            repaired += TodoList.recount_tasks(lists)
+            for user_id in set(lists.values_list("user_id", flat=True)):
+                bump_user_version(user_id)
+
+        self.stdout.write(self.style.SUCCESS(f"Recomputed task counters for {repaired} todo lists"))
@@ -0,0 +1,322 @@
+import hmac
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger("api.slow_requests")
+
+# Values are bucketed HDR-style: exact below 2**SUB_BUCKET_BITS, then
+# 2**(SUB_BUCKET_BITS - 1) buckets per power of two (under 1% relative error)
+SUB_BUCKET_BITS = 8
+_HALF = 1 << (SUB_BUCKET_BITS - 1)
+
+QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+
+def _bucket(value):
+    if value < 2 * _HALF:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    return shift * _HALF + (value >> shift)
+
+
+def _bucket_bounds(index):
+    if index < 2 * _HALF:
+        return index, index
+    shift = index // _HALF - 1
+    low = (index - shift * _HALF) << shift
+    return low, low + (1 << shift) - 1
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = defaultdict(int)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value):
+        value = max(0, int(value))
+        self.counts[_bucket(value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        if not self.count:
+            return 0
+        rank = q * self.count
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(_bucket_bounds(index)[1], self.max)
+        return self.max
+
+
+# name -> (help, divisor turning the recorded integers into the exported unit)
+METRICS = {
+    "http_request_duration_seconds": ("Wall time spent producing the response", 1_000_000),
+    "http_request_db_queries": ("Database queries run per request", 1),
+    "http_request_db_duration_seconds": ("Time spent in the database per request", 1_000_000),
+    "http_response_size_bytes": ("Response body size", 1),
+}
+
+
+class Registry:
+    # Per process: every worker exposes its own numbers and Prometheus
+    # aggregates them across instances
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = defaultdict(Histogram)
+        self.responses = defaultdict(int)
+
+    def observe(self, view, method, status, values):
+        with self.lock:
+            self.responses[(view, method, status)] += 1
+            for name, value in values.items():
+                self.histograms[(name, view)].record(value)
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+            self.responses.clear()
+
+
+registry = Registry()
+
+
+def query_totals():
+    # view -> (queries, requests) so far, for tools that diff two snapshots
+    with registry.lock:
+        return {
+            view: (histogram.total, histogram.count)
+            for (name, view), histogram in registry.histograms.items()
+            if name == "http_request_db_queries"
+        }
+
+
+def scrape_authorized(request):
+    # Scrapers send METRICS_TOKEN as a bearer token
+    token = getattr(settings, "METRICS_TOKEN", None)
+    supplied = request.headers.get("Authorization", "")
+    return bool(token) and hmac.compare_digest(supplied.encode(), f"Bearer {token}".encode())
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_prometheus():
+    lines = [
+        "# HELP http_responses_total Responses by view, method and status",
+        "# TYPE http_responses_total counter",
+    ]
+    with registry.lock:
+        for (view, method, status), count in sorted(registry.responses.items()):
+            lines.append(
+                f'http_responses_total{{view="{_label(view)}",method="{method}",status="{status}"}} {count}'
+            )
+
+        for name, (help_text, divisor) in METRICS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} summary")
+            for (metric, view), histogram in sorted(registry.histograms.items()):
+                if metric != name:
+                    continue
+                labels = f'view="{_label(view)}"'
+                for q in QUANTILES:
+                    lines.append(f'{name}{{{labels},quantile="{q}"}} {histogram.quantile(q) / divisor:g}')
+                lines.append(f"{name}_sum{{{labels}}} {histogram.total / divisor:g}")
+                lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+    return "\n".join(lines) + "\n"
+
+
+class _RequestStats:
+    def __init__(self, capture_sql):
+        self.queries = 0
+        self.db_time = 0
+        self.capture_sql = capture_sql
+        self.statements = defaultdict(lambda: [0, 0])
+
+
+_current = ContextVar("request_metrics", default=None)
+
+
+def _record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter_ns()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = (time.perf_counter_ns() - start) // 1000
+        stats.queries += 1
+        stats.db_time += elapsed
+        if stats.capture_sql:
+            # Grouped by statement so an N+1 shows up as one line with a count
+            statement = stats.statements[sql]
+            statement[0] += 1
+            statement[1] += elapsed
+
+
+@contextmanager
+def capture_queries():
+    # Connections belong to a thread, so this counts the queries run on the
+    # calling thread. Code that hands queries to other threads (e.g.
+    # sync_to_async(thread_sensitive=False)) wraps them there as well.
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(_record_query))
+        yield
+
+
+class _MeteredStream:
+    # Counts the queries run while a streaming body is iterated toward its
+    # request. Django calls close() once the response is done with, however
+    # far the client read.
+    def __init__(self, content, stats, done):
+        self.content = content
+        self.stats = stats
+        self.done = done
+        self.size = 0
+        self.closed = False
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.done(self.size)
+
+
+class _SyncMeteredStream(_MeteredStream):
+    def __init__(self, content, stats, done):
+        super().__init__(iter(content), stats, done)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        # Pulled by the server on whichever thread sends the body
+        token = _current.set(self.stats)
+        try:
+            with capture_queries():
+                chunk = next(self.content)
+        finally:
+            _current.reset(token)
+        self.size += len(chunk)
+        return chunk
+
+
+class _AsyncMeteredStream(_MeteredStream):
+    def __init__(self, content, stats, done):
+        super().__init__(aiter(content), stats, done)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        token = _current.set(self.stats)
+        queries = capture_queries()
+        await sync_to_async(queries.__enter__)()
+        try:
+            chunk = await anext(self.content)
+        finally:
+            await sync_to_async(queries.__exit__)(None, None, None)
+            _current.reset(token)
+        self.size += len(chunk)
+        return chunk
+
+
+def _view_name(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    return match.url_name or match.view_name
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_ms = getattr(settings, "METRICS_SLOW_REQUEST_MS", 500)
+        self.slow_sql = getattr(settings, "METRICS_SLOW_REQUEST_SQL", 10)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = _RequestStats(capture_sql=self.slow_ms is not None)
+        token = _current.set(stats)
+        start = time.perf_counter_ns()
+        try:
+            with capture_queries():
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._finish(request, response, stats, start)
+        return response
+
+    async def __acall__(self, request):
+        stats = _RequestStats(capture_sql=self.slow_ms is not None)
+        token = _current.set(stats)
+        start = time.perf_counter_ns()
+        # The ORM calls of an async request, and its sync views, run on the
+        # request's thread-sensitive thread: wrap the connections there
+        queries = capture_queries()
+        await sync_to_async(queries.__enter__)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(queries.__exit__)(None, None, None)
+            _current.reset(token)
+        self._finish(request, response, stats, start)
+        return response
+
+    def _finish(self, request, response, stats, start):
+        # Streaming responses are timed up to their first byte. Their body is
+        # produced, and mostly queried, after this returns, so the queries and
+        # size are recorded when the response is closed.
+        elapsed = (time.perf_counter_ns() - start) // 1000
+        view = _view_name(request)
+        if response.streaming:
+            stream = _AsyncMeteredStream if response.is_async else _SyncMeteredStream
+            response.streaming_content = stream(
+                response.streaming_content, stats,
+                lambda size: self._observe(request, response, view, elapsed, stats, size),
+            )
+        else:
+            self._observe(request, response, view, elapsed, stats, len(response.content))
+
+    def _observe(self, request, response, view, elapsed, stats, size):
+        registry.observe(view, request.method, response.status_code, {
+            "http_request_duration_seconds": elapsed,
+            "http_request_db_queries": stats.queries,
+            "http_request_db_duration_seconds": stats.db_time,
+            "http_response_size_bytes": size,
+        })
+
+        if self.slow_ms is not None and elapsed >= self.slow_ms * 1000:
+            self._log_slow(request, view, elapsed, stats)
+
+    def _log_slow(self, request, view, elapsed, stats):
+        statements = sorted(stats.statements.items(), key=lambda item: item[1][1], reverse=True)
+        lines = [
+            f"  {count}x {total / 1000:.1f}ms {sql}" for sql, (count, total) in statements[:self.slow_sql]
+        ]
+        logger.warning(
+            "Slow request %s %s (%s): %.1fms, %d queries in %.1fms\n%s",
+            request.method, request.path, view, elapsed / 1000, stats.queries, stats.db_time / 1000,
+            "\n".join(lines),
+        )
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_user_created_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['subject', 'created_at'], name='notes_subject_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subject',
+            index=models.Index(fields=['user', 'category', 'grade'], name='subjects_user_cat_grade_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['todo_list', 'created_at'], name='tasks_list_created_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def populate_aggregates(apps, schema_editor):
+    Subject = apps.get_model('api', 'Subject')
+    CategoryGradeAggregate = apps.get_model('api', 'CategoryGradeAggregate')
+    rows = (
+        Subject.objects.filter(grade__isnull=False)
+        .values('user_id', 'category')
+        .annotate(grade_sum=Sum('grade'), grade_count=Count('id'))
+        .order_by()
+    )
+    CategoryGradeAggregate.objects.bulk_create(
+        [CategoryGradeAggregate(**row) for row in rows.iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_access_pattern_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryGradeAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(max_length=50)),
+                ('grade_sum', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('grade_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(db_column='user_id', on_delete=django.db.models.deletion.CASCADE, related_name='grade_aggregates', to='api.user')),
+            ],
+            options={
+                'db_table': 'category_grade_aggregates',
+                'managed': True,
+                'constraints': [models.UniqueConstraint(fields=('user', 'category'), name='grade_aggregates_user_category_uniq')],
+            },
+        ),
+        migrations.RunPython(populate_aggregates, migrations.RunPython.noop),
+    ]
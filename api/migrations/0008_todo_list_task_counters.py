@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:26
+
+from django.db import migrations, models
+from django.db.models import Case, Count, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+
+def populate_counters(apps, schema_editor):
+    TodoList = apps.get_model('api', 'TodoList')
+    Task = apps.get_model('api', 'Task')
+    tasks = Task.objects.filter(todo_list=OuterRef('pk')).order_by().values('todo_list')
+    TodoList.objects.update(
+        task_total=Coalesce(Subquery(tasks.annotate(n=Count('id')).values('n')), 0),
+        task_completed=Coalesce(Subquery(tasks.filter(completed=True).annotate(n=Count('id')).values('n')), 0),
+    )
+    TodoList.objects.update(status=Case(
+        When(task_total__gt=0, task_completed__gte=F('task_total'), then=Value('COMPLETED')),
+        default=Value('ONGOING'),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_category_grade_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='todolist',
+            name='task_completed',
+            field=models.PositiveIntegerField(default=0, help_text='Number of completed tasks in the list'),
+        ),
+        migrations.AddField(
+            model_name='todolist',
+            name='task_total',
+            field=models.PositiveIntegerField(default=0, help_text='Number of tasks in the list'),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:39
+
+import re
+from collections import Counter
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# A frozen copy of api.search.document_terms as it was when this migration
+# was written, so later changes to the tokenizer cannot change its result
+TOKEN_RE = re.compile(r'\w+')
+MIN_TERM_LENGTH = 2
+MAX_TERM_LENGTH = 64
+TITLE_WEIGHT = 3
+
+
+def tokenize(text):
+    for token in TOKEN_RE.findall((text or "").lower()):
+        if len(token) >= MIN_TERM_LENGTH:
+            yield token[:MAX_TERM_LENGTH]
+
+
+def document_terms(title, body):
+    weights = Counter()
+    for token in tokenize(title):
+        weights[token] += TITLE_WEIGHT
+    for token in tokenize(body):
+        weights[token] += 1
+    return weights
+
+
+def populate_search_terms(apps, schema_editor):
+    SearchTerm = apps.get_model('api', 'SearchTerm')
+    sources = (
+        ('subject', apps.get_model('api', 'Subject'), 'subject_name', 'description'),
+        ('note', apps.get_model('api', 'Note'), 'title', 'content'),
+    )
+    for kind, model, title_field, body_field in sources:
+        rows = model.objects.order_by('id').values_list('id', 'user_id', title_field, body_field)
+        last_id = 0
+        while True:
+            batch = list(rows.filter(id__gt=last_id)[:1000])
+            if not batch:
+                break
+            SearchTerm.objects.bulk_create(
+                [
+                    SearchTerm(user_id=user_id, term=term, kind=kind, object_id=pk, weight=weight)
+                    for pk, user_id, title, body in batch
+                    for term, weight in document_terms(title, body).items()
+                ],
+                batch_size=1000,
+            )
+            last_id = batch[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_todo_list_task_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('kind', models.CharField(choices=[('subject', 'Subject'), ('note', 'Note')], max_length=10)),
+                ('object_id', models.PositiveIntegerField()),
+                ('weight', models.PositiveIntegerField(default=1)),
+                ('user', models.ForeignKey(db_column='user_id', on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='api.user')),
+            ],
+            options={
+                'db_table': 'search_terms',
+                'managed': True,
+                'indexes': [models.Index(fields=['user', 'term'], name='search_terms_user_term_idx'), models.Index(fields=['kind', 'object_id'], name='search_terms_object_idx')],
+            },
+        ),
+        migrations.RunPython(populate_search_terms, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_search_terms'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='subject',
+            index=models.Index(fields=['user', 'school_year', 'semester', 'created_at'], name='subjects_user_term_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subject',
+            index=models.Index(fields=['user', 'status', 'created_at'], name='subjects_user_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subject',
+            index=models.Index(fields=['user', 'priority', 'created_at'], name='subjects_user_priority_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:53
+
+import django.db.models.functions.comparison
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_sync_watermarks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subject',
+            name='grade_sort',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.comparison.Coalesce('grade', models.Value(Decimal('-1'))), output_field=models.DecimalField(decimal_places=2, max_digits=5)),
+        ),
+        migrations.AddField(
+            model_name='subject',
+            name='priority_rank',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(priority='LOW', then=models.Value(0)), models.When(priority='MODERATE', then=models.Value(1)), models.When(priority='HIGH', then=models.Value(2)), default=models.Value(-1)), output_field=models.SmallIntegerField()),
+        ),
+        migrations.AddIndex(
+            model_name='subject',
+            index=models.Index(fields=['user', 'grade_sort', 'created_at'], name='subjects_user_grade_sort_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subject',
+            index=models.Index(fields=['user', 'priority_rank', 'created_at'], name='subjects_user_prio_rank_idx'),
+        ),
+    ]
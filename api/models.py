@@ -1,7 +1,14 @@
+from decimal import Decimal
+
 from django.db import models
+from django.db.models import Case, Count, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+PRIORITY_RANKS = {"LOW": 0, "MODERATE": 1, "HIGH": 2}
+NO_GRADE = Decimal("-1")
+
 class User(models.Model):
     id = models.AutoField(primary_key=True)
     username = models.CharField(max_length=50, unique=True)
@@ -55,14 +62,67 @@ class Subject(models.Model):
     )
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
+    # Stored sort keys for ?sort=grade and ?sort=priority, so both can be
+    # read off an index; NULL grades sort as NO_GRADE
+    grade_sort = models.GeneratedField(
+        expression=Coalesce("grade", Value(NO_GRADE)),
+        output_field=models.DecimalField(max_digits=5, decimal_places=2),
+        db_persist=True,
+    )
+    priority_rank = models.GeneratedField(
+        expression=Case(
+            *(When(priority=priority, then=Value(rank)) for priority, rank in PRIORITY_RANKS.items()),
+            default=Value(-1),
+        ),
+        output_field=models.SmallIntegerField(),
+        db_persist=True,
+    )
 
     class Meta:
         db_table = 'subjects'
         managed = True
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='subjects_user_created_idx'),
+            models.Index(fields=['user', 'category', 'grade'], name='subjects_user_cat_grade_idx'),
+            models.Index(fields=['user', 'school_year', 'semester', 'created_at'], name='subjects_user_term_idx'),
+            models.Index(fields=['user', 'status', 'created_at'], name='subjects_user_status_idx'),
+            models.Index(fields=['user', 'priority', 'created_at'], name='subjects_user_priority_idx'),
+            models.Index(fields=['user', 'grade_sort', 'created_at'], name='subjects_user_grade_sort_idx'),
+            models.Index(fields=['user', 'priority_rank', 'created_at'], name='subjects_user_prio_rank_idx'),
+            models.Index(fields=['user', 'updated_at'], name='subjects_user_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.subject_name} ({self.category}) - {self.status} - {self.priority}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_grade = (
+            instance.__dict__.get("user_id"),
+            instance.__dict__.get("category"),
+            instance.__dict__.get("grade"),
+        )
+        return instance
+
+
+class CategoryGradeAggregate(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='grade_aggregates', db_column='user_id')
+    category = models.CharField(max_length=50)
+    grade_sum = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    grade_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'category_grade_aggregates'
+        managed = True
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'category'], name='grade_aggregates_user_category_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.category}: {self.grade_sum}/{self.grade_count}"
+
 
 class Note(models.Model):
     subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='notes')
@@ -75,14 +135,50 @@ class Note(models.Model):
     class Meta:
         db_table = 'notes'
         managed = True
+        indexes = [
+            models.Index(fields=['subject', 'created_at'], name='notes_subject_created_idx'),
+            models.Index(fields=['user', 'updated_at'], name='notes_user_updated_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
 
+class SearchTerm(models.Model):
+    class Kind(models.TextChoices):
+        SUBJECT = "subject", _("Subject")
+        NOTE = "note", _("Note")
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='search_terms', db_column='user_id')
+    term = models.CharField(max_length=64)
+    kind = models.CharField(max_length=10, choices=Kind.choices)
+    object_id = models.PositiveIntegerField()
+    weight = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        db_table = 'search_terms'
+        managed = True
+        indexes = [
+            models.Index(fields=['user', 'term'], name='search_terms_user_term_idx'),
+            models.Index(fields=['kind', 'object_id'], name='search_terms_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.term} -> {self.kind} {self.object_id} ({self.weight})"
+
+
 class UserProfile(models.Model):
+    class PictureStatus(models.TextChoices):
+        READY = "ready", _("Ready")
+        PENDING = "pending", _("Pending")
+        FAILED = "failed", _("Failed")
+
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile', db_column='user_id')
     profile_pic = models.CharField(max_length=255, blank=True, null=True)
+    profile_pic_status = models.CharField(max_length=10, choices=PictureStatus.choices, default=PictureStatus.READY)
+    profile_pic_pending = models.CharField(max_length=100, blank=True, null=True)
+    profile_pic_variants = models.JSONField(default=dict, blank=True)
+    profile_pic_blobs = models.JSONField(default=list, blank=True)
     address = models.CharField(max_length=255, blank=True, null=True)
     school = models.CharField(max_length=150, blank=True, null=True)
     course = models.CharField(max_length=150, blank=True, null=True)
@@ -98,6 +194,29 @@ class UserProfile(models.Model):
         return f"{self.user.username}'s Profile"
 
 
+class MediaBlob(models.Model):
+    digest = models.CharField(max_length=64, unique=True)
+    extension = models.CharField(max_length=10)
+    size = models.PositiveBigIntegerField()
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'media_blobs'
+        managed = True
+        indexes = [
+            models.Index(fields=['refcount', 'updated_at'], name='media_blobs_orphan_idx'),
+        ]
+
+    @property
+    def name(self):
+        return f"{self.digest}{self.extension}"
+
+    def __str__(self):
+        return self.name
+
+
 class Project(models.Model):
     STATUS_CHOICES = [
         ('NOT_STARTED', 'Not Started'),
@@ -120,11 +239,23 @@ class Project(models.Model):
     class Meta:
         db_table = 'projects'
         managed = True
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='projects_user_created_idx'),
+            models.Index(fields=['user', 'updated_at'], name='projects_user_updated_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
 
+def _shift_counter(field, delta):
+    if delta >= 0:
+        return F(field) + delta
+    # Stops at 0 instead of going negative, which MySQL rejects as out of
+    # range for an unsigned column (and a counter that drifted would hit)
+    return Greatest(F(field), -delta) - (-delta)
+
+
 class TodoList(models.Model):
     id = models.AutoField(primary_key=True)
 
@@ -146,6 +277,8 @@ class TodoList(models.Model):
         default=Status.ONGOING,
         help_text="Status of the todo list based on tasks completion"
     )
+    task_total = models.PositiveIntegerField(default=0, help_text="Number of tasks in the list")
+    task_completed = models.PositiveIntegerField(default=0, help_text="Number of completed tasks in the list")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -153,12 +286,45 @@ class TodoList(models.Model):
         db_table = "todo_lists"
         managed = True
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=["user", "created_at"], name="todo_lists_user_created_idx"),
+            models.Index(fields=["user", "updated_at"], name="todo_lists_user_updated_idx"),
+        ]
         verbose_name = "Todo List"
         verbose_name_plural = "Todo Lists"
 
     def __str__(self):
         return f"{self.title} ({self.user.username})"
 
+    @classmethod
+    def status_from_counters(cls):
+        return Case(
+            When(task_total__gt=0, task_completed__gte=F("task_total"), then=Value(cls.Status.COMPLETED)),
+            default=Value(cls.Status.ONGOING),
+        )
+
+    @classmethod
+    def adjust_task_counters(cls, list_id, total=0, completed=0):
+        lists = cls.objects.filter(id=list_id)
+        lists.update(
+            task_total=_shift_counter("task_total", total),
+            task_completed=_shift_counter("task_completed", completed),
+            updated_at=timezone.now(),
+        )
+        lists.update(status=cls.status_from_counters())
+        return lists.values_list("status", flat=True).first()
+
+    @classmethod
+    def recount_tasks(cls, lists=None):
+        lists = cls.objects.all() if lists is None else lists
+        tasks = Task.objects.filter(todo_list=OuterRef("pk")).order_by().values("todo_list")
+        lists.update(
+            task_total=Coalesce(Subquery(tasks.annotate(n=Count("id")).values("n")), 0),
+            task_completed=Coalesce(Subquery(tasks.filter(completed=True).annotate(n=Count("id")).values("n")), 0),
+            updated_at=timezone.now(),
+        )
+        return lists.update(status=cls.status_from_counters())
+
 
 class Task(models.Model):
     id = models.AutoField(primary_key=True)
@@ -179,6 +345,10 @@ class Task(models.Model):
         db_table = "tasks"
         managed = True
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=["todo_list", "created_at"], name="tasks_list_created_idx"),
+            models.Index(fields=["todo_list", "updated_at"], name="tasks_list_updated_idx"),
+        ]
         verbose_name = "Task"
         verbose_name_plural = "Tasks"
 
@@ -187,7 +357,37 @@ class Task(models.Model):
         return f"{status} {self.label}"
 
     def toggle_completion(self):
-        self.completed = not self.completed
-        self.save()
-        self.todo_list.update_status()
-        return self.completed
\ No newline at end of file
+        completed = not self.completed
+        flipped = Task.objects.filter(id=self.id, completed=self.completed).update(
+            completed=completed,
+            updated_at=timezone.now(),
+        )
+        delta = (1 if completed else -1) if flipped else 0
+        self.todo_list.status = TodoList.adjust_task_counters(self.todo_list_id, completed=delta)
+        self.completed = completed
+        return self.completed
+
+
+class DeletionLog(models.Model):
+    class Kind(models.TextChoices):
+        SUBJECT = "subjects", _("Subject")
+        NOTE = "notes", _("Note")
+        PROJECT = "projects", _("Project")
+        TODO_LIST = "todo_lists", _("Todo list")
+        TASK = "tasks", _("Task")
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='deletions', db_column='user_id')
+    kind = models.CharField(max_length=10, choices=Kind.choices)
+    object_id = models.PositiveIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'deletion_log'
+        managed = True
+        indexes = [
+            models.Index(fields=['user', 'deleted_at'], name='deletion_log_user_deleted_idx'),
+            models.Index(fields=['deleted_at'], name='deletion_log_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id} deleted at {self.deleted_at}"
@@ -0,0 +1,95 @@
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+DEFAULT_NOTES_PER_SUBJECT = 20
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_values(*values):
+    raw = json.dumps(values).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_values(cursor):
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except ValueError as e:
+        raise InvalidCursor("Invalid cursor") from e
+    if not isinstance(values, list):
+        raise InvalidCursor("Invalid cursor")
+    return values
+
+
+def encode_cursor(created_at, pk):
+    return encode_values(created_at.isoformat(), pk)
+
+
+def decode_cursor(cursor):
+    try:
+        created_at, pk = decode_values(cursor)
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor("Invalid cursor") from e
+
+
+def page_size(request, param="page_size", default=DEFAULT_PAGE_SIZE):
+    page_size = request.GET.get(param)
+    try:
+        size = int(page_size) if page_size else default
+    except ValueError as e:
+        raise InvalidCursor(f"Invalid {param}") from e
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def page_params(request, decode=decode_cursor):
+    cursor = request.GET.get("cursor")
+    if not cursor and not request.GET.get("page_size"):
+        return None
+    return (decode(cursor) if cursor else None), page_size(request)
+
+
+def encode_sort_cursor(value, created_at, pk):
+    return encode_values(str(value), created_at.isoformat(), pk)
+
+
+def sort_cursor_decoder(parse):
+    def decode(cursor):
+        try:
+            value, created_at, pk = decode_values(cursor)
+            return parse(value), datetime.fromisoformat(created_at), int(pk)
+        except (ArithmeticError, ValueError, TypeError) as e:
+            raise InvalidCursor("Invalid cursor") from e
+    return decode
+
+
+def paginate(queryset, page, descending=False, fields=("created_at", "id")):
+    # Keyset pagination over `fields`, the last of which must be unique
+    after, size = page
+    queryset = queryset.order_by(*(f"-{field}" if descending else field for field in fields))
+    if after:
+        lookup = "lt" if descending else "gt"
+        condition = Q()
+        for position, field in enumerate(fields):
+            equal = dict(zip(fields[:position], after[:position]))
+            condition |= Q(**equal, **{f"{field}__{lookup}": after[position]})
+        queryset = queryset.filter(condition)
+    return queryset[:size + 1]
+
+
+def split_page(rows, page, key, encode=encode_cursor):
+    size = page[1]
+    rows = list(rows)
+    if len(rows) <= size:
+        return rows, None
+    rows = rows[:size]
+    return rows, encode(*key(rows[-1]))
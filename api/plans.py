@@ -0,0 +1,104 @@
+import json
+import re
+
+from django.db import connection
+from django.utils import timezone
+
+from .models import Subject, TodoList
+from .pagination import paginate
+from .queries import (
+    subjects_for, sort_subjects, notes_for_subjects, note_subjects_for, latest_notes_for_subjects, subject_notes_for,
+    projects_for, todo_lists_for, tasks_for_lists, grade_aggregates_for,
+)
+
+
+def _mysql_problems(plan):
+    problems = []
+
+    def walk(node):
+        if isinstance(node, dict):
+            if node.get("access_type") == "ALL":
+                problems.append(f"full scan of {node.get('table_name')}")
+            if node.get("using_filesort"):
+                problems.append("filesort")
+            for value in node.values():
+                walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value)
+
+    walk(json.loads(plan))
+    return problems
+
+
+def _sqlite_problems(plan):
+    problems = []
+    # Scanning a subquery's rows (Django wraps filtered window queries in two)
+    # reads no table
+    subqueries = set(re.findall(r"CO-ROUTINE (\w+)$", plan, re.MULTILINE))
+    for line in plan.splitlines():
+        match = re.search(r"\bSCAN (\w+)$", line)
+        if match and match[1] not in subqueries:
+            problems.append(f"full scan: {line.strip()}")
+        if "USE TEMP B-TREE" in line:
+            problems.append(f"filesort: {line.strip()}")
+    return problems
+
+
+def explain(queryset, format=None):
+    # QuerySet.explain() puts the EXPLAIN prefix inside the subquery Django
+    # wraps around a filtered window, so prefix the compiled query instead
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"{connection.ops.explain_query_prefix(format)} {sql}", params)
+        rows = cursor.fetchall()
+    return "\n".join(row[0] if len(row) == 1 else " ".join(map(str, row)) for row in rows)
+
+
+def plan_problems(queryset):
+    if connection.vendor == "mysql":
+        return _mysql_problems(explain(queryset, format="json"))
+    if connection.vendor == "sqlite":
+        return _sqlite_problems(explain(queryset))
+    return []
+
+
+def list_queries(user_id):
+    # The queries behind the list endpoints, as they run for this user
+    subject_ids = list(Subject.objects.filter(user_id=user_id).values_list("id", flat=True)[:50])
+    list_ids = list(TodoList.objects.filter(user_id=user_id).values_list("id", flat=True)[:50])
+    cursor_page = ((timezone.now(), 0), 50)
+
+    def sorted_page(filters, sort, descending=False):
+        subjects, fields = sort_subjects(subjects_for(user_id, filters), sort, descending)
+        return paginate(subjects, ((0,) + cursor_page[0], 50), descending, fields)
+
+    return {
+        "get_subjects": subjects_for(user_id),
+        "get_subjects (page)": paginate(subjects_for(user_id), cursor_page),
+        "get_subjects ?school_year&semester (page)": paginate(
+            subjects_for(user_id, {"school_year": "2025-2026", "semester": "1st"}), cursor_page
+        ),
+        "get_subjects ?status (page)": paginate(subjects_for(user_id, {"status": "Ongoing"}), cursor_page),
+        "get_subjects ?priority (page)": paginate(subjects_for(user_id, {"priority": "HIGH"}), cursor_page),
+        "get_subjects ?sort=grade (page)": sorted_page(None, "grade"),
+        "get_subjects ?sort=-grade (page)": sorted_page(None, "grade", descending=True),
+        "get_subjects ?sort=priority (page)": sorted_page(None, "priority"),
+        "get_subjects ?sort=-priority (page)": sorted_page(None, "priority", descending=True),
+        "get_subjects ?status&sort=grade (page)": sorted_page({"status": "Ongoing"}, "grade"),
+        "get_subjects ?category&sort=-priority (page)": sorted_page(
+            {"category": "Programming"}, "priority", descending=True
+        ),
+        "get_subjects notes": notes_for_subjects(subject_ids or [0]),
+        "get_notes (page)": paginate(note_subjects_for(user_id), cursor_page),
+        "get_notes notes": latest_notes_for_subjects(subject_ids or [0], 20),
+        "get_notes ?subject (page)": paginate(
+            subject_notes_for(user_id, subject_ids[0] if subject_ids else 0), cursor_page, descending=True
+        ),
+        "get_projects": projects_for(user_id),
+        "get_projects (page)": paginate(projects_for(user_id), cursor_page, descending=True),
+        "get_todo_lists": todo_lists_for(user_id),
+        "get_todo_lists (page)": paginate(todo_lists_for(user_id), cursor_page, descending=True),
+        "get_todo_lists tasks": tasks_for_lists(list_ids or [0]),
+        "career_recommendation": grade_aggregates_for(user_id),
+    }
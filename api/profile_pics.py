@@ -0,0 +1,143 @@
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from .blobs import acquire, blob_path, blob_url, parse_blob_name, release, store_chunks, store_file
+from .models import UserProfile
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+
+PROFILE_PIC_DIR = "profile_pics"
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
+
+
+class InvalidUpload(ValueError):
+    pass
+
+
+def _sizes():
+    return sorted(getattr(settings, "PROFILE_PIC_SIZES", (64, 256)))
+
+
+def pending_url(blob_name):
+    # The original is already stored, so clients can show it until the thumbnails are ready
+    return blob_url(blob_name)
+
+
+def store_upload(upload):
+    ext = os.path.splitext(upload.name or "")[1].lower()
+    if ext not in IMAGE_EXTENSIONS:
+        raise InvalidUpload(f"profile_pic must be one of {', '.join(sorted(IMAGE_EXTENSIONS))}")
+    if upload.size > getattr(settings, "PROFILE_PIC_MAX_BYTES", 5 * 1024 * 1024):
+        raise InvalidUpload("profile_pic is too large")
+
+    return store_chunks(upload.chunks(), ext).name
+
+
+def _render(source):
+    # Returns the variant URLs by size and format, the blobs they point at
+    # and the blob used as profile_pic
+    if Image is None:
+        # Without Pillow only the original can be published
+        return {}, [], None
+
+    variants = {}
+    blobs = {}
+    with Image.open(source) as image, tempfile.TemporaryDirectory() as scratch:
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        for size in _sizes():
+            thumbnail = ImageOps.fit(image, (size, size), Image.LANCZOS)
+            webp = os.path.join(scratch, f"{size}.webp")
+            jpeg = os.path.join(scratch, f"{size}.jpg")
+            thumbnail.save(webp, "WEBP", quality=80, method=4)
+            thumbnail.save(jpeg, "JPEG", quality=85, optimize=True)
+            blobs[size] = {"webp": store_file(webp, ".webp"), "jpeg": store_file(jpeg, ".jpg")}
+            variants[str(size)] = {fmt: blob_url(blob.name) for fmt, blob in blobs[size].items()}
+    stored = [blob for formats in blobs.values() for blob in formats.values()]
+    return variants, stored, blobs[_sizes()[-1]]["jpeg"]
+
+
+def remove_legacy_files(user_id):
+    # Uploads from before the blob store were written to media/profile_pics as
+    # <user_id>_<name> or into a per-user directory
+    root = os.path.join(settings.MEDIA_ROOT, PROFILE_PIC_DIR)
+    shutil.rmtree(os.path.join(root, str(user_id)), ignore_errors=True)
+    for name in os.listdir(root) if os.path.isdir(root) else []:
+        path = os.path.join(root, name)
+        if name.startswith(f"{user_id}_") and os.path.isfile(path):
+            os.remove(path)
+
+
+def _publish(user_id, blob_name, variants, stored, main):
+    if main is None:
+        main_name, digests = blob_name, {parse_blob_name(blob_name)[0]}
+    else:
+        main_name, digests = main.name, {blob.digest for blob in stored}
+
+    with transaction.atomic():
+        # A newer upload may have replaced this one while it was rendering
+        profile = (
+            UserProfile.objects.select_for_update()
+            .filter(user_id=user_id, profile_pic_pending=blob_name)
+            .first()
+        )
+        if profile is None:
+            return False
+
+        acquire(digests)
+        release(profile.profile_pic_blobs)
+        profile.profile_pic = blob_url(main_name)
+        profile.profile_pic_variants = variants
+        profile.profile_pic_blobs = sorted(digests)
+        profile.profile_pic_status = UserProfile.PictureStatus.READY
+        profile.profile_pic_pending = None
+        profile.save(update_fields=[
+            "profile_pic", "profile_pic_variants", "profile_pic_blobs", "profile_pic_status",
+            "profile_pic_pending", "updated_at",
+        ])
+    return True
+
+
+def process_upload(user_id, blob_name):
+    try:
+        try:
+            variants, stored, main = _render(blob_path(blob_name))
+        except Exception:
+            UserProfile.objects.filter(user_id=user_id, profile_pic_pending=blob_name).update(
+                profile_pic_status=UserProfile.PictureStatus.FAILED, profile_pic_pending=None
+            )
+            return False
+
+        published = _publish(user_id, blob_name, variants, stored, main)
+        if published:
+            remove_legacy_files(user_id)
+        return published
+    finally:
+        close_old_connections()
+
+
+_lock = threading.Lock()
+_executor = None
+
+
+def _pool():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "PROFILE_PIC_WORKERS", 2), thread_name_prefix="profile-pics"
+            )
+    return _executor
+
+
+def schedule_processing(user_id, blob_name):
+    transaction.on_commit(lambda: _pool().submit(process_upload, user_id, blob_name))
@@ -0,0 +1,112 @@
+from decimal import Decimal
+
+from django.db.models import Count, F, Prefetch, RowRange, Window
+
+from .models import NO_GRADE, PRIORITY_RANKS, CategoryGradeAggregate, Subject, Note, Project, Task, TodoList
+from .pagination import decode_cursor, encode_cursor, encode_sort_cursor, sort_cursor_decoder
+
+
+SUBJECT_FIELDS = (
+    "id", "user_id", "category", "subject_name", "description", "grade",
+    "semester", "school_year", "status", "priority", "created_at",
+)
+
+
+# sort name -> (stored sort column, the same key computed from a SUBJECT_FIELDS row, cursor value parser)
+SUBJECT_SORT_KEYS = {
+    "grade": ("grade_sort", lambda row: NO_GRADE if row[5] is None else row[5], Decimal),
+    "priority": ("priority_rank", lambda row: PRIORITY_RANKS.get(row[9], -1), int),
+}
+
+
+def subjects_for(user_id, filters=None):
+    return Subject.objects.filter(user_id=user_id, **(filters or {})).values_list(*SUBJECT_FIELDS)
+
+
+def sort_subjects(subjects, sort, descending=False):
+    fields = ("created_at", "id")
+    if sort in SUBJECT_SORT_KEYS:
+        fields = (SUBJECT_SORT_KEYS[sort][0],) + fields
+    if sort:
+        subjects = subjects.order_by(*(f"-{field}" if descending else field for field in fields))
+    return subjects, fields
+
+
+def subject_row_key(sort):
+    if sort in SUBJECT_SORT_KEYS:
+        value = SUBJECT_SORT_KEYS[sort][1]
+        return lambda row: (value(row), row[10], row[0])
+    return lambda row: (row[10], row[0])
+
+
+def subject_cursor(sort):
+    if sort in SUBJECT_SORT_KEYS:
+        return sort_cursor_decoder(SUBJECT_SORT_KEYS[sort][2]), encode_sort_cursor
+    return decode_cursor, encode_cursor
+
+
+def notes_for_subjects(subject_ids):
+    return (
+        Note.objects.filter(subject_id__in=subject_ids)
+        .order_by("subject_id", "created_at")
+        .values_list("id", "subject_id", "title", "content", "created_at")
+    )
+
+
+def subjects_with_notes_for(user_id):
+    return Subject.objects.filter(user_id=user_id).prefetch_related(
+        Prefetch("notes", queryset=Note.objects.order_by("-subject_id", "-created_at"))
+    )
+
+
+def note_subjects_for(user_id):
+    return Subject.objects.filter(user_id=user_id).values_list("id", "subject_name", "created_at")
+
+
+def latest_notes_for_subjects(subject_ids, per_subject):
+    # The newest per_subject + 1 notes of each subject in one query; the extra
+    # row tells whether that subject has more. Counting the rows from each
+    # note to the end of its subject walks notes_subject_created_idx forwards,
+    # where numbering them newest first would sort. The rows come back unordered.
+    return (
+        Note.objects.filter(subject_id__in=subject_ids)
+        .annotate(newer=Window(
+            Count("id"), partition_by=F("subject_id"), order_by=(F("created_at"), F("id")), frame=RowRange(0, None)
+        ))
+        .filter(newer__lte=per_subject + 1)
+        .values_list("id", "subject_id", "title", "content", "created_at")
+    )
+
+
+def subject_notes_for(user_id, subject_id):
+    return Note.objects.filter(user_id=user_id, subject_id=subject_id).values_list(
+        "id", "subject_id", "title", "content", "created_at"
+    )
+
+
+def projects_for(user_id):
+    return Project.objects.filter(user_id=user_id).order_by("-created_at")
+
+
+def todo_lists_for(user_id):
+    return (
+        TodoList.objects.filter(user_id=user_id)
+        .order_by("-created_at")
+        .values(
+            "id", "title", "description", "status", "task_total", "task_completed", "created_at", "updated_at",
+        )
+    )
+
+
+def tasks_for_lists(list_ids):
+    return (
+        Task.objects.filter(todo_list_id__in=list_ids)
+        .order_by("todo_list_id", "created_at")
+        .values_list("id", "todo_list_id", "label", "completed")
+    )
+
+
+def grade_aggregates_for(user_id):
+    return CategoryGradeAggregate.objects.filter(user_id=user_id, grade_count__gt=0).values_list(
+        "category", "grade_sum", "grade_count"
+    )
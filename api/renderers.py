@@ -0,0 +1,43 @@
+import datetime
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class IsoJSONEncoder(DjangoJSONEncoder):
+    # Writes dates and times the way orjson does natively, isoformat() with
+    # microseconds and the UTC offset kept, so both renderers agree without
+    # sending every datetime back through Python
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.date, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+# orjson only falls back to it for what it cannot encode, such as Decimal
+_iso_encoder = IsoJSONEncoder()
+
+
+def use_fast_encoder():
+    return orjson is not None and getattr(settings, "FAST_JSON_RENDERER", True)
+
+
+def dumps(data):
+    if use_fast_encoder():
+        return orjson.dumps(data, default=_iso_encoder.default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, cls=IsoJSONEncoder).encode()
+
+
+class FastJsonResponse(HttpResponse):
+    def __init__(self, data, safe=True, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError("In order to allow non-dict objects to be serialized set the safe parameter to False.")
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(content=dumps(data), **kwargs)
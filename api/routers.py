@@ -0,0 +1,141 @@
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+PIN_COOKIE = "primary_pin"
+
+# Apps whose reads must never see replication lag; sessions are read from
+# SESSION_CACHE_ALIAS first anyway
+PRIMARY_ONLY_APPS = {"sessions"}
+
+
+class _RequestState:
+    def __init__(self, request, pinned):
+        self.request = request
+        # None until the first routed read looks up the session user's pin
+        self.pinned = pinned
+        self.wrote = False
+
+
+# Holds a mutable object rather than flags so writes made inside
+# sync_to_async/async_to_sync are seen by the middleware that set it
+_state = ContextVar("primary_replica_state", default=None)
+
+
+def replicas():
+    return [alias for alias in getattr(settings, "DATABASE_REPLICAS", []) if alias in connections.settings]
+
+
+def pin_seconds():
+    return getattr(settings, "REPLICA_PIN_SECONDS", 5)
+
+
+def _pin_cache():
+    # The cache holding the per-user response versions: a client that sees
+    # the version a write bumped also sees the pin set just before it
+    return caches[getattr(settings, "RESPONSE_CACHE_ALIAS", "default")]
+
+
+def _pin_key(user_id):
+    return f"primary-pin:{user_id}"
+
+
+def pin_user(user_id):
+    # Every client of the user reads from 'default' for REPLICA_PIN_SECONDS,
+    # not just the one that wrote
+    if replicas():
+        _pin_cache().set(_pin_key(user_id), True, pin_seconds())
+
+
+def _pinned(state):
+    if state.pinned is None:
+        session = getattr(state.request, "session", None)
+        user_id = session.get("user_id") if session is not None else None
+        state.pinned = bool(user_id) and _pin_cache().get(_pin_key(user_id), False)
+    return state.pinned
+
+
+class PrimaryReplicaRouter:
+    # Reads go to a random DATABASE_REPLICAS alias, writes to 'default'. A
+    # request is pinned to 'default' once it has written, inside a transaction
+    # on 'default', and for REPLICA_PIN_SECONDS after the same client or the
+    # same user wrote (see PrimaryPinMiddleware and pin_user), so users always
+    # read their own writes.
+
+    def db_for_read(self, model, **hints):
+        aliases = replicas()
+        if not aliases or model._meta.app_label in PRIMARY_ONLY_APPS:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        state = _state.get()
+        # Sessions were routed above, so reading the session user here
+        # cannot come back through this method
+        if state is not None and (state.wrote or _pinned(state)):
+            return DEFAULT_DB_ALIAS
+        return random.choice(aliases)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the schema through replication
+        return db not in replicas()
+
+
+class PrimaryPinMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _state.set(self._state_for(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            state = _state.get()
+            _state.reset(token)
+        return self._process_response(request, response, state)
+
+    async def __acall__(self, request):
+        token = _state.set(self._state_for(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            state = _state.get()
+            _state.reset(token)
+        return self._process_response(request, response, state)
+
+    def _state_for(self, request):
+        try:
+            pinned_until = float(request.COOKIES.get(PIN_COOKIE, 0))
+        except ValueError:
+            pinned_until = 0
+        return _RequestState(request, pinned=True if pinned_until > time.time() else None)
+
+    def _process_response(self, request, response, state):
+        if state.wrote and replicas():
+            seconds = pin_seconds()
+            response.set_cookie(
+                PIN_COOKIE, f"{time.time() + seconds:.3f}", max_age=seconds, httponly=True, samesite="Lax"
+            )
+        return response
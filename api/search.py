@@ -0,0 +1,204 @@
+import re
+from collections import Counter
+
+from django.db.models import Case, Max, Q, Sum, Value, When
+
+from .models import Note, SearchTerm, Subject
+from .pagination import decode_values, encode_values
+
+
+TOKEN_RE = re.compile(r"\w+")
+QUERY_TOKEN_RE = re.compile(r"(\w+)(\*?)")
+MIN_TERM_LENGTH = 2
+MAX_TERM_LENGTH = 64
+MAX_QUERY_TERMS = 8
+TITLE_WEIGHT = 3
+SNIPPET_LENGTH = 200
+INDEX_BATCH_SIZE = 1000
+
+# ?type= takes the same names the results carry in "type"
+KINDS = tuple(SearchTerm.Kind.values)
+
+
+def tokenize(text):
+    for token in TOKEN_RE.findall((text or "").lower()):
+        if len(token) >= MIN_TERM_LENGTH:
+            yield token[:MAX_TERM_LENGTH]
+
+
+def document_terms(title, body):
+    weights = Counter()
+    for token in tokenize(title):
+        weights[token] += TITLE_WEIGHT
+    for token in tokenize(body):
+        weights[token] += 1
+    return weights
+
+
+def _document_text(kind, obj):
+    if kind == SearchTerm.Kind.SUBJECT:
+        return obj.subject_name, obj.description
+    return obj.title, obj.content
+
+
+def _search_terms(kind, objects):
+    for obj in objects:
+        for term, weight in document_terms(*_document_text(kind, obj)).items():
+            yield SearchTerm(user_id=obj.user_id, term=term, kind=kind, object_id=obj.pk, weight=weight)
+
+
+def unindex_documents(kind, ids, user_id=None):
+    terms = SearchTerm.objects.filter(kind=kind)
+    if user_id is not None:
+        terms = terms.filter(user_id=user_id)
+    ids = list(ids)
+    for start in range(0, len(ids), INDEX_BATCH_SIZE):
+        terms.filter(object_id__in=ids[start:start + INDEX_BATCH_SIZE]).delete()
+
+
+def unindex_notes(note_ids, user_id=None):
+    unindex_documents(SearchTerm.Kind.NOTE, note_ids, user_id)
+
+
+def unindex_subjects(subject_ids, user_id=None):
+    # Call before deleting: the subjects' notes cascade without signals, so
+    # their terms are dropped here while the notes can still be looked up
+    notes = Note.objects.filter(subject_id__in=subject_ids)
+    if user_id is not None:
+        notes = notes.filter(user_id=user_id)
+    SearchTerm.objects.filter(kind=SearchTerm.Kind.NOTE, object_id__in=notes.values("id")).delete()
+    unindex_documents(SearchTerm.Kind.SUBJECT, subject_ids, user_id)
+
+
+def index_documents(kind, objects):
+    objects = list(objects)
+    unindex_documents(kind, [obj.pk for obj in objects])
+    SearchTerm.objects.bulk_create(_search_terms(kind, objects), batch_size=INDEX_BATCH_SIZE)
+
+
+def latest_id(queryset):
+    return queryset.aggregate(last_id=Max("id"))["last_id"] or 0
+
+
+def index_created(kind, queryset, after_id):
+    # bulk_create does not hand primary keys back on MySQL, so pick the new
+    # rows up by id instead of indexing the unsaved instances
+    index_documents(kind, queryset.filter(id__gt=after_id))
+
+
+def rebuild_search_index(user_id):
+    SearchTerm.objects.filter(user_id=user_id).delete()
+    for kind, model in ((SearchTerm.Kind.SUBJECT, Subject), (SearchTerm.Kind.NOTE, Note)):
+        queryset = model.objects.filter(user_id=user_id).order_by("id")
+        last_id = 0
+        while True:
+            objects = list(queryset.filter(id__gt=last_id)[:INDEX_BATCH_SIZE])
+            if not objects:
+                break
+            SearchTerm.objects.bulk_create(_search_terms(kind, objects), batch_size=INDEX_BATCH_SIZE)
+            last_id = objects[-1].pk
+
+
+class InvalidQuery(ValueError):
+    pass
+
+
+def parse_query(query):
+    terms = []
+    for token, star in QUERY_TOKEN_RE.findall((query or "").lower()):
+        if len(token) < MIN_TERM_LENGTH:
+            continue
+        term = (token[:MAX_TERM_LENGTH], bool(star))
+        if term not in terms:
+            terms.append(term)
+    if not terms:
+        raise InvalidQuery("q must contain at least one word of two or more characters")
+    if len(terms) > MAX_QUERY_TERMS:
+        raise InvalidQuery(f"q may contain at most {MAX_QUERY_TERMS} words")
+    return terms
+
+
+def _term_filter(term, prefix):
+    if not prefix:
+        return Q(term=term)
+    # A range rather than LIKE so every backend can walk the user/term index
+    return Q(term__gte=term, term__lt=term[:-1] + chr(ord(term[-1]) + 1))
+
+
+def ranked_matches(user_id, terms, kinds=None):
+    # Every query word has to match; documents are ranked by the summed term weights
+    matches = SearchTerm.objects.filter(user_id=user_id)
+    if kinds:
+        matches = matches.filter(kind__in=kinds)
+
+    any_term = Q()
+    hits = {}
+    for position, (term, prefix) in enumerate(terms):
+        any_term |= _term_filter(term, prefix)
+        hits[f"hit_{position}"] = Max(Case(When(_term_filter(term, prefix), then=Value(1)), default=Value(0)))
+
+    return (
+        matches.filter(any_term)
+        .values("kind", "object_id")
+        .annotate(score=Sum("weight"), **hits)
+        .filter(**{name: 1 for name in hits})
+        .order_by("-score", "kind", "object_id")
+    )
+
+
+def search_page(user_id, terms, kinds, cursor, size):
+    matches = ranked_matches(user_id, terms, kinds)
+    if cursor:
+        try:
+            score, kind, object_id = decode_values(cursor)
+            score, object_id = int(score), int(object_id)
+        except (TypeError, ValueError) as e:
+            raise InvalidQuery("Invalid cursor") from e
+        matches = matches.filter(
+            Q(score__lt=score)
+            | Q(score=score, kind__gt=kind)
+            | Q(score=score, kind=kind, object_id__gt=object_id)
+        )
+
+    rows = list(matches[:size + 1])
+    next_cursor = None
+    if len(rows) > size:
+        rows = rows[:size]
+        last = rows[-1]
+        next_cursor = encode_values(last["score"], last["kind"], last["object_id"])
+    return rows, next_cursor
+
+
+def _snippet(text):
+    text = text or ""
+    return text if len(text) <= SNIPPET_LENGTH else text[:SNIPPET_LENGTH].rstrip() + "…"
+
+
+def search_results(rows):
+    ids = {SearchTerm.Kind.SUBJECT: [], SearchTerm.Kind.NOTE: []}
+    for row in rows:
+        ids[row["kind"]].append(row["object_id"])
+
+    subjects = {}
+    if ids[SearchTerm.Kind.SUBJECT]:
+        subjects = {
+            pk: {"subject_name": name, "snippet": _snippet(description), "created_at": created_at}
+            for pk, name, description, created_at in Subject.objects.filter(
+                id__in=ids[SearchTerm.Kind.SUBJECT]
+            ).values_list("id", "subject_name", "description", "created_at")
+        }
+    notes = {}
+    if ids[SearchTerm.Kind.NOTE]:
+        notes = {
+            pk: {"subject_id": subject_id, "title": title, "snippet": _snippet(content), "created_at": created_at}
+            for pk, subject_id, title, content, created_at in Note.objects.filter(
+                id__in=ids[SearchTerm.Kind.NOTE]
+            ).values_list("id", "subject_id", "title", "content", "created_at")
+        }
+
+    results = []
+    for row in rows:
+        found = (subjects if row["kind"] == SearchTerm.Kind.SUBJECT else notes).get(row["object_id"])
+        if found is not None:
+            results.append({"type": row["kind"], "id": row["object_id"], "score": row["score"], **found})
+    return results
@@ -0,0 +1,161 @@
+from .pagination import split_page
+from .profile_pics import pending_url
+
+
+CAREER_MAPPING = {
+    "Programming": "Software Developer",
+    "Database": "Database Administrator",
+    "Networking": "Cloud Architect",
+    "Security": "Cybersecurity Specialist",
+    "Electives": "System Analyst",
+}
+
+
+def serialize_user(user):
+    return {
+        "id": user.id,
+        "username": user.username,
+        "email": user.email,
+        "full_name": user.full_name
+    }
+
+
+def serialize_profile(user, profile):
+    return {
+        "user": {
+            "id": user.id,
+            "username": user.username,
+            "email": user.email,
+            "full_name": user.full_name or "",
+        },
+        "profile": {
+            "profile_pic": profile.profile_pic or "",
+            "profile_pic_status": profile.profile_pic_status,
+            "profile_pic_pending": (
+                pending_url(profile.profile_pic_pending) if profile.profile_pic_pending else ""
+            ),
+            "profile_pic_variants": profile.profile_pic_variants or {},
+            "address": profile.address or "",
+            "school": profile.school or "",
+            "course": profile.course or "",
+            "bio": profile.bio or "",
+        }
+    }
+
+
+def serialize_subjects(subject_rows):
+    data = []
+    notes_by_subject = {}
+    for (subject_id, owner_id, category, subject_name, description, grade,
+         semester, school_year, status, priority, created_at) in subject_rows:
+        notes_list = notes_by_subject[subject_id] = []
+        data.append({
+            "id": subject_id,
+            "user": owner_id,
+            "category": category,
+            "subject_name": subject_name,
+            "description": description,
+            "grade": grade,
+            "semester": semester,
+            "school_year": school_year,
+            "status": status,
+            "priority": priority,
+            "notes": notes_list
+        })
+    return data, notes_by_subject
+
+
+def attach_subject_notes(notes_by_subject, note_rows):
+    for note_id, subject_id, title, content, created_at in note_rows:
+        notes_by_subject[subject_id].append({
+            "id": note_id,
+            "title": title,
+            "content": content,
+            "created_at": created_at,
+        })
+
+
+def serialize_subject_notes(subjects):
+    return [
+        {
+            "subject_id": subject.id,
+            "subject_name": subject.subject_name,
+            "notes": [{"id": n.id, "title": n.title, "content": n.content} for n in subject.notes.all()]
+        }
+        for subject in subjects
+    ]
+
+
+def note_row_key(row):
+    return row[4], row[0]
+
+
+def serialize_note_rows(note_rows):
+    return [{"id": note_id, "title": title, "content": content} for note_id, _, title, content, _ in note_rows]
+
+
+def serialize_subject_note_pages(subject_rows, note_rows, per_subject):
+    # Each subject carries its first per_subject notes and a cursor for the
+    # rest, which ?subject=<id>&cursor=<notes_next_cursor> pages through
+    notes_by_subject = {subject_id: [] for subject_id, _, _ in subject_rows}
+    for row in sorted(note_rows, key=note_row_key, reverse=True):
+        notes_by_subject[row[1]].append(row)
+
+    data = []
+    for subject_id, subject_name, _ in subject_rows:
+        notes, next_cursor = split_page(notes_by_subject[subject_id], (None, per_subject), note_row_key)
+        data.append({
+            "subject_id": subject_id,
+            "subject_name": subject_name,
+            "notes": serialize_note_rows(notes),
+            "notes_next_cursor": next_cursor,
+        })
+    return data
+
+
+def serialize_project(project):
+    return {
+        "id": project.id,
+        "title": project.title,
+        "description": project.description,
+        "status": project.status,
+        "created_at": project.created_at,
+        "updated_at": project.updated_at
+    }
+
+
+def serialize_todo_lists(list_rows, task_rows):
+    tasks_by_list = {todo_list["id"]: [] for todo_list in list_rows}
+    for task_id, list_id, label, completed in task_rows:
+        tasks_by_list[list_id].append({
+            "id": task_id,
+            "label": label,
+            "completed": completed,
+        })
+
+    return [
+        {
+            "id": todo_list["id"],
+            "title": todo_list["title"],
+            "description": todo_list["description"],
+            "status": todo_list["status"],
+            "created_at": todo_list["created_at"],
+            "updated_at": todo_list["updated_at"],
+            "task_total": todo_list["task_total"],
+            "task_completed": todo_list["task_completed"],
+            "tasks": tasks_by_list[todo_list["id"]]
+        }
+        for todo_list in list_rows
+    ]
+
+
+def recommendation_payload(category_avg):
+    if not category_avg:
+        return {"message": "No graded subjects available", "recommendation": None, "category_average_grades": {}}
+
+    best_category = max(category_avg, key=category_avg.get)
+    return {
+        "category_average_grades": category_avg,
+        "best_category": best_category,
+        "recommended_career": CAREER_MAPPING.get(best_category, "General IT"),
+    }
@@ -0,0 +1,69 @@
+import threading
+from contextlib import contextmanager
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .aggregates import normalize_grade, record_grade_change
+from .blobs import release
+from .models import Note, SearchTerm, Subject, UserProfile
+from .search import index_documents
+
+
+_suspended = threading.local()
+
+
+@contextmanager
+def suspend_grade_aggregates():
+    _suspended.depth = getattr(_suspended, "depth", 0) + 1
+    try:
+        yield
+    finally:
+        _suspended.depth -= 1
+
+
+def _aggregates_suspended():
+    return getattr(_suspended, "depth", 0) > 0
+
+
+def _grade_state(subject):
+    return subject.user_id, subject.category, normalize_grade(subject.grade)
+
+
+@receiver(post_save, sender=Subject)
+def update_grade_aggregates_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw or _aggregates_suspended():
+        return
+    new = _grade_state(instance)
+    old = None if created else getattr(instance, "_loaded_grade", None)
+    if old is not None:
+        old = (old[0], old[1], normalize_grade(old[2]))
+    record_grade_change(old, new)
+    instance._loaded_grade = new
+
+
+@receiver(post_delete, sender=Subject)
+def update_grade_aggregates_on_delete(sender, instance, **kwargs):
+    if _aggregates_suspended():
+        return
+    old = getattr(instance, "_loaded_grade", None)
+    old = _grade_state(instance) if old is None else (old[0], old[1], normalize_grade(old[2]))
+    record_grade_change(old, None)
+
+
+# Deletes are unindexed by the views through search.unindex_subjects/unindex_notes
+@receiver(post_save, sender=Subject)
+def index_subject_on_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_documents(SearchTerm.Kind.SUBJECT, [instance])
+
+
+@receiver(post_save, sender=Note)
+def index_note_on_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_documents(SearchTerm.Kind.NOTE, [instance])
+
+
+@receiver(post_delete, sender=UserProfile)
+def release_profile_blobs_on_delete(sender, instance, **kwargs):
+    release(instance.profile_pic_blobs)
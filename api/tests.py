@@ -1,3 +1,1241 @@
-from django.test import TestCase
+import asyncio
+import csv
+import io
+import json
+import tempfile
+import threading
+import time as clock
+import tracemalloc
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock, skipIf
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, connections
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import imports
+from .aggregates import category_averages, find_inconsistencies, rebuild_aggregates, stored_aggregates
+from .auth import invalidate_session_user
+from .benchmarks import bench_databases
+from .blobs import blob_path, parse_blob_name, store_chunks
+from .cache import get_user_version
+from .checks import check_events_backend
+from .events import CacheBackend, LocalBackend
+from .imports import decode_lines, import_subjects, subject_reader
+from .hashing import _pool
+from .metrics import query_totals, registry
+from .models import MediaBlob, Note, Project, Subject, Task, TodoList, User, UserProfile
+from .plans import explain, list_queries, plan_problems
+from .profile_pics import Image, process_upload
+from .renderers import dumps, orjson
+from .throttle import take_token
+
+
+TEST_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "test-default"},
+    "shared": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "test-shared"},
+}
+
+
+def create_user(username):
+    return User.objects.create(username=username, email=f"{username}@example.com", password_hash="!")
+
+
+def create_rows(user, subjects=3, notes=2, projects=2, todo_lists=2, tasks=3):
+    for i in range(subjects):
+        subject = Subject.objects.create(user=user, subject_name=f"Subject {i}", grade=80 + i)
+        for j in range(notes):
+            Note.objects.create(user=user, subject=subject, title=f"Note {i}.{j}", content="Notes on the subject")
+    for i in range(projects):
+        Project.objects.create(user=user, title=f"Project {i}")
+    for i in range(todo_lists):
+        todo_list = TodoList.objects.create(user=user, title=f"List {i}")
+        Task.objects.bulk_create(Task(todo_list=todo_list, label=f"Task {j}", completed=j == 0) for j in range(tasks))
+    TodoList.recount_tasks(TodoList.objects.filter(user=user))
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ApiTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("alice")
+        create_rows(cls.user)
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        invalidate_session_user(self.user.id)
+        self.login(self.user)
+
+    def login(self, user):
+        session = self.client.session
+        session["user_id"] = user.id
+        session.save()
+
+    def send(self, method, url, data=None):
+        if data is None:
+            return getattr(self.client, method)(url)
+        return getattr(self.client, method)(url, json.dumps(data), content_type="application/json")
+
+
+class ProfileTests(ApiTestCase):
+    def test_requires_session(self):
+        self.client.logout()
+        response = self.client.get(f"/profile/{self.user.id}/")
+        self.assertEqual(response.status_code, 401)
+
+    def test_other_users_profile_is_forbidden(self):
+        other = create_user("bob")
+        response = self.client.get(f"/profile/{other.id}/")
+        self.assertEqual(response.status_code, 403)
+
+    def test_own_profile(self):
+        response = self.client.get(f"/profile/{self.user.id}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["user"]["username"], "alice")
+
+
+@override_settings(LOGIN_THROTTLE_RATES={"ip": (5, 60), "username": (2, 60)}, PASSWORD_HASH_ITERATIONS=1000)
+class LoginTests(ApiTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        with override_settings(PASSWORD_HASH_ITERATIONS=1000):
+            User.objects.filter(id=cls.user.id).update(password_hash=make_password("secret"))
+
+    def log_in(self, username="alice", password="secret"):
+        return self.send("post", "/api/login/", {"username": username, "password": password})
+
+    def test_token_bucket(self):
+        self.assertEqual([take_token("test", "x", 2, 60) for _ in range(3)], [0, 0, 30])
+        with mock.patch("api.throttle.time.time", return_value=clock.time() + 30):
+            self.assertEqual(take_token("test", "x", 2, 60), 0)
+            self.assertGreater(take_token("test", "x", 2, 60), 0)
+
+    def test_throttles_per_username_and_ip(self):
+        self.assertEqual(self.log_in().status_code, 200)
+        self.assertEqual(self.log_in("ALICE", "wrong").status_code, 400)
+        response = self.log_in("Alice")
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "30")
+        # other usernames only count against the ip bucket
+        self.assertEqual(self.log_in("bob").status_code, 400)
+        self.assertEqual(self.log_in("carol").status_code, 400)
+        self.assertEqual(self.log_in("dave").status_code, 429)
+
+    def test_username_and_password_must_be_strings(self):
+        for username, password in ((123, "secret"), ("alice", 123), (["alice"], "secret"), (None, None)):
+            with self.subTest(username=username, password=password):
+                self.assertEqual(self.log_in(username, password).status_code, 400)
+
+    def test_busy_hashing_pool(self):
+        executor, _ = _pool()
+        slots = threading.BoundedSemaphore(1)
+        slots.acquire()
+        with mock.patch("api.hashing._pool", return_value=(executor, slots)):
+            response = self.log_in()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "1")
+        self.assertEqual(self.log_in().status_code, 200)
+
+    def test_rehash_on_login(self):
+        with override_settings(PASSWORD_HASH_ITERATIONS=1200):
+            self.assertEqual(self.log_in().status_code, 200)
+            password_hash = User.objects.get(id=self.user.id).password_hash
+            self.assertEqual(identify_hasher(password_hash).safe_summary(password_hash)["iterations"], 1200)
+            # already current: left alone
+            self.assertEqual(self.log_in().status_code, 200)
+            self.assertEqual(User.objects.get(id=self.user.id).password_hash, password_hash)
+
+
+class QueryCountTests(ApiTestCase):
+    # Queries per endpoint once the session itself is cached. Every request
+    # loads the session user (1 query) unless it is cached for the process.
+    READS = [
+        ("/api/current_user/", 1),
+        ("/api/subjects/", 3),
+        ("/api/subjects/?page_size=2", 3),
+        ("/api/notes/fetch/", 3),
+        ("/api/notes/fetch/?page_size=2", 3),
+        ("/api/projects/", 2),
+        ("/api/projects/?page_size=1", 2),
+        ("/api/statuses/", 3),
+        ("/api/statuses/?page_size=1", 3),
+        ("/api/career_recommendation/", 2),
+        ("/api/dashboard/", 7),
+        ("/api/search/?q=subject", 4),
+        ("/api/sync/", 6),
+    ]
+
+    def test_reads(self):
+        for url, queries in self.READS:
+            with self.subTest(url=url):
+                invalidate_session_user(self.user.id)
+                with self.assertNumQueries(queries):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_reads_do_not_grow_with_rows(self):
+        create_rows(self.user, subjects=6, notes=4, projects=4, todo_lists=4, tasks=6)
+        for cache in caches.all():
+            cache.clear()
+        self.login(self.user)
+        self.test_reads()
+
+    def test_cached_response(self):
+        self.client.get("/api/subjects/")
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/subjects/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_cache_off(self):
+        with override_settings(RESPONSE_CACHE_TIMEOUT=0):
+            self.client.get("/api/subjects/")
+            with self.assertNumQueries(2):
+                response = self.client.get("/api/subjects/")
+        self.assertNotIn("ETag", response)
+
+    def test_session_user_is_cached(self):
+        self.client.get("/api/current_user/")
+        with self.assertNumQueries(0):
+            self.client.get("/api/current_user/")
+
+    def test_writes(self):
+        subject = Subject.objects.filter(user=self.user).first()
+        todo_list = TodoList.objects.filter(user=self.user).first()
+        task = todo_list.tasks.first()
+        writes = [
+            ("post", "/api/subjects/add/", {"subject_name": "New", "grade": "90"}, 5),
+            ("post", "/api/notes/", {"title": "New", "content": "Body", "subject": subject.id}, 5),
+            ("post", "/api/add_project/", {"title": "New"}, 2),
+            ("post", "/api/statuses/add/", {"title": "New"}, 2),
+            ("post", f"/api/tasks/add/{todo_list.id}/", {"label": "New"}, 7),
+            ("put", f"/api/tasks/toggle/{task.id}/", None, 7),
+            ("delete", f"/api/tasks/delete/{task.id}/", None, 8),
+        ]
+        for method, url, data, queries in writes:
+            with self.subTest(url=url):
+                invalidate_session_user(self.user.id)
+                with self.assertNumQueries(queries):
+                    response = self.send(method, url, data)
+                self.assertLess(response.status_code, 300)
+
+
+class GradeAggregateTests(ApiTestCase):
+    def assertAggregates(self, expected):
+        self.assertEqual(find_inconsistencies([self.user.id]), [])
+        self.assertEqual(
+            {category: (float(grade_sum), count) for (_, category), (grade_sum, count)
+             in stored_aggregates([self.user.id]).items()},
+            expected,
+        )
+
+    def test_created_by_signals(self):
+        self.assertAggregates({"Programming": (243, 3)})
+        Subject.objects.create(user=self.user, subject_name="Ungraded")
+        self.assertAggregates({"Programming": (243, 3)})
+
+    def test_edit(self):
+        subject = Subject.objects.get(user=self.user, grade=80)
+        self.assertEqual(self.send("patch", f"/api/subjects/edit/{subject.id}/", {"grade": "90.5"}).status_code, 200)
+        self.assertAggregates({"Programming": (253.5, 3)})
+        self.send("patch", f"/api/subjects/edit/{subject.id}/", {"category": "Database"})
+        self.assertAggregates({"Programming": (163, 2), "Database": (90.5, 1)})
+        self.send("patch", f"/api/subjects/edit/{subject.id}/", {"grade": None})
+        self.assertAggregates({"Programming": (163, 2)})
+
+    def test_delete(self):
+        subject = Subject.objects.get(user=self.user, grade=81)
+        self.assertEqual(self.send("post", f"/delete-subject/{subject.id}/").status_code, 200)
+        self.assertAggregates({"Programming": (162, 2)})
+
+    def test_bulk_create_update_and_delete(self):
+        response = self.send("post", "/api/subjects/bulk/", {"subjects": [
+            {"subject_name": "SQL", "category": "Database", "grade": 70},
+            {"subject_name": "Ungraded", "category": "Database"},
+            {"subject_name": "Firewalls", "category": "Security", "grade": "88.25"},
+        ]})
+        self.assertEqual(response.json()["created"], 3)
+        self.assertAggregates({"Programming": (243, 3), "Database": (70, 1), "Security": (88.25, 1)})
+
+        ids = dict(Subject.objects.filter(user=self.user).values_list("subject_name", "id"))
+        response = self.send("patch", "/api/subjects/bulk/", {"subjects": [
+            {"id": ids["SQL"], "grade": 75},
+            {"id": ids["Ungraded"], "grade": 60},
+            {"id": ids["Firewalls"], "category": "Networking"},
+        ]})
+        self.assertEqual(response.json()["updated"], 3)
+        self.assertAggregates({"Programming": (243, 3), "Database": (135, 2), "Networking": (88.25, 1)})
+
+        response = self.send("delete", "/api/subjects/bulk/", {"ids": [ids["SQL"], ids["Subject 0"]]})
+        self.assertEqual(response.json()["deleted"], 2)
+        self.assertAggregates({"Programming": (163, 2), "Database": (60, 1), "Networking": (88.25, 1)})
+
+    def test_rebuild(self):
+        other = create_user("bob")
+        Subject.objects.create(user=other, subject_name="Other", category="Security", grade=50)
+        # drift that the signals never see
+        Subject.objects.filter(user=self.user, grade=82).update(grade=100)
+        self.assertEqual(
+            find_inconsistencies([self.user.id]),
+            [(self.user.id, "Programming", (Decimal("243.00"), 3), (Decimal("261.00"), 3))],
+        )
+        rebuild_aggregates([self.user.id])
+        self.assertAggregates({"Programming": (261, 3)})
+        self.assertEqual(stored_aggregates([other.id]), {(other.id, "Security"): (Decimal("50.00"), 1)})
+
+    def test_recommendation_reads_the_aggregates(self):
+        Subject.objects.create(user=self.user, subject_name="SQL", category="Database", grade=95)
+        with self.assertNumQueries(1):
+            self.assertEqual(category_averages(self.user.id), {"Programming": 81.0, "Database": 95.0})
+
+    def test_rebuild_command_expires_cached_dashboards(self):
+        other = create_user("bob")
+        url = "/api/dashboard/?sections=recommendation"
+        before = self.client.get(url).json()["recommendation"]
+        Subject.objects.filter(user=self.user).update(category="Database")
+        self.assertEqual(self.client.get(url).json()["recommendation"], before)
+
+        versions = get_user_version(self.user.id), get_user_version(other.id)
+        call_command("rebuild_grade_aggregates", "alice", stdout=io.StringIO())
+        self.assertNotEqual(self.client.get(url).json()["recommendation"], before)
+        self.assertNotEqual(get_user_version(self.user.id), versions[0])
+        self.assertEqual(get_user_version(other.id), versions[1])
+
+
+class ImportTests(ApiTestCase):
+    CSV = (
+        "\ufeffsubject_name, category ,grade,status,priority\n"
+        "Algorithms,Programming,91.5,Completed,HIGH\n"
+        "Routing,Cooking,80,Pending,LOW\n"
+        ",Database,70,Pending,LOW\n"
+        "\"Multi\nline\",Database,,Ongoing,\n"
+        "Grades,Security,abc,Pending,LOW\n"
+        "Firewalls,Security,88,,\n"
+    )
+
+    def imported(self):
+        return dict(Subject.objects.filter(user=self.user, grade__gt=85).values_list("subject_name", "grade"))
+
+    def assertImported(self, response):
+        self.assertEqual(response.status_code, 200, response.content)
+        body = response.json()
+        self.assertEqual((body["created"], body["failed"]), (3, 3))
+        self.assertEqual([error["line"] for error in body["errors"]], [3, 4, 7])
+        self.assertIn("category", body["errors"][0]["error"])
+        self.assertIn("subject_name", body["errors"][1]["error"])
+        self.assertEqual(self.imported(), {"Algorithms": Decimal("91.50"), "Firewalls": Decimal("88.00")})
+        self.assertTrue(Subject.objects.filter(user=self.user, subject_name="Multi\nline", grade=None).exists())
+        self.assertEqual(find_inconsistencies([self.user.id]), [])
+
+    def test_raw_csv(self):
+        self.assertImported(self.client.post("/api/subjects/import/", self.CSV.encode(), content_type="text/csv"))
+
+    def test_multipart(self):
+        upload = SimpleUploadedFile("grades.csv", self.CSV.encode(), content_type="text/csv")
+        self.assertImported(self.client.post("/api/subjects/import/", {"file": upload}))
+        self.assertEqual(self.client.post("/api/subjects/import/", {"other": "x"}).status_code, 400)
+
+    def test_invalid_header(self):
+        for body in (b"", b"name,grade\nAlgorithms,90\n", b"\xff\xfe,subject_name\n"):
+            with self.subTest(body=body):
+                response = self.client.post("/api/subjects/import/", body, content_type="text/csv")
+                self.assertEqual(response.status_code, 400)
+
+    def test_undecodable_line_stops_the_import(self):
+        body = b"subject_name,grade\nAlgorithms,90\nBad \xff,90\nNever,90\n"
+        response = self.client.post("/api/subjects/import/", body, content_type="text/csv")
+        self.assertEqual(response.json()["created"], 1)
+        self.assertEqual(response.json()["errors"], [{"line": 3, "error": "Line is not valid UTF-8; import stopped"}])
+
+    def test_batches_and_error_limit(self):
+        lines = ["subject_name,category"] + [f"Row {i},{'Nope' if i % 2 else 'Database'}" for i in range(9)]
+        reader = subject_reader(decode_lines(f"{line}\n".encode() for line in lines))
+        # 5 good rows in batches of 2 are three bulk inserts
+        with mock.patch("api.imports._write_batch", wraps=imports._write_batch) as write:
+            result = import_subjects(self.user.id, reader, batch_size=2, max_errors=3)
+        self.assertEqual([len(call.args[1]) for call in write.call_args_list], [2, 2, 1])
+        self.assertEqual((result["created"], result["failed"]), (5, 4))
+        self.assertEqual([error["line"] for error in result["errors"]], [3, 5, 7])
+
+    def test_command(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", encoding="utf-8") as source:
+            source.write(self.CSV)
+            source.flush()
+            stdout, stderr = io.StringIO(), io.StringIO()
+            call_command("import_subjects", "alice", source.name, "--batch-size", "1", stdout=stdout, stderr=stderr)
+        self.assertIn("Imported 3 subjects for alice, 3 rows failed", stdout.getvalue())
+        self.assertEqual(stderr.getvalue().count("line "), 3)
+        self.assertEqual(len(self.imported()), 2)
+
+
+class DashboardTests(ApiTestCase):
+    def test_all_sections(self):
+        body = self.client.get("/api/dashboard/").json()
+        self.assertEqual(set(body), {"success", "user", "subjects", "projects", "todo_lists", "recommendation"})
+        self.assertEqual(len(body["subjects"]["items"]), 3)
+        self.assertEqual([len(item["notes"]) for item in body["subjects"]["items"]], [2, 2, 2])
+        self.assertEqual([len(item["tasks"]) for item in body["todo_lists"]["items"]], [3, 3])
+        self.assertIsNone(body["projects"]["next_cursor"])
+
+    def test_sections_and_page_sizes(self):
+        params = {"sections": "projects,subjects,projects", "projects_page_size": 1, "subjects_page_size": 0}
+        body = self.client.get("/api/dashboard/", params).json()
+        self.assertEqual(set(body), {"success", "user", "projects", "subjects"})
+        self.assertEqual(len(body["projects"]["items"]), 1)
+        # clamped to one row
+        self.assertEqual(len(body["subjects"]["items"]), 1)
+
+        # the cursors carry on at the section's own endpoint
+        rest = self.client.get("/api/projects/", {"cursor": body["projects"]["next_cursor"]}).json()
+        self.assertEqual(
+            [project["title"] for project in body["projects"]["items"] + rest["projects"]], ["Project 1", "Project 0"]
+        )
+        rest = self.client.get("/api/subjects/", {"cursor": body["subjects"]["next_cursor"], "page_size": 5}).json()
+        self.assertEqual([subject["subject_name"] for subject in rest["subjects"]], ["Subject 1", "Subject 2"])
+
+    def test_invalid_params(self):
+        for params in ({"sections": "subjects,bogus"}, {"subjects_page_size": "many"}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get("/api/dashboard/", params).status_code, 400)
+        self.client.session.flush()
+        self.client.cookies.clear()
+        self.assertEqual(self.client.get("/api/dashboard/").status_code, 401)
+
+
+class AsyncDashboardTests(TransactionTestCase):
+    # The async dashboard reads each section on its own connection, which
+    # cannot see rows left uncommitted by TestCase
+
+    def setUp(self):
+        self.user = create_user("alice")
+        create_rows(self.user)
+        invalidate_session_user(self.user.id)
+        session = self.client.session
+        session["user_id"] = self.user.id
+        session.save()
+
+    async def test_matches_the_sync_dashboard(self):
+        params = {"sections": "subjects,todo_lists,recommendation", "todo_lists_page_size": 1}
+        expected = (await sync_to_async(self.client.get)("/api/dashboard/", params)).json()
+        self.async_client.cookies = self.client.cookies
+        response = await self.async_client.get("/api/async/dashboard/", params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), expected)
+        self.assertEqual(len(expected["todo_lists"]["items"]), 1)
+        self.assertEqual(
+            (await self.async_client.get("/api/async/dashboard/", {"sections": "bogus"})).status_code, 400
+        )
+
+
+@override_settings(SYNC_CLOCK_SKEW=0)
+class SyncTests(ApiTestCase):
+    def sync(self, **params):
+        changes = {section: [] for section in ("subjects", "notes", "projects", "todo_lists", "tasks")}
+        deleted, pages = [], 0
+        while True:
+            response = self.client.get("/api/sync/", params)
+            self.assertEqual(response.status_code, 200, response.content)
+            body = response.json()
+            pages += 1
+            for section, rows in body["changes"].items():
+                changes[section] += rows
+            deleted += body["deleted"]
+            if body["next_cursor"] is None:
+                self.assertIsNotNone(body["watermark"])
+                return changes, deleted, body["watermark"], pages
+            self.assertIsNone(body["watermark"])
+            params = {"cursor": body["next_cursor"], "page_size": params.get("page_size", "")}
+
+    def test_pages_through_every_section(self):
+        full, deleted, _, pages = self.sync()
+        self.assertEqual(pages, 1)
+        self.assertEqual(deleted, [])
+        paged, _, _, pages = self.sync(page_size=4)
+        # 3 subjects, 6 notes, 2 projects, 2 lists and 6 tasks, four at a time
+        self.assertEqual(pages, 5)
+        self.assertEqual(paged, full)
+        self.assertEqual({section: len(rows) for section, rows in paged.items()},
+                         {"subjects": 3, "notes": 6, "projects": 2, "todo_lists": 2, "tasks": 6})
+        self.assertEqual(len({row["id"] for row in paged["notes"]}), 6)
+
+    def test_changes_and_tombstones_since_the_watermark(self):
+        _, _, watermark, _ = self.sync()
+        subject = Subject.objects.filter(user=self.user).order_by("id").first()
+        note_ids = set(subject.notes.values_list("id", flat=True))
+        todo_list = TodoList.objects.filter(user=self.user).order_by("id").first()
+        task_ids = set(todo_list.tasks.values_list("id", flat=True))
+        project = Project.objects.filter(user=self.user).first()
+        self.send("post", f"/delete-subject/{subject.id}/")
+        self.send("delete", f"/api/statuses/delete/{todo_list.id}/")
+        self.send("post", f"/api/projects/edit/{project.id}/", {"title": "Renamed"})
+
+        changes, deleted, watermark, _ = self.sync(since=watermark, page_size=2)
+        self.assertEqual([row["title"] for row in changes["projects"]], ["Renamed"])
+        self.assertEqual(changes["subjects"] + changes["notes"] + changes["tasks"], [])
+        tombstones = {}
+        for row in deleted:
+            tombstones.setdefault(row["kind"], set()).add(row["id"])
+        # the notes and tasks went with their subject and list, without signals
+        self.assertEqual(tombstones, {
+            "subjects": {subject.id}, "notes": note_ids, "todo_lists": {todo_list.id}, "tasks": task_ids,
+        })
+
+        changes, deleted, _, _ = self.sync(since=watermark)
+        self.assertEqual((sum(map(len, changes.values())), deleted), (0, []))
+
+    def test_invalid_params(self):
+        for params in ({"since": "garbage"}, {"cursor": "garbage"}, {"page_size": "x"}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get("/api/sync/", params).status_code, 400)
+
+    @override_settings(DELETION_LOG_RETENTION=60)
+    def test_expired_watermark(self):
+        _, _, watermark, _ = self.sync()
+        with mock.patch("api.changes.timezone.now", return_value=timezone.now() + timedelta(minutes=2)):
+            self.assertEqual(self.client.get("/api/sync/", {"since": watermark}).status_code, 410)
+
+
+class TodoListTests(ApiTestCase):
+    def test_lists_and_tasks_in_two_queries(self):
+        self.client.get("/api/current_user/")
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/statuses/")
+
+        statuses = response.json()["statuses"]
+        self.assertEqual(len(statuses), 2)
+        for status in statuses:
+            self.assertEqual([task["label"] for task in status["tasks"]], ["Task 0", "Task 1", "Task 2"])
+            self.assertEqual((status["task_total"], status["task_completed"]), (3, 1))
+
+    def test_two_queries_regardless_of_size(self):
+        create_rows(self.user, subjects=0, projects=0, todo_lists=20, tasks=10)
+        self.client.get("/api/current_user/")
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/statuses/")
+        self.assertEqual(len(response.json()["statuses"]), 22)
+
+    def test_pages_keep_their_tasks(self):
+        self.client.get("/api/current_user/")
+        with self.assertNumQueries(2):
+            first = self.client.get("/api/statuses/?page_size=1").json()
+        second = self.client.get(f"/api/statuses/?page_size=1&cursor={first['next_cursor']}").json()
+
+        self.assertIsNone(second["next_cursor"])
+        pages = first["statuses"] + second["statuses"]
+        self.assertEqual(len({status["id"] for status in pages}), 2)
+        self.assertTrue(all(len(status["tasks"]) == 3 for status in pages))
+
+    def test_counters_follow_task_writes(self):
+        todo_list = TodoList.objects.filter(user=self.user).first()
+        task = todo_list.tasks.get(completed=True)
+        response = self.client.delete(f"/api/tasks/delete/{task.id}/")
+        self.assertEqual(response.json()["new_status"], "ONGOING")
+
+        todo_list.refresh_from_db()
+        self.assertEqual((todo_list.task_total, todo_list.task_completed), (2, 0))
+
+    def test_counters_never_go_below_zero(self):
+        todo_list = TodoList.objects.create(user=self.user, title="Drifted")
+        status = TodoList.adjust_task_counters(todo_list.id, total=-1, completed=-1)
+
+        todo_list.refresh_from_db()
+        self.assertEqual((todo_list.task_total, todo_list.task_completed), (0, 0))
+        self.assertEqual(status, "ONGOING")
+
+    def test_repair_command_expires_cached_lists(self):
+        TodoList.objects.filter(user=self.user).update(task_total=99)
+        self.assertEqual({row["task_total"] for row in self.client.get("/api/statuses/").json()["statuses"]}, {99})
+
+        call_command("repair_task_counters", "--batch-size", "1", stdout=io.StringIO())
+        self.assertEqual({row["task_total"] for row in self.client.get("/api/statuses/").json()["statuses"]}, {3})
+
+
+class NoteTests(ApiTestCase):
+    def test_notes_per_subject_are_capped(self):
+        subject = Subject.objects.filter(user=self.user).first()
+        Note.objects.bulk_create(Note(user=self.user, subject=subject, title=f"Extra {i}") for i in range(5))
+        response = self.client.get("/api/notes/fetch/?page_size=10&notes_page_size=3")
+        self.assertEqual(response.status_code, 200)
+        pages = {page["subject_id"]: page for page in response.json()["subjects"]}
+        self.assertEqual(len(pages[subject.id]["notes"]), 3)
+        self.assertIsNotNone(pages[subject.id]["notes_next_cursor"])
+        for subject_id, page in pages.items():
+            if subject_id != subject.id:
+                self.assertEqual(len(page["notes"]), 2)
+                self.assertIsNone(page["notes_next_cursor"])
+
+        seen = [note["id"] for note in pages[subject.id]["notes"]]
+        cursor = pages[subject.id]["notes_next_cursor"]
+        while cursor:
+            with self.assertNumQueries(1):
+                page = self.client.get(f"/api/notes/fetch/?subject={subject.id}&page_size=3&cursor={cursor}").json()
+            seen += [note["id"] for note in page["notes"]]
+            cursor = page["next_cursor"]
+        expected = Note.objects.filter(subject=subject).order_by("-created_at", "-id").values_list("id", flat=True)
+        self.assertEqual(seen, list(expected))
+
+    def test_other_users_subject(self):
+        other = create_user("bob")
+        create_rows(other, subjects=1)
+        subject = Subject.objects.get(user=other)
+        response = self.client.get(f"/api/notes/fetch/?subject={subject.id}")
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(f"/api/async/notes/fetch/?subject={subject.id}")
+        self.assertEqual(response.status_code, 404)
+
+    def test_invalid_params(self):
+        for query in ("subject=abc", "notes_page_size=x"):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(f"/api/notes/fetch/?{query}").status_code, 400)
+
+
+class BulkTests(ApiTestCase):
+    def test_notes_with_unhashable_subjects(self):
+        subject = Subject.objects.filter(user=self.user).first()
+        response = self.send("post", "/api/notes/bulk/", {"notes": [
+            {"title": "A", "content": "a", "subject": [subject.id]},
+            {"title": "B", "content": "b", "subject": {"id": subject.id}},
+            {"title": "C", "content": "c", "subject": subject.id},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["created"], 1)
+        self.assertEqual([error["index"] for error in response.json()["errors"]], [0, 1])
+
+    def test_body_not_utf8(self):
+        for url in ("/api/subjects/bulk/", "/api/notes/bulk/", f"/api/tasks/bulk/{TodoList.objects.first().id}/"):
+            with self.subTest(url=url):
+                response = self.client.post(url, b'{"items": "\xff"}', content_type="application/json")
+                self.assertEqual(response.status_code, 400)
+
+    def test_duplicate_ids_in_patch(self):
+        note = Note.objects.filter(user=self.user).first()
+        response = self.send("patch", "/api/notes/bulk/", {"notes": [
+            {"id": note.id, "title": "First"},
+            {"id": note.id, "title": "Second"},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["updated"], 1)
+        self.assertEqual(response.json()["errors"], [{"index": 1, "error": "Duplicate id"}])
+        note.refresh_from_db()
+        self.assertEqual(note.title, "First")
+
+
+class SubjectListTests(ApiTestCase):
+    PRIORITY_RANKS = {"LOW": 0, "MODERATE": 1, "HIGH": 2}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = create_user("sorter")
+        created_at = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+        grades = [None, 75, 90, None, 75, 88, 90, 60, None, 75]
+        for i, grade in enumerate(grades):
+            Subject.objects.create(
+                user=cls.user, subject_name=f"Subject {i}", grade=grade,
+                category=["Programming", "Database"][i % 2],
+                status=["Ongoing", "Pending", "Completed"][i % 3],
+                priority=["LOW", "MODERATE", "HIGH"][i % 3],
+                # repeated timestamps leave the id to break ties
+                created_at=created_at.replace(day=1 + i // 3),
+            )
+
+    def pages(self, url, query, page_size=3):
+        names, cursor = [], None
+        while True:
+            params = {**query, "page_size": page_size, **({"cursor": cursor} if cursor else {})}
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200, response.content)
+            body = response.json()
+            self.assertLessEqual(len(body["subjects"]), page_size)
+            names += [subject["subject_name"] for subject in body["subjects"]]
+            cursor = body["next_cursor"]
+            if cursor is None:
+                return names
+
+    def expected(self, filters, sort):
+        descending = sort.startswith("-")
+        field = sort.lstrip("-")
+        rows = list(Subject.objects.filter(user=self.user, **filters))
+
+        def key(subject):
+            if field == "grade":
+                value = Decimal(-1) if subject.grade is None else subject.grade
+            elif field == "priority":
+                value = self.PRIORITY_RANKS[subject.priority]
+            else:
+                return subject.created_at, subject.id
+            return value, subject.created_at, subject.id
+
+        return [subject.subject_name for subject in sorted(rows, key=key, reverse=descending)]
+
+    def test_sorted_and_filtered_pages(self):
+        self.login(self.user)
+        filters = [{}, {"status": "Ongoing"}, {"category": "Database"}, {"priority": ["LOW", "HIGH"]}]
+        for url in ("/api/subjects/", "/api/async/subjects/"):
+            for sort in ("created_at", "-created_at", "grade", "-grade", "priority", "-priority"):
+                for query in filters:
+                    lookups = {f"{k}__in" if isinstance(v, list) else k: v for k, v in query.items()}
+                    with self.subTest(url=url, sort=sort, query=query):
+                        self.assertEqual(
+                            self.pages(url, {**query, "sort": sort}), self.expected(lookups, sort)
+                        )
+
+    def test_sort_columns_follow_writes(self):
+        subject = Subject.objects.filter(user=self.user, grade__isnull=True).first()
+        subject.grade = 99
+        subject.priority = "HIGH"
+        subject.save()
+        subject = Subject.objects.get(id=subject.id)
+        self.assertEqual((subject.grade_sort, subject.priority_rank), (99, 2))
+        Subject.objects.filter(id=subject.id).update(grade=None, priority="LOW")
+        subject = Subject.objects.get(id=subject.id)
+        self.assertEqual((subject.grade_sort, subject.priority_rank), (-1, 0))
+
+    def test_cursor_must_match_the_sort(self):
+        self.login(self.user)
+        cursor = self.client.get("/api/subjects/", {"page_size": 2}).json()["next_cursor"]
+        response = self.client.get("/api/subjects/", {"sort": "grade", "page_size": 2, "cursor": cursor})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get("/api/subjects/", {"sort": "bogus"})
+        self.assertEqual(response.status_code, 400)
+
+
+class QueryPlanTests(ApiTestCase):
+    # query -> the index its plan has to use
+    INDEXES = {
+        "get_subjects (page)": "subjects_user_created_idx",
+        "get_subjects ?school_year&semester (page)": "subjects_user_term_idx",
+        "get_subjects ?status (page)": "subjects_user_status_idx",
+        "get_subjects ?priority (page)": "subjects_user_priority_idx",
+        "get_subjects ?sort=grade (page)": "subjects_user_grade_sort_idx",
+        "get_subjects ?sort=-grade (page)": "subjects_user_grade_sort_idx",
+        "get_subjects ?sort=priority (page)": "subjects_user_prio_rank_idx",
+        "get_subjects ?sort=-priority (page)": "subjects_user_prio_rank_idx",
+        "get_subjects ?status&sort=grade (page)": "subjects_user_grade_sort_idx",
+        "get_subjects ?category&sort=-priority (page)": "subjects_user_prio_rank_idx",
+        "get_subjects notes": "notes_subject_created_idx",
+        "get_notes notes": "notes_subject_created_idx",
+        "get_notes ?subject (page)": "notes_subject_created_idx",
+        "get_projects (page)": "projects_user_created_idx",
+        "get_todo_lists (page)": "todo_lists_user_created_idx",
+        "get_todo_lists tasks": "tasks_list_created_idx",
+    }
+
+    def test_no_full_scans_or_sorts(self):
+        for name, queryset in list_queries(self.user.id).items():
+            with self.subTest(query=name):
+                self.assertEqual(plan_problems(queryset), [])
+
+    def test_expected_indexes(self):
+        queries = list_queries(self.user.id)
+        for name, index in self.INDEXES.items():
+            with self.subTest(query=name):
+                self.assertIn(index, explain(queries[name]))
+
+
+class ExportTests(ApiTestCase):
+    def rows(self, response):
+        return [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+
+    def test_ndjson(self):
+        response = self.client.get("/api/export/")
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+
+        sections = [row["section"] for row in self.rows(response)]
+        self.assertEqual(
+            {section: sections.count(section) for section in sections},
+            {"subjects": 3, "notes": 6, "projects": 2, "todo_lists": 2, "tasks": 6},
+        )
+
+    def test_csv(self):
+        response = self.client.get("/api/export/?format=csv&sections=notes")
+        rows = list(csv.reader(io.StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual(rows[0], ["id", "subject_id", "title", "content", "created_at", "updated_at"])
+        self.assertEqual(len(rows), 7)
+
+    def test_invalid_params(self):
+        self.assertEqual(self.client.get("/api/export/?format=xml").status_code, 400)
+        self.assertEqual(self.client.get("/api/export/?format=csv").status_code, 400)
+        self.assertEqual(self.client.get("/api/export/?sections=users").status_code, 400)
+
+    @override_settings(EXPORT_CHUNK_SIZE=100)
+    def test_streams_in_bounded_chunks(self):
+        subject = Subject.objects.filter(user=self.user).first()
+        content = "x" * 1000
+        Note.objects.bulk_create(
+            Note(user=self.user, subject=subject, title=f"Bulk {i}", content=content) for i in range(3000)
+        )
+
+        response = self.client.get("/api/export/?sections=notes")
+        chunks = total = 0
+        tracemalloc.start()
+        try:
+            for chunk in response.streaming_content:
+                chunks += 1
+                total += len(chunk)
+                self.assertLessEqual(chunk.count(b"\n"), 100)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        response.close()
+
+        self.assertEqual(chunks, 31)
+        # Only one chunk of rows is held at a time, never the whole export
+        self.assertLess(peak, total / 4)
+
+
+class ETagTests(ApiTestCase):
+    def test_cached_response_matches_weakly(self):
+        etag = self.client.get("/api/subjects/")["ETag"]
+        for header in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+            with self.subTest(header=header):
+                self.assertEqual(self.client.get("/api/subjects/", headers={"If-None-Match": header}).status_code, 304)
+        self.assertEqual(self.client.get("/api/subjects/", headers={"If-None-Match": '"other"'}).status_code, 200)
+
+    def test_blob(self):
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            url = f"/media/blobs/{store_chunks([b'GIF89a'], '.gif').name}"
+            response = self.client.get(url)
+            response.close()
+            etag = response["ETag"]
+            for header in (etag, f"W/{etag}", "*"):
+                with self.subTest(header=header):
+                    self.assertEqual(self.client.get(url, headers={"If-None-Match": header}).status_code, 304)
+            # A tag that merely contains this one is a different tag
+            response = self.client.get(url, headers={"If-None-Match": f'"x{etag[1:]}'})
+            self.assertEqual(response.status_code, 200)
+            response.close()
+            missing = "/media/blobs/" + "0" * 64 + ".gif"
+            self.assertEqual(self.client.get(missing, headers={"If-None-Match": "*"}).status_code, 404)
+
+
+@skipIf(Image is None, "Pillow is not installed")
+class ProfilePictureTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name, PROFILE_PIC_SIZES=(64, 256)))
+        # Rendered here, on the test's connection, instead of on the pool after commit
+        self.enterContext(mock.patch("api.views.schedule_processing"))
+        self.enterContext(mock.patch("api.profile_pics.close_old_connections"))
+
+    def image(self, color, name="me.png"):
+        data = io.BytesIO()
+        Image.new("RGB", (300, 200), color).save(data, "PNG")
+        return SimpleUploadedFile(name, data.getvalue(), content_type="image/png")
+
+    def upload(self, upload):
+        response = self.client.post(f"/profile/{self.user.id}/", {"profile_pic": upload})
+        self.assertEqual(response.status_code, 200, response.content)
+        return UserProfile.objects.get(user=self.user).profile_pic_pending
+
+    def refcounts(self):
+        return dict(MediaBlob.objects.values_list("digest", "refcount"))
+
+    def test_renders_each_size_and_format(self):
+        pending = self.upload(self.image("red"))
+        profile = self.client.get(f"/profile/{self.user.id}/").json()["profile"]
+        self.assertEqual((profile["profile_pic_status"], profile["profile_pic"]), ("pending", ""))
+        self.assertEqual(profile["profile_pic_pending"], f"/media/blobs/{pending}")
+
+        self.assertTrue(process_upload(self.user.id, pending))
+        profile = self.client.get(f"/profile/{self.user.id}/").json()["profile"]
+        self.assertEqual(profile["profile_pic_status"], "ready")
+        self.assertEqual(profile["profile_pic"], profile["profile_pic_variants"]["256"]["jpeg"])
+        for size, formats in profile["profile_pic_variants"].items():
+            for fmt, url in formats.items():
+                with self.subTest(size=size, fmt=fmt), Image.open(blob_path(url.rsplit("/", 1)[1])) as image:
+                    self.assertEqual((image.format, image.size), (fmt.upper(), (int(size), int(size))))
+
+        # The four variants are referenced; the original was only a source
+        stored = UserProfile.objects.get(user=self.user).profile_pic_blobs
+        self.assertEqual(len(stored), 4)
+        self.assertEqual(self.refcounts(), {**{digest: 1 for digest in stored}, parse_blob_name(pending)[0]: 0})
+
+    def test_reupload_moves_the_references(self):
+        process_upload(self.user.id, self.upload(self.image("red")))
+        red = UserProfile.objects.get(user=self.user).profile_pic_blobs
+
+        # Identical content renders to the same blobs, still referenced once
+        process_upload(self.user.id, self.upload(self.image("red", "again.jpg")))
+        self.assertEqual(UserProfile.objects.get(user=self.user).profile_pic_blobs, red)
+        self.assertEqual([self.refcounts()[digest] for digest in red], [1] * 4)
+
+        process_upload(self.user.id, self.upload(self.image("blue")))
+        blue = UserProfile.objects.get(user=self.user).profile_pic_blobs
+        refcounts = self.refcounts()
+        self.assertEqual([refcounts[digest] for digest in red], [0] * 4)
+        self.assertEqual([refcounts[digest] for digest in blue], [1] * 4)
+
+        # Deleting the profile lets go of them too
+        UserProfile.objects.get(user=self.user).delete()
+        self.assertEqual(set(self.refcounts().values()), {0})
+
+    def test_superseded_upload_is_not_published(self):
+        first = self.upload(self.image("red"))
+        second = self.upload(self.image("green"))
+        self.assertFalse(process_upload(self.user.id, first))
+        self.assertTrue(process_upload(self.user.id, second))
+        self.assertEqual(sum(self.refcounts().values()), 4)
+
+    def test_unreadable_image(self):
+        pending = self.upload(SimpleUploadedFile("me.png", b"not a png"))
+        self.assertFalse(process_upload(self.user.id, pending))
+        self.assertEqual(UserProfile.objects.get(user=self.user).profile_pic_status, "failed")
+
+    def test_rejects_other_files(self):
+        for upload in (SimpleUploadedFile("me.exe", b"MZ"), self.image("red")):
+            with self.subTest(name=upload.name), override_settings(PROFILE_PIC_MAX_BYTES=100):
+                response = self.client.post(f"/profile/{self.user.id}/", {"profile_pic": upload})
+                self.assertEqual(response.status_code, 400)
+
+
+class EventBackendTests(SimpleTestCase):
+    def test_local_ids_and_backlog(self):
+        backend = LocalBackend()
+        self.assertEqual([backend.publish(1, {"n": n}) for n in range(3)], [1, 2, 3])
+        self.assertEqual(backend.read(1, 1), ([(2, {"n": 1}), (3, {"n": 2})], 3, False))
+        self.assertEqual(backend.read(1, 7), ([], 3, True))
+
+    @override_settings(EVENTS_TTL=60)
+    def test_local_drops_idle_streams(self):
+        backend = LocalBackend()
+        backend.publish(1, {})
+        backend.publish(2, {})
+        backend.streams[2].waiters.add(object())
+        for stream in backend.streams.values():
+            stream.touched -= 120
+        backend.pruned_at -= 120
+
+        backend.publish(3, {})
+        self.assertEqual(sorted(backend.streams), [2, 3])
+        # A client still holding an id from the dropped stream is told to refetch
+        self.assertEqual(backend.read(1, 1), ([], 0, True))
+
+    @override_settings(EVENTS_CACHE_ALIAS="shared", CACHES=TEST_CACHES)
+    def test_cache_backend_needs_atomic_counters(self):
+        with self.assertRaises(ImproperlyConfigured):
+            CacheBackend()
+
+
+    @override_settings(EVENTS_BACKEND="api.events.CacheBackend", EVENTS_CACHE_ALIAS="shared", CACHES=TEST_CACHES)
+    def test_checked_at_startup(self):
+        self.assertEqual([error.id for error in check_events_backend(None)], ["api.E002"])
+        with override_settings(EVENTS_BACKEND="api.events.Missing"):
+            self.assertEqual([error.id for error in check_events_backend(None)], ["api.E001"])
+        with override_settings(EVENTS_BACKEND="api.events.LocalBackend"):
+            self.assertEqual(check_events_backend(None), [])
+
+    @override_settings(EVENTS_CACHE_ALIAS="shared", CACHES=TEST_CACHES, EVENTS_POLL_INTERVAL=0.01)
+    async def test_cache_backend_wait(self):
+        with mock.patch("api.events.ATOMIC_CACHE_BACKENDS", (TEST_CACHES["shared"]["BACKEND"],)):
+            backend = CacheBackend()
+        backend.cache.clear()
+        started = clock.monotonic()
+        self.assertEqual(await backend.wait(1, 0, 0.05), ([], 0, False))
+        self.assertGreaterEqual(clock.monotonic() - started, 0.05)
+        self.assertEqual([backend.publish(1, {"n": n}) for n in range(2)], [1, 2])
+        self.assertEqual(await backend.wait(1, 0, 5), ([(1, {"n": 0}), (2, {"n": 1})], 2, False))
+        # an event that expired is reported as lost once it stays missing
+        backend.cache.delete(backend._event_key(1, 2))
+        self.assertEqual(await backend.wait(1, 1, 5), ([], 2, True))
+
+
+@override_settings(EVENTS_HEARTBEAT=0.02, EVENTS_STREAM_SECONDS=0.1, EVENTS_LONG_POLL_SECONDS=0.2)
+class EventStreamTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.backend = LocalBackend()
+        self.enterContext(mock.patch("api.events._backend", self.backend))
+        self.async_client.cookies = self.client.cookies
+
+    def publish(self, count):
+        return [
+            self.backend.publish(self.user.id, {"kind": "tasks", "action": "created", "id": n}) for n in range(count)
+        ]
+
+    async def stream(self, **headers):
+        response = await self.async_client.get("/api/async/events/", headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        events = []
+        async for chunk in response.streaming_content:
+            lines = [line.split(": ", 1) for line in chunk.decode().splitlines()]
+            lines = dict(line for line in lines if len(line) == 2)
+            if "event" in lines:
+                events.append((lines["event"], int(lines["id"]), json.loads(lines["data"])))
+        return events
+
+    async def test_starts_at_the_latest_event(self):
+        self.publish(2)
+        self.assertEqual(await self.stream(), [])
+
+    async def test_resumes_from_last_event_id(self):
+        self.publish(3)
+        events = await self.stream(**{"Last-Event-ID": "1"})
+        self.assertEqual([(kind, event_id, data["id"]) for kind, event_id, data in events], [
+            ("change", 2, 1), ("change", 3, 2),
+        ])
+
+    @override_settings(EVENTS_BACKLOG=2)
+    async def test_resets_when_events_were_lost(self):
+        self.backend = LocalBackend()
+        self.enterContext(mock.patch("api.events._backend", self.backend))
+        self.publish(5)
+        # 2 and 3 aged out of the backlog, and 9 was never sent
+        for last_event_id in ("1", "9"):
+            with self.subTest(last_event_id=last_event_id):
+                self.assertEqual(await self.stream(**{"Last-Event-ID": last_event_id}), [("reset", 5, {"last_id": 5})])
+        self.assertEqual([event_id for _, event_id, _ in await self.stream(**{"Last-Event-ID": "3"})], [4, 5])
+
+    async def test_delivers_live_events(self):
+        response = await self.async_client.get("/api/async/events/", {"after": "0"})
+        chunks = aiter(response.streaming_content)
+        self.assertEqual(await anext(chunks), b"retry: 3000\n\n")
+        self.publish(1)
+        self.assertTrue((await anext(chunks)).startswith(b"id: 1\nevent: change\n"))
+
+    async def test_invalid_last_event_id(self):
+        response = await self.async_client.get("/api/async/events/", headers={"Last-Event-ID": "-1"})
+        self.assertEqual(response.status_code, 400)
+
+    async def poll(self, **params):
+        response = await self.async_client.get("/api/async/events/poll/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    async def test_long_poll(self):
+        self.publish(2)
+        self.assertEqual(await self.poll(), {"success": True, "events": [], "last_id": 2, "reset": False})
+        body = await self.poll(after=1)
+        self.assertEqual(([event["event_id"] for event in body["events"]], body["reset"]), ([2], False))
+        self.assertEqual((await self.poll(after=7))["reset"], True)
+
+    async def test_long_poll_timeouts(self):
+        for timeout, at_least, at_most in (("0.05", 0.05, 1), ("60", 0.2, 2), ("0", 0, 0.5)):
+            with self.subTest(timeout=timeout):
+                started = clock.monotonic()
+                self.assertEqual((await self.poll(after=0, timeout=timeout))["events"], [])
+                self.assertTrue(at_least <= clock.monotonic() - started < at_most)
+        response = await self.async_client.get("/api/async/events/poll/", {"after": 0, "timeout": "soon"})
+        self.assertEqual(response.status_code, 400)
+
+    async def test_long_poll_wakes_on_publish(self):
+        started = clock.monotonic()
+        poll = asyncio.ensure_future(self.poll(after=0, timeout=10))
+        await asyncio.sleep(0.01)
+        self.publish(1)
+        self.assertEqual([event["event_id"] for event in (await poll)["events"]], [1])
+        self.assertLess(clock.monotonic() - started, 5)
+
+
+class RendererTests(SimpleTestCase):
+    PAYLOAD = {
+        "created_at": datetime(2025, 3, 1, 12, 30, 45, 123456, tzinfo=dt_timezone.utc),
+        "whole_second": datetime(2025, 3, 1, 12, 30, 45, tzinfo=dt_timezone.utc),
+        "naive": datetime(2025, 3, 1, 12, 30, 45, 5),
+        "at": time(8, 15, 0, 250),
+        "due": date(2025, 3, 2),
+        "grade": Decimal("91.50"),
+        1: "int key",
+    }
+
+    @skipIf(orjson is None, "orjson is not installed")
+    def test_fast_and_fallback_encoders_agree(self):
+        with override_settings(FAST_JSON_RENDERER=True):
+            fast = json.loads(dumps(self.PAYLOAD))
+        with override_settings(FAST_JSON_RENDERER=False):
+            fallback = json.loads(dumps(self.PAYLOAD))
+        self.assertEqual(fast, fallback)
+        self.assertEqual(fast["created_at"], "2025-03-01T12:30:45.123456+00:00")
+        self.assertEqual(fast["grade"], "91.50")
+
+
+class SearchTests(ApiTestCase):
+    def test_type_filter_uses_result_types(self):
+        results = self.client.get("/api/search/?q=subject").json()["results"]
+        self.assertEqual({result["type"] for result in results}, {"subject", "note"})
+
+        for kind in ("subject", "note"):
+            with self.subTest(type=kind):
+                results = self.client.get(f"/api/search/?q=subject&type={kind}").json()["results"]
+                self.assertTrue(results)
+                self.assertEqual({result["type"] for result in results}, {kind})
+
+    def test_unknown_type(self):
+        response = self.client.get("/api/search/?q=subject&type=notes")
+        self.assertEqual(response.status_code, 400)
+
+    def test_rebuild_command_expires_cached_results(self):
+        url = "/api/search/?q=subject&type=subject"
+        self.assertEqual(len(self.client.get(url).json()["results"]), 3)
+        Subject.objects.filter(user=self.user).update(subject_name="Course")
+        self.assertEqual(len(self.client.get(url).json()["results"]), 3)
+
+        call_command("rebuild_search_index", "alice", stdout=io.StringIO())
+        self.assertEqual(self.client.get(url).json()["results"], [])
+        self.assertEqual(len(self.client.get("/api/search/?q=course").json()["results"]), 3)
+
+
+class MetricsTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        registry.reset()
+
+    def test_counts_queries_per_view(self):
+        self.client.get("/api/projects/")
+        self.assertEqual(query_totals()["get_projects"], (2, 1))
+        # The wrapper only lives for the request
+        self.assertEqual(connection.execute_wrappers, [])
+
+    async def test_counts_async_view_queries(self):
+        self.async_client.cookies = self.client.cookies
+        response = await self.async_client.get("/api/async/projects/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(query_totals()["async-get_projects"], (2, 1))
+
+    def test_streamed_queries_are_recorded_on_close(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/export/", {"format": "ndjson"})
+            self.assertNotIn("export_data", query_totals())
+            body = b"".join(response.streaming_content)
+        self.assertEqual(query_totals()["export_data"], (len(queries), 1))
+        self.assertGreater(len(queries), 2)
+        self.assertEqual(registry.histograms[("http_response_size_bytes", "export_data")].total, len(body))
+
+        # A client that goes away early is recorded once, with what it was sent
+        response = self.client.get("/api/export/", {"format": "ndjson"})
+        response.close()
+        response.close()
+        self.assertEqual(query_totals()["export_data"][1], 2)
+
+    @override_settings(EVENTS_HEARTBEAT=0.01, EVENTS_STREAM_SECONDS=0.03)
+    async def test_async_streams_are_recorded_on_close(self):
+        self.async_client.cookies = self.client.cookies
+        response = await self.async_client.get("/api/async/events/")
+        self.assertNotIn("async-events", query_totals())
+        size = sum([len(chunk) async for chunk in response.streaming_content])
+        self.assertEqual(query_totals()["async-events"][1], 1)
+        self.assertEqual(registry.histograms[("http_response_size_bytes", "async-events")].total, size)
+
+    def test_disabled_without_token(self):
+        self.assertEqual(self.client.get("/api/metrics/").status_code, 404)
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_requires_token(self):
+        self.client.get("/api/projects/")
+        self.assertEqual(self.client.get("/api/metrics/").status_code, 403)
+        self.assertEqual(self.client.get("/api/metrics/", HTTP_AUTHORIZATION="Bearer wrong").status_code, 403)
+
+        response = self.client.get("/api/metrics/", HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('http_request_db_queries_sum{view="get_projects"} 2', response.content.decode())
+
+
+class BenchCommandTests(ApiTestCase):
+    # The bench clients send Host: localhost, which DEBUG allows
+    @override_settings(ALLOWED_HOSTS=["localhost"])
+    def test_runs_on_the_test_database(self):
+        users = User.objects.count()
+        with bench_databases():
+            self.assertEqual(User.objects.count(), users)
+
+        out = io.StringIO()
+        call_command(
+            "bench", "endpoints", "current_user", "async_get_notes", "--requests", "2", "--warmup", "0",
+            "--users", "1", "--subjects", "2", "--projects", "1", "--todo-lists", "1", stdout=out, stderr=io.StringIO(),
+        )
+        report = json.loads(out.getvalue())
+        endpoints = report["endpoints"]
+        self.assertEqual({name: result["errors"] for name, result in endpoints.items()},
+                         {"current_user": 0, "async_get_notes": 0})
+        # Every request reaches the view, and the cache hits are reported apart
+        self.assertEqual(endpoints["async_get_notes"]["queries_per_request"], 2)
+        self.assertEqual(list(report["cached"]), ["async_get_notes"])
+        self.assertEqual(report["cached"]["async_get_notes"]["queries_per_request"], 0)
+        self.assertEqual(User.objects.count(), users)
+
+    def test_url_transport_needs_bench_database(self):
+        with self.assertRaisesMessage(CommandError, "BENCH_DATABASE"):
+            call_command("bench", "endpoints", "--transport", "url", "--base-url", "http://127.0.0.1:1")
+
+
+@skipIf(connection.vendor != "sqlite", "copies the primary with SQLite's backup API")
+@override_settings(CACHES=TEST_CACHES, DATABASE_REPLICAS=["replica"], REPLICA_PIN_SECONDS=60)
+class ReplicaRouterTests(TransactionTestCase):
+    # A second SQLite database stands in for a replica that stopped
+    # replicating: a copy of the primary taken in setUp. The alias only
+    # exists while these tests run, so the runner sets up 'default' alone.
+    databases = "__all__"
+
+    @classmethod
+    def setUpClass(cls):
+        cls.replica_file = tempfile.NamedTemporaryFile(suffix=".sqlite3")
+        connections.settings["replica"] = {**connections["default"].settings_dict, "NAME": cls.replica_file.name}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections["replica"].close()
+        del connections["replica"]
+        del connections.settings["replica"]
+        cls.replica_file.close()
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.user = create_user("alice")
+        create_rows(self.user, subjects=1, notes=0, projects=0, todo_lists=0)
+        invalidate_session_user(self.user.id)
+
+        connections["default"].ensure_connection()
+        connections["replica"].ensure_connection()
+        connections["default"].connection.backup(connections["replica"].connection)
+        Subject.objects.using("replica").update(subject_name="Stale")
+
+    def client_for(self, user):
+        client = Client()
+        session = client.session
+        session["user_id"] = user.id
+        session.save()
+        return client
+
+    def subject_names(self, client):
+        response = client.get("/api/subjects/")
+        self.assertEqual(response.status_code, 200)
+        return sorted(subject["subject_name"] for subject in response.json()["subjects"])
+
+    def test_reads_go_to_the_replica(self):
+        self.assertEqual(self.subject_names(self.client_for(self.user)), ["Stale"])
+
+    def test_writes_pin_every_client_of_the_user(self):
+        writer, other = self.client_for(self.user), self.client_for(self.user)
+        self.assertEqual(self.subject_names(other), ["Stale"])
+
+        response = writer.post(
+            "/api/subjects/add/", json.dumps({"subject_name": "Fresh"}), content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Subject.objects.using("replica").filter(subject_name="Fresh").count(), 0)
+        # Neither the other device nor the response cache serves the replica's rows
+        self.assertEqual(self.subject_names(other), ["Fresh", "Subject 0"])
+        self.assertEqual(self.subject_names(writer), ["Fresh", "Subject 0"])
+
+        # Once the pin (and with it the cached versions) is gone, reads go
+        # back to the replica
+        Subject.objects.using("replica").filter(user=self.user).delete()
+        caches["default"].clear()
+        self.assertEqual(self.subject_names(other), [])
 
-# Create your tests here.
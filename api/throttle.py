@@ -0,0 +1,43 @@
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+def _cache():
+    return caches[getattr(settings, "THROTTLE_CACHE_ALIAS", "default")]
+
+
+def take_token(scope, ident, capacity, period):
+    # Token bucket of `capacity` tokens refilled evenly over `period` seconds.
+    # Returns 0 when a token was taken, otherwise seconds until the next one.
+    cache = _cache()
+    key = f"throttle:{scope}:{hashlib.sha1(ident.encode()).hexdigest()}"
+    now = time.time()
+    rate = capacity / period
+
+    tokens, updated = cache.get(key, (capacity, now))
+    tokens = min(capacity, tokens + (now - updated) * rate)
+    if tokens < 1:
+        cache.set(key, (tokens, now), period)
+        return math.ceil((1 - tokens) / rate)
+
+    cache.set(key, (tokens - 1, now), period)
+    return 0
+
+
+def client_ip(request):
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def throttle_wait(request, username=None):
+    rates = getattr(settings, "LOGIN_THROTTLE_RATES", {})
+    idents = {"ip": client_ip(request), "username": (username or "").lower()}
+
+    wait = 0
+    for scope, (capacity, period) in rates.items():
+        if idents.get(scope):
+            wait = max(wait, take_token(scope, idents[scope], capacity, period))
+    return wait
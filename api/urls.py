@@ -1,5 +1,9 @@
 from django.contrib.auth import views
 from django.urls import path
+from .async_views import (
+    aget_user, aget_subjects, acurrent_user, acareer_recommendation, aget_notes, aget_projects, aget_todo_lists,
+    adashboard, aevents, apoll_events,
+)
 from .views import (
     register_user,
     login_user,
@@ -7,7 +11,9 @@ from .views import (
     logout_view,
     add_subject, get_subjects, edit_subject, delete_subject, current_user, career_recommendation, create_note,
     get_notes, edit_note, delete_note, profile_view, add_project, get_projects, edit_project, delete_project,
-    delete_task, add_task, toggle_task, get_todo_lists, add_todo_list, edit_todo_list, delete_todo_list
+    delete_task, add_task, toggle_task, get_todo_lists, add_todo_list, edit_todo_list, delete_todo_list,
+    bulk_subjects, bulk_notes, bulk_tasks, export_data, import_subjects_csv, search, serve_blob, metrics,
+    dashboard, sync_changes,
 )
 
 urlpatterns = [
@@ -19,13 +25,18 @@ urlpatterns = [
     path("api/subjects/", get_subjects, name="get-subjects"),
     path("api/subjects/edit/<int:subject_id>/", edit_subject, name="edit-subject"),
     path('delete-subject/<int:id>/', delete_subject, name='delete-subject'),
+    path("api/subjects/bulk/", bulk_subjects, name="bulk-subjects"),
+    path("api/subjects/import/", import_subjects_csv, name="import-subjects"),
     path('api/current_user/', current_user, name='current_user'),
     path('api/career_recommendation/', career_recommendation, name='career_recommendation'),
+    path('api/dashboard/', dashboard, name='dashboard'),
     path('api/notes/', create_note, name='create_note'),
     path("api/notes/fetch/", get_notes, name="get_notes"),
     path("api/notes/edit/<int:note_id>/", edit_note, name="edit_note"),
     path("api/notes/delete/<int:note_id>/", delete_note, name="delete_note"),
+    path("api/notes/bulk/", bulk_notes, name="bulk_notes"),
     path('profile/<int:user_id>/', profile_view, name='profile'),
+    path('media/blobs/<str:name>', serve_blob, name='media-blob'),
     path("api/add_project/", add_project, name="add_project"),
     path("api/projects/", get_projects, name="get_projects"),
     path("api/projects/edit/<int:project_id>/", edit_project, name="edit_project"),
@@ -33,8 +44,24 @@ urlpatterns = [
     path('api/tasks/add/<int:list_id>/', add_task, name='add_task'),
     path('api/tasks/toggle/<int:task_id>/', toggle_task, name='toggle_task'),
     path('api/tasks/delete/<int:task_id>/', delete_task, name='delete_task'),
+    path('api/tasks/bulk/<int:list_id>/', bulk_tasks, name='bulk_tasks'),
     path('api/statuses/', get_todo_lists, name='get_todo_lists'),
     path('api/statuses/add/', add_todo_list, name='add_todo_list'),
     path('api/statuses/edit/<int:list_id>/', edit_todo_list, name='edit_todo_list'),
     path('api/statuses/delete/<int:list_id>/', delete_todo_list, name='delete_todo_list'),
+    path('api/search/', search, name='search'),
+    path('api/export/', export_data, name='export_data'),
+    path('api/sync/', sync_changes, name='sync'),
+    path('api/metrics/', metrics, name='metrics'),
+
+    path('api/async/user/<int:user_id>/', aget_user, name='async-user-detail'),
+    path("api/async/subjects/", aget_subjects, name="async-get-subjects"),
+    path('api/async/current_user/', acurrent_user, name='async-current_user'),
+    path('api/async/career_recommendation/', acareer_recommendation, name='async-career_recommendation'),
+    path("api/async/notes/fetch/", aget_notes, name="async-get_notes"),
+    path("api/async/projects/", aget_projects, name="async-get_projects"),
+    path('api/async/statuses/', aget_todo_lists, name='async-get_todo_lists'),
+    path('api/async/dashboard/', adashboard, name='async-dashboard'),
+    path('api/async/events/', aevents, name='async-events'),
+    path('api/async/events/poll/', apoll_events, name='async-poll-events'),
 ]
@@ -0,0 +1,153 @@
+from decimal import Decimal, InvalidOperation
+
+from .models import Subject
+
+
+SUBJECT_CATEGORIES = {choice for choice, _ in Subject.CATEGORY_CHOICES}
+SUBJECT_STATUSES = {choice for choice, _ in Subject.STATUS_CHOICES}
+SUBJECT_PRIORITIES = {choice for choice, _ in Subject.PRIORITY_LEVELS}
+
+SUBJECT_DEFAULTS = {
+    "category": "Programming",
+    "description": "",
+    "grade": None,
+    "semester": "",
+    "school_year": "",
+    "status": "Pending",
+    "priority": "MODERATE",
+}
+
+
+class InvalidPayload(ValueError):
+    pass
+
+
+def _text(data, field, max_length=None, required=False):
+    value = data.get(field)
+    if value is None or value == "":
+        if required:
+            raise InvalidPayload(f"{field} is required")
+        return value
+    if not isinstance(value, str):
+        raise InvalidPayload(f"{field} must be a string")
+    if max_length and len(value) > max_length:
+        raise InvalidPayload(f"{field} must be at most {max_length} characters")
+    return value
+
+
+def _choice(data, field, choices):
+    value = data.get(field)
+    if value not in choices:
+        raise InvalidPayload(f"{field} must be one of {', '.join(sorted(choices))}")
+    return value
+
+
+def _grade(value):
+    if value is None or value == "":
+        return None
+    try:
+        grade = Decimal(str(value)).quantize(Decimal("0.01"))
+    except InvalidOperation:
+        raise InvalidPayload("grade must be a number")
+    if not Decimal("0") <= grade < Decimal("1000"):
+        raise InvalidPayload("grade must be between 0 and 999.99")
+    return grade
+
+
+def clean_subject(data, partial=False):
+    if not isinstance(data, dict):
+        raise InvalidPayload("Expected an object")
+    if not partial:
+        data = {**SUBJECT_DEFAULTS, **data}
+
+    cleaned = {}
+    if not partial or "subject_name" in data:
+        cleaned["subject_name"] = _text(data, "subject_name", 100, required=True)
+    if "description" in data:
+        cleaned["description"] = _text(data, "description")
+    if "grade" in data:
+        cleaned["grade"] = _grade(data["grade"])
+    if "semester" in data:
+        cleaned["semester"] = _text(data, "semester", 20)
+    if "school_year" in data:
+        cleaned["school_year"] = _text(data, "school_year", 20)
+    if "category" in data:
+        cleaned["category"] = _choice(data, "category", SUBJECT_CATEGORIES)
+    if "status" in data:
+        cleaned["status"] = _choice(data, "status", SUBJECT_STATUSES)
+    if "priority" in data:
+        cleaned["priority"] = _choice(data, "priority", SUBJECT_PRIORITIES)
+    return cleaned
+
+
+def clean_note(data, partial=False):
+    if not isinstance(data, dict):
+        raise InvalidPayload("Expected an object")
+
+    cleaned = {}
+    if not partial or "title" in data:
+        cleaned["title"] = _text(data, "title", 150, required=True)
+    if not partial or "content" in data:
+        cleaned["content"] = _text(data, "content", required=True)
+    return cleaned
+
+
+def clean_task(data, partial=False):
+    if not isinstance(data, dict):
+        raise InvalidPayload("Expected an object")
+
+    cleaned = {}
+    if not partial or "label" in data:
+        cleaned["label"] = _text(data, "label", 255, required=True)
+    if "completed" in data:
+        if not isinstance(data["completed"], bool):
+            raise InvalidPayload("completed must be a boolean")
+        cleaned["completed"] = data["completed"]
+    return cleaned
+
+
+SUBJECT_FILTERS = {
+    "category": SUBJECT_CATEGORIES,
+    "status": SUBJECT_STATUSES,
+    "priority": SUBJECT_PRIORITIES,
+    "semester": None,
+    "school_year": None,
+}
+SUBJECT_SORTS = ("created_at", "grade", "priority")
+
+
+def clean_subject_filters(params):
+    filters = {}
+    for field, choices in SUBJECT_FILTERS.items():
+        values = [value for value in params.getlist(field) if value != ""]
+        if not values:
+            continue
+        if choices is not None:
+            for value in values:
+                _choice({field: value}, field, choices)
+        elif any(len(value) > 20 for value in values):
+            raise InvalidPayload(f"{field} must be at most 20 characters")
+        if len(values) == 1:
+            filters[field] = values[0]
+        else:
+            filters[f"{field}__in"] = values
+    return filters
+
+
+def clean_subject_sort(value):
+    if not value:
+        return None, False
+    descending = value.startswith("-")
+    field = value.lstrip("-")
+    if field not in SUBJECT_SORTS:
+        raise InvalidPayload(f"sort must be one of {', '.join(SUBJECT_SORTS)}, optionally prefixed with -")
+    return field, descending
+
+
+def clean_note_subject(value):
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise InvalidPayload("subject must be an integer")
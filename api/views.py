@@ -1,24 +1,125 @@
 import json
-import os
 
-from django.db.models import Avg, Prefetch
-from django.http import JsonResponse
+from django.conf import settings
+from django.db import transaction
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth import logout
-
-from backend import settings
-from .models import User, Subject, Note, UserProfile, Project, Task, TodoList
-from django.contrib.auth.hashers import make_password, check_password
-
-
-CAREER_MAPPING = {
-    "Programming": "Software Developer",
-    "Database": "Database Administrator",
-    "Networking": "Cloud Architect",
-    "Security": "Cybersecurity Specialist",
-    "Electives": "System Analyst",
-}
+from django.utils import timezone
+
+from .aggregates import category_averages, rebuild_aggregates
+from .auth import get_session_user, invalidate_session_user
+from .blobs import BLOB_MAX_AGE, blob_path, content_type, parse_blob_name
+from .cache import bump_user_version, cached_user_response, etag_matches
+from .changes import InvalidSync, SyncExpired, encode_watermark, record_deletions, sync_page, sync_params
+from .dashboard import InvalidDashboard, build_dashboard, dashboard_params
+from .events import publish_event
+from .hashing import HashingBusy, hash_password, verify_password
+from .export import InvalidExport, export_filename, export_params, export_stream
+from .imports import InvalidImport, decode_lines, import_subjects, subject_reader
+from .metrics import render_prometheus, scrape_authorized
+from .queries import (
+    subjects_for, notes_for_subjects, subjects_with_notes_for, projects_for, todo_lists_for, tasks_for_lists,
+    sort_subjects, subject_row_key, subject_cursor, note_subjects_for, latest_notes_for_subjects, subject_notes_for,
+)
+from .pagination import DEFAULT_NOTES_PER_SUBJECT, InvalidCursor, page_params, page_size, paginate, split_page
+from .models import User, Subject, Note, UserProfile, Project, SearchTerm, Task, TodoList, DeletionLog
+from .profile_pics import InvalidUpload, schedule_processing, store_upload
+from .renderers import FastJsonResponse
+from .search import (
+    KINDS, InvalidQuery, index_created, index_documents, latest_id, parse_query, search_page, search_results,
+    unindex_notes, unindex_subjects,
+)
+from .serializers import (
+    serialize_user, serialize_profile, serialize_subjects, attach_subject_notes, serialize_subject_notes, serialize_project,
+    serialize_todo_lists, recommendation_payload, note_row_key, serialize_note_rows, serialize_subject_note_pages,
+)
+from .signals import suspend_grade_aggregates
+from .throttle import throttle_wait
+from .validation import (
+    InvalidPayload, clean_note, clean_note_subject, clean_subject, clean_subject_filters, clean_subject_sort,
+    clean_task,
+)
+
+
+BULK_MAX_ITEMS = 1000
+BULK_BATCH_SIZE = 500
+
+
+def _bulk_items(request, key):
+    data = json.loads(request.body)
+    items = data.get("ids" if request.method == "DELETE" else key) if isinstance(data, dict) else None
+    if not isinstance(items, list):
+        raise InvalidPayload(f"Expected a list under \"{'ids' if request.method == 'DELETE' else key}\"")
+    if len(items) > BULK_MAX_ITEMS:
+        raise InvalidPayload(f"At most {BULK_MAX_ITEMS} items can be sent per request")
+    return items
+
+
+def _bulk_update(queryset, items, clean, errors):
+    changes = {}
+    for index, item in enumerate(items):
+        try:
+            if not isinstance(item, dict) or type(item.get("id")) is not int:
+                raise InvalidPayload("id is required")
+            if item["id"] in changes:
+                raise InvalidPayload("Duplicate id")
+            changes[item["id"]] = (index, clean(item, partial=True))
+        except InvalidPayload as e:
+            errors.append({"index": index, "error": str(e)})
+
+    objects = queryset.select_for_update().in_bulk(list(changes))
+    now = timezone.now()
+    fields = {"updated_at"}
+    updated = []
+    for pk, (index, cleaned) in changes.items():
+        obj = objects.get(pk)
+        if obj is None:
+            errors.append({"index": index, "error": "Not found"})
+            continue
+        for field, value in cleaned.items():
+            setattr(obj, field, value)
+        obj.updated_at = now
+        fields.update(cleaned)
+        updated.append(obj)
+
+    if updated:
+        queryset.model.objects.bulk_update(updated, sorted(fields), batch_size=BULK_BATCH_SIZE)
+    return updated
+
+
+def _bulk_delete(queryset, ids, errors, user_id, kind):
+    valid_ids = []
+    for index, pk in enumerate(ids):
+        if type(pk) is int:
+            valid_ids.append(pk)
+        else:
+            errors.append({"index": index, "error": "id must be an integer"})
+
+    if not valid_ids:
+        return 0
+    queryset = queryset.filter(id__in=valid_ids)
+    record_deletions(user_id, kind, queryset.values_list("id", flat=True))
+    _, deleted = queryset.delete()
+    return deleted.get(queryset.model._meta.label, 0)
+
+
+def _throttled(request, username=None):
+    wait = throttle_wait(request, username)
+    if not wait:
+        return None
+    response = JsonResponse({"error": "Too many attempts, try again later"}, status=429)
+    response["Retry-After"] = str(wait)
+    return response
+
+
+def _busy():
+    response = JsonResponse({"error": "Server busy, try again shortly"}, status=503)
+    response["Retry-After"] = "1"
+    return response
 
 
 @csrf_exempt
@@ -30,13 +131,22 @@ def register_user(request):
         password = data.get("password")
         full_name = data.get("full_name", "")
 
+        throttled = _throttled(request)
+        if throttled:
+            return throttled
+
         if User.objects.filter(username=username).exists():
             return JsonResponse({"error": "Username already exists"}, status=400)
 
+        try:
+            password_hash = hash_password(password)
+        except HashingBusy:
+            return _busy()
+
         user = User.objects.create(
             username=username,
             email=email,
-            password_hash=make_password(password),
+            password_hash=password_hash,
             full_name=full_name
         )
 
@@ -56,15 +166,29 @@ def login_user(request):
         data = json.loads(request.body)
         username = data.get("username")
         password = data.get("password")
+        if not isinstance(username, str) or not isinstance(password, str):
+            return JsonResponse({"error": "Invalid username or password"}, status=400)
+
+        throttled = _throttled(request, username)
+        if throttled:
+            return throttled
 
         try:
             user = User.objects.get(username=username)
         except User.DoesNotExist:
             return JsonResponse({"error": "Invalid username or password"}, status=400)
 
-        if not check_password(password, user.password_hash):
+        try:
+            valid, upgraded_hash = verify_password(password, user.password_hash)
+        except HashingBusy:
+            return _busy()
+        if not valid:
             return JsonResponse({"error": "Invalid username or password"}, status=400)
 
+        if upgraded_hash:
+            # Only if nobody changed the password since it was read
+            User.objects.filter(id=user.id, password_hash=user.password_hash).update(password_hash=upgraded_hash)
+
         request.session["user_id"] = user.id
 
         return JsonResponse({"message": "Login successful", "user": {"id": user.id, "username": user.username}})
@@ -75,12 +199,7 @@ def login_user(request):
 def get_user(request, user_id):
     try:
         user = User.objects.get(id=user_id)
-        return JsonResponse({
-            "id": user.id,
-            "username": user.username,
-            "email": user.email,
-            "full_name": user.full_name
-        })
+        return FastJsonResponse(serialize_user(user))
     except User.DoesNotExist:
         return JsonResponse({"error": "User not found"}, status=404)
 
@@ -95,7 +214,9 @@ def add_subject(request):
             if not user_id:
                 return JsonResponse({"error": "User not authenticated"}, status=401)
 
-            user = User.objects.get(id=user_id)
+            user = get_session_user(request)
+            if user is None:
+                return JsonResponse({"error": "User not found"}, status=404)
 
             subject = Subject.objects.create(
                 user=user,
@@ -108,6 +229,7 @@ def add_subject(request):
                 status=data.get("status", "Pending"),
                 priority=data.get("priority", "MODERATE"),
             )
+            bump_user_version(user.id)
 
             return JsonResponse({
                 "message": "Subject added successfully",
@@ -119,14 +241,13 @@ def add_subject(request):
                     "priority": subject.priority,
                 }
             }, status=201)
-        except User.DoesNotExist:
-            return JsonResponse({"error": "User not found"}, status=404)
         except Exception as e:
             return JsonResponse({"error": str(e)}, status=500)
     return JsonResponse({"error": "Invalid method"}, status=400)
 
 
 @csrf_exempt
+@cached_user_response("subjects")
 def get_subjects(request):
     if request.method != "GET":
         return JsonResponse({"error": "Invalid method"}, status=400)
@@ -135,39 +256,31 @@ def get_subjects(request):
     if not user_id:
         return JsonResponse({"error": "User not authenticated"}, status=401)
 
-    try:
-        user = User.objects.get(id=user_id)
-    except User.DoesNotExist:
+    user = get_session_user(request)
+    if user is None:
         return JsonResponse({"error": "User not found"}, status=404)
 
-    subjects = Subject.objects.filter(user=user).prefetch_related('notes')
-
-    data = []
-    for subj in subjects:
-        notes_list = []
-        for note in subj.notes.all():
-            notes_list.append({
-                "id": note.id,
-                "title": note.title,
-                "content": note.content,
-                "created_at": note.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-            })
-
-        data.append({
-            "id": subj.id,
-            "user": subj.user.id,
-            "category": subj.category,
-            "subject_name": subj.subject_name,
-            "description": subj.description,
-            "grade": str(subj.grade) if subj.grade else None,
-            "semester": subj.semester,
-            "school_year": subj.school_year,
-            "status": subj.status,
-            "priority": subj.priority,
-            "notes": notes_list
-        })
+    try:
+        filters = clean_subject_filters(request.GET)
+        sort, descending = clean_subject_sort(request.GET.get("sort"))
+        decode, encode = subject_cursor(sort)
+        page = page_params(request, decode)
+    except (InvalidPayload, InvalidCursor) as e:
+        return JsonResponse({"error": str(e)}, status=400)
 
-    return JsonResponse({"success": True, "subjects": data})
+    subjects, fields = sort_subjects(subjects_for(user.id, filters), sort, descending)
+    next_cursor = None
+    if page:
+        subjects, next_cursor = split_page(
+            paginate(subjects, page, descending, fields), page, subject_row_key(sort), encode
+        )
+
+    data, notes_by_subject = serialize_subjects(subjects)
+    attach_subject_notes(notes_by_subject, notes_for_subjects(notes_by_subject))
+
+    if page:
+        return FastJsonResponse({"success": True, "subjects": data, "next_cursor": next_cursor})
+    return FastJsonResponse({"success": True, "subjects": data})
 
 
 @csrf_exempt
@@ -186,6 +299,7 @@ def edit_subject(request, subject_id):
             subject.status = data.get("status", subject.status)
             subject.priority = data.get("priority", subject.priority)
             subject.save()
+            bump_user_version(subject.user_id)
 
             return JsonResponse({
                 "message": "Subject updated successfully",
@@ -209,28 +323,115 @@ def edit_subject(request, subject_id):
 def delete_subject(request, id):
     if request.method == "POST":
         subject = get_object_or_404(Subject, id=id)
-        subject.delete()
+        with transaction.atomic():
+            unindex_subjects([subject.id])
+            record_deletions(subject.user_id, DeletionLog.Kind.SUBJECT, [subject.id])
+            subject.delete()
+        bump_user_version(subject.user_id)
         return JsonResponse({"success": True})
     return JsonResponse({"success": False, "error": "Invalid request"})
 
 
+@csrf_exempt
+def bulk_subjects(request):
+    if request.method not in ("POST", "PATCH", "DELETE"):
+        return JsonResponse({"success": False, "message": "Invalid request method"}, status=405)
+
+    user_id = request.session.get("user_id")
+    if not user_id:
+        return JsonResponse({"success": False, "message": "User not authenticated"}, status=401)
+
+    user = get_session_user(request)
+    if user is None:
+        return JsonResponse({"success": False, "message": "User not found"}, status=404)
+
+    try:
+        items = _bulk_items(request, "subjects")
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return JsonResponse({"success": False, "message": "Invalid JSON"}, status=400)
+    except InvalidPayload as e:
+        return JsonResponse({"success": False, "message": str(e)}, status=400)
+
+    errors = []
+    try:
+        with transaction.atomic(), suspend_grade_aggregates():
+            if request.method == "POST":
+                subjects = []
+                for index, item in enumerate(items):
+                    try:
+                        subjects.append(Subject(user=user, **clean_subject(item)))
+                    except InvalidPayload as e:
+                        errors.append({"index": index, "error": str(e)})
+                after_id = latest_id(Subject.objects.filter(user=user))
+                Subject.objects.bulk_create(subjects, batch_size=BULK_BATCH_SIZE)
+                index_created(SearchTerm.Kind.SUBJECT, Subject.objects.filter(user=user), after_id)
+                result = {"created": len(subjects)}
+            elif request.method == "PATCH":
+                updated = _bulk_update(Subject.objects.filter(user=user), items, clean_subject, errors)
+                index_documents(SearchTerm.Kind.SUBJECT, updated)
+                result = {"updated": len(updated)}
+            else:
+                unindex_subjects([pk for pk in items if type(pk) is int], user.id)
+                result = {"deleted": _bulk_delete(
+                    Subject.objects.filter(user=user), items, errors, user.id, DeletionLog.Kind.SUBJECT
+                )}
+            rebuild_aggregates([user.id])
+    except Exception as e:
+        return JsonResponse({"success": False, "message": str(e)}, status=500)
+
+    bump_user_version(user.id)
+    errors.sort(key=lambda error: error["index"])
+    return JsonResponse({"success": True, **result, "errors": errors})
+
+
+@csrf_exempt
+def import_subjects_csv(request):
+    if request.method != "POST":
+        return JsonResponse({"success": False, "message": "Invalid request method"}, status=405)
+
+    user_id = request.session.get("user_id")
+    if not user_id:
+        return JsonResponse({"success": False, "message": "User not authenticated"}, status=401)
+
+    user = get_session_user(request)
+    if user is None:
+        return JsonResponse({"success": False, "message": "User not found"}, status=404)
+
+    # Multipart uploads are spooled to disk by Django; a raw text/csv body is
+    # read straight off the request stream. Either way rows are parsed lazily.
+    source = request
+    if request.content_type == "multipart/form-data":
+        source = request.FILES.get("file")
+        if source is None:
+            return JsonResponse({"success": False, "message": "file is required"}, status=400)
+
+    try:
+        reader = subject_reader(decode_lines(source))
+    except InvalidImport as e:
+        return JsonResponse({"success": False, "message": str(e)}, status=400)
+
+    try:
+        result = import_subjects(user.id, reader)
+    except Exception as e:
+        return JsonResponse({"success": False, "message": str(e)}, status=500)
+    finally:
+        bump_user_version(user.id)
+
+    return JsonResponse({"success": True, **result})
+
+
 @csrf_exempt
 def current_user(request):
     user_id = request.session.get("user_id")
     if not user_id:
         return JsonResponse({"error": "Not logged in"}, status=401)
 
-    try:
-        user = User.objects.get(id=user_id)
-        return JsonResponse({
-            "id": user.id,
-            "username": user.username,
-            "email": user.email,
-            "full_name": user.full_name
-        })
-    except User.DoesNotExist:
+    user = get_session_user(request)
+    if user is None:
         return JsonResponse({"error": "User not found"}, status=404)
 
+    return FastJsonResponse(serialize_user(user))
+
 
 @csrf_exempt
 def career_recommendation(request):
@@ -238,32 +439,33 @@ def career_recommendation(request):
     if not user_id:
         return JsonResponse({"error": "User not authenticated"}, status=401)
 
-    try:
-        user = User.objects.get(id=user_id)
-    except User.DoesNotExist:
+    user = get_session_user(request)
+    if user is None:
         return JsonResponse({"error": "User not found"}, status=404)
 
-    category_grades = (
-        Subject.objects
-        .filter(user=user, grade__isnull=False)
-        .values("category")
-        .annotate(avg_grade=Avg("grade"))
-    )
+    return FastJsonResponse(recommendation_payload(category_averages(user.id)))
 
-    if not category_grades:
-        return JsonResponse(
-            {"message": "No graded subjects available", "recommendation": None, "category_average_grades": {}})
 
-    category_avg = {item["category"]: float(item["avg_grade"]) for item in category_grades}
-    best_category = max(category_avg, key=category_avg.get)
-    recommended_career = CAREER_MAPPING.get(best_category, "General IT")
+@csrf_exempt
+@cached_user_response("dashboard")
+def dashboard(request):
+    if request.method != "GET":
+        return JsonResponse({"success": False, "message": "Invalid request method"}, status=405)
+
+    user_id = request.session.get("user_id")
+    if not user_id:
+        return JsonResponse({"success": False, "message": "User not authenticated"}, status=401)
+
+    user = get_session_user(request)
+    if user is None:
+        return JsonResponse({"success": False, "message": "User not found"}, status=404)
+
+    try:
+        sections = dashboard_params(request.GET)
+    except InvalidDashboard as e:
+        return JsonResponse({"success": False, "message": str(e)}, status=400)
 
-    data = {
-        "category_average_grades": category_avg,
-        "best_category": best_category,
-        "recommended_career": recommended_career,
-    }
-    return JsonResponse(data)
+    return FastJsonResponse({"success": True, "user": serialize_user(user), **build_dashboard(user.id, sections)})
 
 
 @csrf_exempt
@@ -275,9 +477,8 @@ def create_note(request):
     if not user_id:
         return JsonResponse({"success": False, "message": "User not authenticated"}, status=401)
 
-    try:
-        user = User.objects.get(id=user_id)
-    except User.DoesNotExist:
+    user = get_session_user(request)
+    if user is None:
         return JsonResponse({"success": False, "message": "User not found"}, status=404)
 
     try:
@@ -294,6 +495,7 @@ def create_note(request):
             subject=subject,
             user=user
         )
+        bump_user_version(user.id)
 
         return JsonResponse({
             "success": True,
@@ -307,29 +509,42 @@ def create_note(request):
         return JsonResponse({"success": False, "message": str(e)}, status=500)
 
 
+@cached_user_response("notes")
 def get_notes(request):
     user_id = request.session.get("user_id")
     if not user_id:
         return JsonResponse({"success": False, "message": "User not authenticated"}, status=401)
 
-    try:
-        user = User.objects.get(id=user_id)
-    except User.DoesNotExist:
+    user = get_session_user(request)
+    if user is None:
         return JsonResponse({"success": False, "message": "User not found"}, status=404)
 
-    subjects = Subject.objects.filter(user=user).prefetch_related(
-        Prefetch('notes', queryset=Note.objects.order_by('-created_at'))
-    )
-
-    data = []
-    for subject in subjects:
-        data.append({
-            "subject_id": subject.id,
-            "subject_name": subject.subject_name,
-            "notes": [{"id": n.id, "title": n.title, "content": n.content} for n in subject.notes.all()]
+    try:
+        page = page_params(request)
+        subject_id = clean_note_subject(request.GET.get("subject"))
+        per_subject = page_size(request, "notes_page_size", DEFAULT_NOTES_PER_SUBJECT)
+    except (InvalidCursor, InvalidPayload) as e:
+        return JsonResponse({"success": False, "message": str(e)}, status=400)
+
+    if subject_id is not None:
+        # The rest of one subject's notes, newest first
+        page = page or (None, page_size(request))
+        notes, next_cursor = split_page(
+            paginate(subject_notes_for(user.id, subject_id), page, descending=True), page, note_row_key
+        )
+        if not notes and not Subject.objects.filter(id=subject_id, user=user).exists():
+            return JsonResponse({"success": False, "message": "Subject not found"}, status=404)
+        return FastJsonResponse({
+            "success": True, "subject_id": subject_id, "notes": serialize_note_rows(notes), "next_cursor": next_cursor,
         })
 
-    return JsonResponse(data, safe=False)
+    if not page:
+        return FastJsonResponse(serialize_subject_notes(subjects_with_notes_for(user.id)), safe=False)
+
+    subjects, next_cursor = split_page(paginate(note_subjects_for(user.id), page), page, lambda row: (row[2], row[0]))
+    notes = latest_notes_for_subjects([subject_id for subject_id, _, _ in subjects], per_subject)
+    data = serialize_subject_note_pages(subjects, notes, per_subject)
+    return FastJsonResponse({"success": True, "subjects": data, "next_cursor": next_cursor})
 
 
 @csrf_exempt
@@ -350,6 +565,7 @@ def edit_note(request, note_id):
         note.title = title
         note.content = content
         note.save()
+        bump_user_version(note.user_id)
 
         return JsonResponse({
             "id": note.id,
@@ -367,17 +583,87 @@ def delete_note(request, note_id):
 
     try:
         note = Note.objects.get(id=note_id)
-        note.delete()
+        with transaction.atomic():
+            unindex_notes([note.id])
+            record_deletions(note.user_id, DeletionLog.Kind.NOTE, [note.id])
+            note.delete()
+        bump_user_version(note.user_id)
         return JsonResponse({"success": True})
     except Note.DoesNotExist:
         return JsonResponse({"error": "Note not found"}, status=404)
 
 
 @csrf_exempt
-def profile_view(request, user_id):
+def bulk_notes(request):
+    if request.method not in ("POST", "PATCH", "DELETE"):
+        return JsonResponse({"success": False, "message": "Invalid request method"}, status=405)
+
+    user_id = request.session.get("user_id")
+    if not user_id:
+        return JsonResponse({"success": False, "message": "User not authenticated"}, status=401)
+
+    user = get_session_user(request)
+    if user is None:
+        return JsonResponse({"success": False, "message": "User not found"}, status=404)
+
     try:
-        user = User.objects.get(id=user_id)
-    except User.DoesNotExist:
+        items = _bulk_items(request, "notes")
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return JsonResponse({"success": False, "message": "Invalid JSON"}, status=400)
+    except InvalidPayload as e:
+        return JsonResponse({"success": False, "message": str(e)}, status=400)
+
+    errors = []
+    try:
+        with transaction.atomic():
+            if request.method == "POST":
+                # Only int ids can be owned, and anything else may not be hashable
+                subject_ids = {
+                    item["subject"] for item in items if isinstance(item, dict) and type(item.get("subject")) is int
+                }
+                owned_subjects = set(
+                    Subject.objects.filter(user=user, id__in=subject_ids).values_list("id", flat=True)
+                )
+                notes = []
+                for index, item in enumerate(items):
+                    try:
+                        cleaned = clean_note(item)
+                        if type(item.get("subject")) is not int or item["subject"] not in owned_subjects:
+                            raise InvalidPayload("Invalid subject")
+                        notes.append(Note(user=user, subject_id=item["subject"], **cleaned))
+                    except InvalidPayload as e:
+                        errors.append({"index": index, "error": str(e)})
+                after_id = latest_id(Note.objects.filter(user=user))
+                Note.objects.bulk_create(notes, batch_size=BULK_BATCH_SIZE)
+                index_created(SearchTerm.Kind.NOTE, Note.objects.filter(user=user), after_id)
+                result = {"created": len(notes)}
+            elif request.method == "PATCH":
+                updated = _bulk_update(Note.objects.filter(user=user), items, clean_note, errors)
+                index_documents(SearchTerm.Kind.NOTE, updated)
+                result = {"updated": len(updated)}
+            else:
+                unindex_notes([pk for pk in items if type(pk) is int], user.id)
+                result = {"deleted": _bulk_delete(
+                    Note.objects.filter(user=user), items, errors, user.id, DeletionLog.Kind.NOTE
+                )}
+    except Exception as e:
+        return JsonResponse({"success": False, "message": str(e)}, status=500)
+
+    bump_user_version(user.id)
+    errors.sort(key=lambda error: error["index"])
+    return JsonResponse({"success": True, **result, "errors": errors})
+
+
+@csrf_exempt
+def profile_view(request, user_id):
+    session_user_id = request.session.get("user_id")
+    if not session_user_id:
+        return JsonResponse({"success": False, "message": "User not authenticated"}, status=401)
+    if user_id != session_user_id:
+        return JsonResponse({"success": False, "message": "Cannot access another user's profile"}, status=403)
+
+    user = get_session_user(request)
+    if user is None:
         return JsonResponse({"success": False, "message": "User not found"}, status=404)
 
     if request.method == "GET":
@@ -386,30 +672,25 @@ def profile_view(request, user_id):
         except UserProfile.DoesNotExist:
             profile = UserProfile.objects.create(user=user)
 
-        return JsonResponse({
-            "user": {
-                "id": user.id,
-                "username": user.username,
-                "email": user.email,
-                "full_name": user.full_name or "",
-            },
-            "profile": {
-                "profile_pic": profile.profile_pic or "",
-                "address": profile.address or "",
-                "school": profile.school or "",
-                "course": profile.course or "",
-                "bio": profile.bio or "",
-            }
-        })
+        return JsonResponse(serialize_profile(user, profile))
 
     elif request.method == "POST":
         data = request.POST
         file = request.FILES.get("profile_pic")
 
+        blob_name = None
+        if file:
+            try:
+                blob_name = store_upload(file)
+            except InvalidUpload as e:
+                return JsonResponse({"success": False, "message": str(e)}, status=400)
+
         user.username = data.get("username", user.username)
         user.email = data.get("email", user.email)
         user.full_name = data.get("full_name", user.full_name or "")
         user.save()
+        invalidate_session_user(user.id)
+        bump_user_version(user.id)
 
         profile, created = UserProfile.objects.get_or_create(user=user)
         profile.address = data.get("address", profile.address or "")
@@ -417,40 +698,42 @@ def profile_view(request, user_id):
         profile.course = data.get("course", profile.course or "")
         profile.bio = data.get("bio", profile.bio or "")
 
-        if file:
-            media_dir = os.path.join(settings.BASE_DIR, 'media', 'profile_pics')
-            os.makedirs(media_dir, exist_ok=True)
-
-            filename = f"{user.id}_{file.name}"
-            filepath = os.path.join(media_dir, filename)
-
-            with open(filepath, 'wb+') as f:
-                for chunk in file.chunks():
-                    f.write(chunk)
-
-            profile.profile_pic = f"/media/profile_pics/{filename}"
+        if blob_name:
+            # Thumbnails are rendered in the background; until then the
+            # response points at the stored original
+            profile.profile_pic_status = UserProfile.PictureStatus.PENDING
+            profile.profile_pic_pending = blob_name
 
         profile.save()
+        if blob_name:
+            schedule_processing(user.id, blob_name)
 
-        return JsonResponse({
-            "user": {
-                "id": user.id,
-                "username": user.username,
-                "email": user.email,
-                "full_name": user.full_name or "",
-            },
-            "profile": {
-                "profile_pic": profile.profile_pic or "",
-                "address": profile.address or "",
-                "school": profile.school or "",
-                "course": profile.course or "",
-                "bio": profile.bio or "",
-            }
-        })
+        return JsonResponse(serialize_profile(user, profile))
     else:
         return JsonResponse({"success": False, "message": "Method not allowed"}, status=405)
 
 
+def serve_blob(request, name):
+    if parse_blob_name(name) is None:
+        raise Http404("Unknown media")
+
+    # The name is the content's hash, so the file behind a URL never changes
+    etag = f'"{name[:64]}"'
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={BLOB_MAX_AGE}, immutable"}
+    try:
+        blob = open(blob_path(name), "rb")
+    except FileNotFoundError:
+        raise Http404("Unknown media")
+    if etag_matches(request, etag):
+        blob.close()
+        return HttpResponseNotModified(headers=headers)
+
+    response = FileResponse(blob, content_type=content_type(name))
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
 @csrf_exempt
 def add_project(request):
     if request.method != "POST":
@@ -460,9 +743,8 @@ def add_project(request):
     if not user_id:
         return JsonResponse({"success": False, "message": "User not authenticated"}, status=401)
 
-    try:
-        user = User.objects.get(id=user_id)
-    except User.DoesNotExist:
+    user = get_session_user(request)
+    if user is None:
         return JsonResponse({"success": False, "message": "User not found"}, status=404)
 
     try:
@@ -477,6 +759,7 @@ def add_project(request):
             description=description,
             status=status
         )
+        bump_user_version(user.id)
 
         return JsonResponse({
             "success": True,
@@ -498,6 +781,7 @@ def add_project(request):
 
 
 @csrf_exempt
+@cached_user_response("projects")
 def get_projects(request):
     if request.method != "GET":
         return JsonResponse({"success": False, "message": "Invalid request method"}, status=405)
@@ -506,25 +790,27 @@ def get_projects(request):
     if not user_id:
         return JsonResponse({"success": False, "message": "User not authenticated"}, status=401)
 
-    try:
-        user = User.objects.get(id=user_id)
-    except User.DoesNotExist:
+    user = get_session_user(request)
+    if user is None:
         return JsonResponse({"success": False, "message": "User not found"}, status=404)
 
-    projects = Project.objects.filter(user=user).order_by('-created_at')
-    data = [
-        {
-            "id": project.id,
-            "title": project.title,
-            "description": project.description,
-            "status": project.status,
-            "created_at": project.created_at,
-            "updated_at": project.updated_at
-        }
-        for project in projects
-    ]
+    try:
+        page = page_params(request)
+    except InvalidCursor as e:
+        return JsonResponse({"success": False, "message": str(e)}, status=400)
+
+    projects = projects_for(user.id)
+    next_cursor = None
+    if page:
+        projects, next_cursor = split_page(
+            paginate(projects, page, descending=True), page, lambda project: (project.created_at, project.id)
+        )
+
+    data = [serialize_project(project) for project in projects]
 
-    return JsonResponse({"success": True, "projects": data})
+    if page:
+        return FastJsonResponse({"success": True, "projects": data, "next_cursor": next_cursor})
+    return FastJsonResponse({"success": True, "projects": data})
 
 
 @csrf_exempt
@@ -536,9 +822,8 @@ def edit_project(request, project_id):
     if not user_id:
         return JsonResponse({"success": False, "message": "User not authenticated"}, status=401)
 
-    try:
-        user = User.objects.get(id=user_id)
-    except User.DoesNotExist:
+    user = get_session_user(request)
+    if user is None:
         return JsonResponse({"success": False, "message": "User not found"}, status=404)
 
     try:
@@ -556,6 +841,7 @@ def edit_project(request, project_id):
         project.description = description
         project.status = status
         project.save()
+        bump_user_version(user.id)
 
         return JsonResponse({
             "success": True,
@@ -582,14 +868,16 @@ def delete_project(request, project_id):
     if not user_id:
         return JsonResponse({"success": False, "message": "User not authenticated"}, status=401)
 
-    try:
-        user = User.objects.get(id=user_id)
-    except User.DoesNotExist:
+    user = get_session_user(request)
+    if user is None:
         return JsonResponse({"success": False, "message": "User not found"}, status=404)
 
     try:
         project = Project.objects.get(id=project_id, user=user)
-        project.delete()
+        with transaction.atomic():
+            record_deletions(user.id, DeletionLog.Kind.PROJECT, [project.id])
+            project.delete()
+        bump_user_version(user.id)
         return JsonResponse({"success": True, "message": "Project deleted successfully"})
     except Project.DoesNotExist:
         return JsonResponse({"success": False, "message": "Project not found"}, status=404)
@@ -604,9 +892,8 @@ def add_todo_list(request):
     if not user_id:
         return JsonResponse({"success": False, "message": "User not authenticated"}, status=401)
 
-    try:
-        user = User.objects.get(id=user_id)
-    except User.DoesNotExist:
+    user = get_session_user(request)
+    if user is None:
         return JsonResponse({"success": False, "message": "User not found"}, status=404)
 
     try:
@@ -622,18 +909,22 @@ def add_todo_list(request):
             title=title,
             description=description
         )
+        bump_user_version(user.id)
+
+        list_data = {
+            "id": new_list.id,
+            "title": new_list.title,
+            "description": new_list.description,
+            "created_at": str(new_list.created_at),
+            "updated_at": str(new_list.updated_at),
+            "tasks": []
+        }
+        publish_event(user.id, "todo_lists", "created", new_list.id, status=list_data)
 
         return JsonResponse({
             "success": True,
             "message": "Todo list created successfully",
-            "status": {
-                "id": new_list.id,
-                "title": new_list.title,
-                "description": new_list.description,
-                "created_at": str(new_list.created_at),
-                "updated_at": str(new_list.updated_at),
-                "tasks": []
-            }
+            "status": list_data
         }, status=201)
 
     except json.JSONDecodeError:
@@ -643,6 +934,7 @@ def add_todo_list(request):
 
 
 @csrf_exempt
+@cached_user_response("todo_lists")
 def get_todo_lists(request):
     if request.method != "GET":
         return JsonResponse({"success": False, "message": "Invalid request method"}, status=405)
@@ -651,33 +943,35 @@ def get_todo_lists(request):
     if not user_id:
         return JsonResponse({"success": False, "message": "User not authenticated"}, status=401)
 
-    try:
-        user = User.objects.get(id=user_id)
-    except User.DoesNotExist:
+    user = get_session_user(request)
+    if user is None:
         return JsonResponse({"success": False, "message": "User not found"}, status=404)
 
     try:
-        todo_lists = TodoList.objects.filter(user=user).order_by("-created_at")
-        lists_data = []
-
-        for todo_list in todo_lists:
-            lists_data.append({
-                "id": todo_list.id,
-                "title": todo_list.title,
-                "description": todo_list.description,
-                "created_at": str(todo_list.created_at),
-                "updated_at": str(todo_list.updated_at),
-                "tasks": [
-                    {
-                        "id": task.id,
-                        "label": task.label,
-                        "completed": task.completed,
-                    }
-                    for task in todo_list.tasks.all()
-                ]
-            })
+        page = page_params(request)
+    except InvalidCursor as e:
+        return JsonResponse({"success": False, "message": str(e)}, status=400)
 
-        return JsonResponse({
+    try:
+        todo_lists = todo_lists_for(user.id)
+        next_cursor = None
+        if page:
+            todo_lists, next_cursor = split_page(
+                paginate(todo_lists, page, descending=True), page, lambda row: (row["created_at"], row["id"])
+            )
+        else:
+            todo_lists = list(todo_lists)
+
+        tasks = tasks_for_lists([todo_list["id"] for todo_list in todo_lists])
+        lists_data = serialize_todo_lists(todo_lists, tasks)
+
+        if page:
+            return FastJsonResponse({
+                "success": True,
+                "statuses": lists_data,
+                "next_cursor": next_cursor
+            }, status=200)
+        return FastJsonResponse({
             "success": True,
             "statuses": lists_data
         }, status=200)
@@ -694,9 +988,8 @@ def edit_todo_list(request, list_id):
     if not user_id:
         return JsonResponse({"success": False, "message": "User not authenticated"}, status=401)
 
-    try:
-        user = User.objects.get(id=user_id)
-    except User.DoesNotExist:
+    user = get_session_user(request)
+    if user is None:
         return JsonResponse({"success": False, "message": "User not found"}, status=404)
 
     try:
@@ -709,17 +1002,21 @@ def edit_todo_list(request, list_id):
         todo_list.title = data.get("title", todo_list.title)
         todo_list.description = data.get("description", todo_list.description)
         todo_list.save()
+        bump_user_version(user.id)
+
+        list_data = {
+            "id": todo_list.id,
+            "title": todo_list.title,
+            "description": todo_list.description,
+            "created_at": str(todo_list.created_at),
+            "updated_at": str(todo_list.updated_at),
+        }
+        publish_event(user.id, "todo_lists", "updated", todo_list.id, status=list_data)
 
         return JsonResponse({
             "success": True,
             "message": "Todo list updated successfully",
-            "status": {
-                "id": todo_list.id,
-                "title": todo_list.title,
-                "description": todo_list.description,
-                "created_at": str(todo_list.created_at),
-                "updated_at": str(todo_list.updated_at),
-            }
+            "status": list_data
         })
 
     except json.JSONDecodeError:
@@ -737,14 +1034,17 @@ def delete_todo_list(request, list_id):
     if not user_id:
         return JsonResponse({"success": False, "message": "User not authenticated"}, status=401)
 
-    try:
-        user = User.objects.get(id=user_id)
-    except User.DoesNotExist:
+    user = get_session_user(request)
+    if user is None:
         return JsonResponse({"success": False, "message": "User not found"}, status=404)
 
     try:
         todo_list = TodoList.objects.get(id=list_id, user=user)
-        todo_list.delete()
+        with transaction.atomic():
+            record_deletions(user.id, DeletionLog.Kind.TODO_LIST, [todo_list.id])
+            todo_list.delete()
+        bump_user_version(user.id)
+        publish_event(user.id, "todo_lists", "deleted", list_id)
         return JsonResponse({
             "success": True,
             "message": "Todo list deleted successfully"
@@ -776,19 +1076,29 @@ def add_task(request, list_id):
         except TodoList.DoesNotExist:
             return JsonResponse({"success": False, "message": "Todo list not found"}, status=404)
 
-        task = Task.objects.create(
-            todo_list=todo_list,
-            label=label,
-            completed=False
+        with transaction.atomic():
+            task = Task.objects.create(
+                todo_list=todo_list,
+                label=label,
+                completed=False
+            )
+            new_status = TodoList.adjust_task_counters(todo_list.id, total=1)
+        bump_user_version(todo_list.user_id)
+
+        task_data = {
+            "id": task.id,
+            "label": task.label,
+            "completed": task.completed
+        }
+        publish_event(
+            todo_list.user_id, "tasks", "created", task.id,
+            todo_list_id=todo_list.id, task=task_data, new_status=new_status,
         )
 
         return JsonResponse({
             "success": True,
-            "task": {
-                "id": task.id,
-                "label": task.label,
-                "completed": task.completed
-            }
+            "task": task_data,
+            "new_status": new_status
         }, status=201)
 
     except json.JSONDecodeError:
@@ -804,18 +1114,25 @@ def toggle_task(request, task_id):
         return JsonResponse({"success": False, "message": "Invalid method"}, status=405)
 
     try:
-        task = Task.objects.get(id=task_id)
-        task.completed = not task.completed
-        task.save()
+        task = Task.objects.select_related("todo_list").get(id=task_id)
+        with transaction.atomic():
+            task.toggle_completion()
+        bump_user_version(task.todo_list.user_id)
+
+        task_data = {
+            "id": task.id,
+            "label": task.label,
+            "completed": task.completed
+        }
+        publish_event(
+            task.todo_list.user_id, "tasks", "updated", task.id,
+            todo_list_id=task.todo_list_id, task=task_data, new_status=task.todo_list.status,
+        )
 
         return JsonResponse({
             "success": True,
-            "task": {
-                "id": task.id,
-                "label": task.label,
-                "completed": task.completed
-            },
-            "new_status": "COMPLETED"
+            "task": task_data,
+            "new_status": task.todo_list.status
         })
     except Task.DoesNotExist:
         return JsonResponse({"success": False, "message": "Task not found"}, status=404)
@@ -829,13 +1146,22 @@ def delete_task(request, task_id):
         return JsonResponse({"success": False, "message": "Invalid method"}, status=405)
 
     try:
-        task = Task.objects.get(id=task_id)
-        task.delete()
+        with transaction.atomic():
+            task = Task.objects.select_for_update().select_related("todo_list").get(id=task_id)
+            record_deletions(task.todo_list.user_id, DeletionLog.Kind.TASK, [task.id])
+            task.delete()
+            new_status = TodoList.adjust_task_counters(
+                task.todo_list_id, total=-1, completed=-1 if task.completed else 0
+            )
+        bump_user_version(task.todo_list.user_id)
+        publish_event(
+            task.todo_list.user_id, "tasks", "deleted", task_id, todo_list_id=task.todo_list_id, new_status=new_status,
+        )
 
         return JsonResponse({
             "success": True,
             "message": "Task deleted successfully",
-            "new_status": "ONGOING"
+            "new_status": new_status
         })
     except Task.DoesNotExist:
         return JsonResponse({"success": False, "message": "Task not found"}, status=404)
@@ -843,8 +1169,155 @@ def delete_task(request, task_id):
         return JsonResponse({"success": False, "message": str(e)}, status=500)
 
 
+@csrf_exempt
+def bulk_tasks(request, list_id):
+    if request.method not in ("POST", "PATCH", "DELETE"):
+        return JsonResponse({"success": False, "message": "Invalid method"}, status=405)
+
+    user_id = request.session.get("user_id")
+    if not user_id:
+        return JsonResponse({"success": False, "message": "User not logged in"}, status=401)
+
+    try:
+        todo_list = TodoList.objects.get(id=list_id, user_id=user_id)
+    except TodoList.DoesNotExist:
+        return JsonResponse({"success": False, "message": "Todo list not found"}, status=404)
+
+    try:
+        items = _bulk_items(request, "tasks")
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return JsonResponse({"success": False, "message": "Invalid JSON"}, status=400)
+    except InvalidPayload as e:
+        return JsonResponse({"success": False, "message": str(e)}, status=400)
+
+    errors = []
+    try:
+        with transaction.atomic():
+            if request.method == "POST":
+                tasks = []
+                for index, item in enumerate(items):
+                    try:
+                        tasks.append(Task(todo_list=todo_list, **clean_task(item)))
+                    except InvalidPayload as e:
+                        errors.append({"index": index, "error": str(e)})
+                Task.objects.bulk_create(tasks, batch_size=BULK_BATCH_SIZE)
+                result = {"created": len(tasks)}
+            elif request.method == "PATCH":
+                result = {"updated": len(_bulk_update(todo_list.tasks.all(), items, clean_task, errors))}
+            else:
+                result = {"deleted": _bulk_delete(
+                    todo_list.tasks.all(), items, errors, todo_list.user_id, DeletionLog.Kind.TASK
+                )}
+            TodoList.recount_tasks(TodoList.objects.filter(id=todo_list.id))
+    except Exception as e:
+        return JsonResponse({"success": False, "message": str(e)}, status=500)
+
+    bump_user_version(todo_list.user_id)
+    # Too many rows to carry; subscribers refetch the list
+    publish_event(todo_list.user_id, "todo_lists", "updated", todo_list.id, **result)
+    errors.sort(key=lambda error: error["index"])
+    return JsonResponse({"success": True, **result, "errors": errors})
+
+
+@csrf_exempt
+@cached_user_response("search")
+def search(request):
+    if request.method != "GET":
+        return JsonResponse({"success": False, "message": "Invalid request method"}, status=405)
+
+    user_id = request.session.get("user_id")
+    if not user_id:
+        return JsonResponse({"success": False, "message": "User not authenticated"}, status=401)
+
+    user = get_session_user(request)
+    if user is None:
+        return JsonResponse({"success": False, "message": "User not found"}, status=404)
+
+    types = [name for name in request.GET.get("type", "").split(",") if name]
+    if any(name not in KINDS for name in types):
+        return JsonResponse(
+            {"success": False, "message": f"type must be one of {', '.join(KINDS)}"}, status=400
+        )
+
+    try:
+        terms = parse_query(request.GET.get("q"))
+        rows, next_cursor = search_page(
+            user.id, terms, types, request.GET.get("cursor"), page_size(request)
+        )
+    except (InvalidQuery, InvalidCursor) as e:
+        return JsonResponse({"success": False, "message": str(e)}, status=400)
+
+    return FastJsonResponse({"success": True, "results": search_results(rows), "next_cursor": next_cursor})
+
+
+@csrf_exempt
+def export_data(request):
+    if request.method != "GET":
+        return JsonResponse({"success": False, "message": "Invalid request method"}, status=405)
+
+    user_id = request.session.get("user_id")
+    if not user_id:
+        return JsonResponse({"success": False, "message": "User not authenticated"}, status=401)
+
+    user = get_session_user(request)
+    if user is None:
+        return JsonResponse({"success": False, "message": "User not found"}, status=404)
+
+    try:
+        export_format, sections = export_params(request.GET.get("format"), request.GET.get("sections"))
+    except InvalidExport as e:
+        return JsonResponse({"success": False, "message": str(e)}, status=400)
+
+    response = StreamingHttpResponse(
+        export_stream(user.id, export_format, sections),
+        content_type="text/csv" if export_format == "csv" else "application/x-ndjson",
+    )
+    response["Content-Disposition"] = f'attachment; filename="{export_filename(export_format, sections)}"'
+    return response
+
+
+@csrf_exempt
+def sync_changes(request):
+    if request.method != "GET":
+        return JsonResponse({"success": False, "message": "Invalid request method"}, status=405)
+
+    user_id = request.session.get("user_id")
+    if not user_id:
+        return JsonResponse({"success": False, "message": "User not authenticated"}, status=401)
+
+    user = get_session_user(request)
+    if user is None:
+        return JsonResponse({"success": False, "message": "User not found"}, status=404)
+
+    try:
+        since, until, position, size = sync_params(request.GET)
+    except SyncExpired as e:
+        return JsonResponse({"success": False, "message": str(e)}, status=410)
+    except InvalidSync as e:
+        return JsonResponse({"success": False, "message": str(e)}, status=400)
+
+    changes, deleted, next_cursor = sync_page(user.id, since, until, position, size)
+    # The watermark comes with the last page only; it is the next sync's `since`
+    return FastJsonResponse({
+        "success": True,
+        "changes": changes,
+        "deleted": deleted,
+        "next_cursor": next_cursor,
+        "watermark": None if next_cursor else encode_watermark(until),
+    })
+
+
 @csrf_exempt
 def logout_view(request):
     logout(request)
     return JsonResponse({"message": "Logged out successfully"})
 
+
+def metrics(request):
+    if request.method != "GET":
+        return JsonResponse({"error": "Invalid method"}, status=400)
+    if not getattr(settings, "METRICS_TOKEN", None):
+        return JsonResponse({"error": "Not found"}, status=404)
+    if not scrape_authorized(request):
+        return JsonResponse({"error": "Forbidden"}, status=403)
+    return HttpResponse(render_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,23 @@
+"""
+ASGI entry point for the uvicorn child of 'manage.py bench endpoints --transport asgi'.
+
+Serves the same application as backend.asgi, on whichever databases the
+parent benchmarks (BENCH_DATABASE_NAMES maps each alias to its NAME) and
+with the settings it overrides (BENCH_SETTINGS).
+"""
+
+import json
+import os
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+# Before the first connection opens
+for alias, name in json.loads(os.environ.get('BENCH_DATABASE_NAMES', '{}')).items():
+    settings.DATABASES[alias]['NAME'] = name
+for name, value in json.loads(os.environ.get('BENCH_SETTINGS', '{}')).items():
+    setattr(settings, name, value)
+
+application = get_asgi_application()
@@ -45,7 +45,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.RequestMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'api.routers.PrimaryPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -89,15 +91,159 @@ DATABASES = {
         'OPTIONS': {
             'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
         },
-    }
+    },
+    # Read replicas are declared here and listed in DATABASE_REPLICAS, e.g.
+    # 'replica': {**<same as default>, 'HOST': 'replica-host',
+    #             'TEST': {'MIRROR': 'default'}},
+    # To try the routing locally, point 'default' and 'replica' at two SQLite
+    # files and copy the migrated primary file over the replica.
 }
 
+# Reads go to one of these aliases and writes to 'default'; a user who wrote,
+# from any client, keeps reading from 'default' for REPLICA_PIN_SECONDS to
+# cover replica lag (the pin lives in RESPONSE_CACHE_ALIAS next to the versions)
+DATABASE_REPLICAS = []
+DATABASE_ROUTERS = ['api.routers.PrimaryReplicaRouter']
+REPLICA_PIN_SECONDS = 5
+
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173",
 ]
 
 CORS_ALLOW_CREDENTIALS = True
 
+# Seconds a resolved session user is kept in the per-process cache (0 disables it)
+SESSION_USER_CACHE_TTL = 30
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+    },
+}
+
+# Sessions
+# https://docs.djangoproject.com/en/5.2/topics/http/sessions/
+#
+# 'db'             - one django_session SELECT on every authenticated request
+# 'cached_db'      - reads are served from SESSION_CACHE_ALIAS, writes go through to
+#                    the database. The alias must be one every worker shares (never
+#                    a LocMemCache): a logout only clears the cache it runs against,
+#                    so a per-process cache keeps the session alive in the others.
+#                    'shared' covers the workers of one host; use Redis or Memcached
+#                    across hosts.
+# 'signed_cookies' - no server-side state; logout clears the cookie but cannot
+#                    revoke a copy of it before SESSION_COOKIE_AGE runs out
+
+SESSION_BACKEND = 'cached_db'
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_ENGINE = SESSION_ENGINES[SESSION_BACKEND]
+SESSION_CACHE_ALIAS = 'shared'
+
+# Point this at 'shared' when running more than one worker process so every
+# worker sees the same per-user versions and cached list responses.
+# RESPONSE_CACHE_TIMEOUT = 0 turns the response cache off.
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = 300
+
+# Todo list and task changes are pushed to /api/async/events/ (server-sent
+# events) and /api/async/events/poll/ (long-poll). 'api.events.LocalBackend'
+# only reaches subscribers in the process that handled the write, so it is for
+# a single worker process only; with several workers use
+# 'api.events.CacheBackend', which relays through EVENTS_CACHE_ALIAS. That
+# alias must be Redis or Memcached (the system checks refuse anything else):
+# event ids come from cache.incr(), which the file and database caches do not
+# make atomic across processes. For example:
+#   CACHES['events'] = {'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+#                       'LOCATION': 'redis://127.0.0.1:6379'}
+# The last EVENTS_BACKLOG events per user are kept for EVENTS_TTL seconds for
+# clients that reconnect.
+EVENTS_BACKEND = 'api.events.LocalBackend'
+EVENTS_CACHE_ALIAS = 'events'
+EVENTS_BACKLOG = 100
+EVENTS_TTL = 300
+EVENTS_POLL_INTERVAL = 0.5
+EVENTS_HEARTBEAT = 15
+EVENTS_STREAM_SECONDS = 300
+EVENTS_LONG_POLL_SECONDS = 25
+
+# Encode hot list responses with orjson when it is installed; falls back to
+# DjangoJSONEncoder otherwise
+FAST_JSON_RENDERER = True
+
+# Rows fetched per query while streaming /api/export/ and export_user_data
+EXPORT_CHUNK_SIZE = 2000
+
+# /api/sync/ windows end SYNC_CLOCK_SKEW seconds before now so rows stamped
+# just before a slow commit, or by a server whose clock lags, are not skipped.
+# Tombstones are kept DELETION_LOG_RETENTION seconds (cleanup_deletion_log);
+# clients with an older watermark must sync from scratch.
+SYNC_CLOCK_SKEW = 5
+DELETION_LOG_RETENTION = 30 * 24 * 60 * 60
+
+# Subjects written per bulk_create/transaction by /api/subjects/import/ and import_subjects
+IMPORT_BATCH_SIZE = 1000
+
+# Uploaded profile pictures are rendered by PROFILE_PIC_WORKERS background
+# threads into square thumbnails of each size (JPEG and WebP, needs Pillow)
+PROFILE_PIC_SIZES = (64, 256)
+PROFILE_PIC_WORKERS = 2
+PROFILE_PIC_MAX_BYTES = 5 * 1024 * 1024
+
+# Uploads are stored once per distinct content under media/blobs and served
+# with immutable cache headers. cleanup_media_blobs deletes blobs that have
+# been unreferenced for this many seconds.
+BLOB_ORPHAN_GRACE = 24 * 60 * 60
+
+# Password hashing runs on a pool of PASSWORD_HASH_WORKERS threads; once
+# PASSWORD_HASH_QUEUE more requests are waiting, logins get a 503
+PASSWORD_HASH_WORKERS = 4
+PASSWORD_HASH_QUEUE = 16
+
+# PBKDF2 iterations for new hashes (None keeps Django's default). Existing
+# hashes are upgraded the next time their owner logs in.
+PASSWORD_HASH_ITERATIONS = None
+
+PASSWORD_HASHERS = [
+    'api.hashing.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+# Token buckets in front of login/register: scope -> (burst, seconds to refill it)
+LOGIN_THROTTLE_RATES = {
+    'ip': (30, 60),
+    'username': (10, 300),
+}
+THROTTLE_CACHE_ALIAS = 'default'
+
+# Per-view latency, query count, DB time and response size are exposed at
+# /api/metrics/ in the Prometheus text format. Requests slower than
+# METRICS_SLOW_REQUEST_MS (None disables the log) are logged to
+# api.slow_requests with their METRICS_SLOW_REQUEST_SQL most expensive statements.
+METRICS_SLOW_REQUEST_MS = 500
+METRICS_SLOW_REQUEST_SQL = 10
+# The endpoint answers 404 while this is unset; scrapers send
+# 'Authorization: Bearer <METRICS_TOKEN>'. Set it from the environment.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# 'manage.py bench' creates and deletes users, so it runs on throwaway test
+# databases unless the default database's NAME equals this one, which is set
+# aside for benchmarking (and needed to bench a running server with --transport url).
+BENCH_DATABASE = os.environ.get('BENCH_DATABASE')
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 